@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 
 class User(BaseModel):
@@ -35,6 +35,43 @@ class RefreshTokenRequest(BaseModel):
 
 class RefreshTokenResponse(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None  # set when refresh tokens are rotated
+
+
+class TokenRequest(BaseModel):
+    token: str
+
+
+class RevokeTokenResponse(BaseModel):
+    revoked: bool  # False if it was already revoked or has expired
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
+
+
+class RevokeJtiRequest(BaseModel):
+    jti: str
+    exp: Optional[int] = None  # defaults to REVOCATION_MAX_TTL from now
+
+
+class LogoutAllResponse(BaseModel):
+    sub: str
+    sessions_ended: int  # sessions known to the worker that handled the request
+    revoked_before: Optional[float] = None  # tokens issued up to then are revoked
+
+
+class SessionInfo(BaseModel):
+    sid: str
+    sub: str
+    expires_at: float
+    created_at: float
+
+
+class IntrospectResponse(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+    refresh: bool = False
 
 
 class EncryptRequest(BaseModel):
@@ -50,8 +87,9 @@ class EncryptResponse(BaseModel):
 
 class DecryptRequest(BaseModel):
     encrypted: str
-    iv: str
-    tag: str
+    # Only needed for legacy ciphertexts; envelopes carry their own nonce and tag
+    iv: Optional[str] = None
+    tag: Optional[str] = None
     key: str
 
 
@@ -59,6 +97,79 @@ class DecryptResponse(BaseModel):
     decrypted: str
 
 
+class BatchEncryptRequest(BaseModel):
+    key: str
+    items: List[str]
+
+
+class BatchEncryptResult(BaseModel):
+    encrypted: Optional[str] = None
+    iv: Optional[str] = None
+    tag: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchEncryptResponse(BaseModel):
+    results: List[BatchEncryptResult]
+
+
+class BatchDecryptItem(BaseModel):
+    encrypted: str
+    iv: Optional[str] = None
+    tag: Optional[str] = None
+
+
+class BatchDecryptRequest(BaseModel):
+    key: str
+    items: List[BatchDecryptItem]
+
+
+class BatchDecryptResult(BaseModel):
+    decrypted: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchDecryptResponse(BaseModel):
+    results: List[BatchDecryptResult]
+
+
+class HybridEncryptRequest(BaseModel):
+    data: str
+    publicKey: str
+
+
+class HybridEncryptResponse(BaseModel):
+    encrypted: str
+    iv: str
+    tag: str
+    encapsulatedKey: str
+
+
+class HybridDecryptRequest(BaseModel):
+    encrypted: str
+    iv: str
+    tag: str
+    encapsulatedKey: str
+    privateKey: str
+
+
+class HybridSessionEncryptResponse(BaseModel):
+    encrypted: str
+    iv: str
+    tag: str
+    session: str
+    encapsulatedKey: Optional[str] = None
+
+
+class HybridSessionDecryptRequest(BaseModel):
+    encrypted: str
+    iv: str
+    tag: str
+    session: str
+    privateKey: str
+    encapsulatedKey: Optional[str] = None
+
+
 class SignRequest(BaseModel):
     data: str
     key: str
@@ -78,6 +189,91 @@ class VerifyResponse(BaseModel):
     valid: bool
 
 
+class StreamSignResponse(SignResponse):
+    algorithm: str
+    size: int
+
+
+class StreamVerifyResponse(VerifyResponse):
+    algorithm: str
+    size: int
+
+
+class SignBatchItem(BaseModel):
+    data: str
+    key: Optional[str] = None  # defaults to the request key
+
+
+class SignBatchRequest(BaseModel):
+    key: Optional[str] = None
+    algorithm: str = "sha256"
+    items: List[SignBatchItem]
+
+
+class SignBatchResponse(BaseModel):
+    algorithm: str
+    signatures: List[str]  # base64, in item order
+
+
+class VerifyBatchItem(BaseModel):
+    data: str
+    signature: str  # base64
+    key: Optional[str] = None  # defaults to the request key
+
+
+class VerifyBatchRequest(BaseModel):
+    key: Optional[str] = None
+    algorithm: str = "sha256"
+    items: List[VerifyBatchItem]
+
+
+class VerifyBatchResponse(BaseModel):
+    algorithm: str
+    results: List[bool]  # in item order
+    valid: int
+    invalid: int
+
+
+class IntegrityManifest(BaseModel):
+    version: int = 1
+    algorithm: str
+    # Batas sesuai field u32/u64 pada pesan yang ditandatangani
+    chunk_size: int = Field(gt=0, lt=2**32)
+    size: int = Field(ge=0, lt=2**64)
+    chunks: int = Field(ge=1, lt=2**64)
+    root: str  # hex
+    signature: str  # base64 HMAC-SHA256 over the parameters and root
+
+
+class ChunkProof(BaseModel):
+    index: int = Field(ge=0)
+    proof: List[str]  # hex sibling hashes, leaf level first
+
+
+class IntegrityManifestResponse(BaseModel):
+    manifest: IntegrityManifest
+    proofs: Optional[List[ChunkProof]] = None
+
+
+class ChunkToVerify(BaseModel):
+    index: int = Field(ge=0)
+    data: str  # base64
+    proof: List[str]
+
+
+class VerifyChunksRequest(BaseModel):
+    manifest: IntegrityManifest
+    key: str
+    chunks: List[ChunkToVerify]
+
+
+class VerifyChunksResponse(BaseModel):
+    valid: bool
+    manifest_valid: bool
+    verified: List[int]
+    failed: List[int]
+
+
 class KeyPairResponse(BaseModel):
     publicKey: str
     privateKey: str
@@ -0,0 +1,3 @@
+"""
+Data access layer
+"""
\ No newline at end of file
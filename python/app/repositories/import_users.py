@@ -0,0 +1,46 @@
+"""
+Bulk-load users into the SQLite store.
+
+    python -m python.app.repositories.import_users users.csv --db users.db
+
+The CSV has ``username,password_hash`` rows (bcrypt hashes as text, no
+header). Existing usernames are skipped so the import can be re-run.
+"""
+
+import argparse
+import asyncio
+import csv
+import time
+
+from .user_repository import SQLiteUserRepository
+
+
+def read_rows(path: str):
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[0]:
+                yield row[0], row[1].encode()
+
+
+async def run(path: str, db: str, batch_size: int) -> dict:
+    repository = SQLiteUserRepository(db, pool_size=1)
+    try:
+        started = time.perf_counter()
+        result = await repository.bulk_import(read_rows(path), batch_size=batch_size)
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+    finally:
+        await repository.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv_path")
+    parser.add_argument("--db", default="users.db")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+    print(asyncio.run(run(args.csv_path, args.db, args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
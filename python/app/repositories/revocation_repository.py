@@ -0,0 +1,238 @@
+"""
+Exact, durable record of revoked token ids (``jti``).
+
+This is the source of truth behind the in-memory Bloom filters in
+``app.utils.revocation``. It is only queried when a filter reports a
+possible hit, or to catch up with revocations made by other workers. Ids
+come from an AUTOINCREMENT key, so they only grow and ``since(last_id)`` can
+tail the table even after expired rows have been purged.
+
+``exp`` is when the entry may be purged. ``exp_known`` says whether it is also
+the token's own expiry; it is False for ids revoked by ``jti`` alone, whose
+``exp`` is just an upper bound (REVOCATION_MAX_TTL).
+
+Subject rows revoke every token of one user issued at or before ``before``
+("log out everywhere"). They are tailed the same way, from their own id
+sequence.
+
+The SQLite store needs a writable REVOCATION_DB_PATH, so like the user store
+it is opt-in; without REVOCATION_STORE or USER_STORE the in-memory store is
+used.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+class RevocationStore(ABC):
+    @abstractmethod
+    async def add(
+        self,
+        jti: str,
+        exp: float,
+        sub: Optional[str] = None,
+        exp_known: bool = True,
+    ) -> bool:
+        """Record ``jti`` as revoked until ``exp``; False if it already was."""
+
+    @abstractmethod
+    async def contains(self, jti: str) -> bool: ...
+
+    @abstractmethod
+    async def since(self, last_id: int, now: float) -> list[tuple]:
+        """
+        (id, jti, exp, exp_known) rows added after ``last_id`` that expire
+        after ``now``, in id order.
+        """
+
+    @abstractmethod
+    async def add_subject(self, sub: str, before: float, exp: float) -> None:
+        """Revoke the tokens of ``sub`` issued at or before ``before`` until ``exp``."""
+
+    @abstractmethod
+    async def subjects_since(self, last_id: int, now: float) -> list[tuple]:
+        """(id, sub, before) subject rows added after ``last_id`` still in force."""
+
+    @abstractmethod
+    async def purge(self, before: float) -> int:
+        """Delete entries that expired before ``before``."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryRevocationStore(RevocationStore):
+    """Process-local dict; for tests and single-worker development only."""
+
+    def __init__(self):
+        # jti -> (id, exp, exp_known)
+        self._rows: dict[str, tuple[int, float, bool]] = {}
+        self._next_id = 1
+        self._subjects: list[tuple[int, str, float, float]] = []
+
+    async def add(
+        self,
+        jti: str,
+        exp: float,
+        sub: Optional[str] = None,
+        exp_known: bool = True,
+    ) -> bool:
+        if jti in self._rows:
+            return False
+        self._rows[jti] = (self._next_id, exp, exp_known)
+        self._next_id += 1
+        return True
+
+    async def contains(self, jti: str) -> bool:
+        return jti in self._rows
+
+    async def since(self, last_id: int, now: float) -> list[tuple]:
+        return sorted(
+            (row_id, jti, exp, exp_known)
+            for jti, (row_id, exp, exp_known) in self._rows.items()
+            if row_id > last_id and exp > now
+        )
+
+    async def add_subject(self, sub: str, before: float, exp: float) -> None:
+        self._subjects.append((len(self._subjects) + 1, sub, before, exp))
+
+    async def subjects_since(self, last_id: int, now: float) -> list[tuple]:
+        return [
+            (row_id, sub, before)
+            for row_id, sub, before, exp in self._subjects[last_id:]
+            if exp > now
+        ]
+
+    async def purge(self, before: float) -> int:
+        expired = [jti for jti, (_, exp, _) in self._rows.items() if exp <= before]
+        for jti in expired:
+            del self._rows[jti]
+        return len(expired)
+
+
+class SQLiteRevocationStore(RevocationStore):
+    """
+    SQLite table shared by every worker on the host. Lookups are rare (Bloom
+    positives only), so a single connection on one I/O thread is enough.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            jti TEXT NOT NULL,
+            exp REAL NOT NULL,
+            exp_known INTEGER NOT NULL DEFAULT 1,
+            sub TEXT,
+            revoked_at REAL NOT NULL
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_revoked_tokens_jti "
+        "ON revoked_tokens (jti)",
+        "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_exp ON revoked_tokens (exp)",
+        """
+        CREATE TABLE IF NOT EXISTS revoked_subjects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sub TEXT NOT NULL,
+            before REAL NOT NULL,
+            exp REAL NOT NULL
+        )
+        """,
+    )
+    INSERT = (
+        "INSERT OR IGNORE INTO revoked_tokens (jti, exp, exp_known, sub, revoked_at) "
+        "VALUES (?, ?, ?, ?, ?)"
+    )
+    SELECT = "SELECT 1 FROM revoked_tokens WHERE jti = ?"
+    SINCE = (
+        "SELECT id, jti, exp, exp_known FROM revoked_tokens "
+        "WHERE id > ? AND exp > ? ORDER BY id"
+    )
+    PURGE = "DELETE FROM revoked_tokens WHERE exp <= ?"
+    INSERT_SUBJECT = "INSERT INTO revoked_subjects (sub, before, exp) VALUES (?, ?, ?)"
+    SUBJECTS_SINCE = (
+        "SELECT id, sub, before FROM revoked_subjects WHERE id > ? AND exp > ? "
+        "ORDER BY id"
+    )
+    PURGE_SUBJECTS = "DELETE FROM revoked_subjects WHERE exp <= ?"
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path,
+            timeout=busy_timeout,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="revocations")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    async def add(
+        self,
+        jti: str,
+        exp: float,
+        sub: Optional[str] = None,
+        exp_known: bool = True,
+    ) -> bool:
+        def insert():
+            cursor = self._conn.execute(
+                self.INSERT, (jti, exp, int(exp_known), sub, time.time())
+            )
+            return cursor.rowcount == 1
+
+        return await self._run(insert)
+
+    async def contains(self, jti: str) -> bool:
+        return await self._run(
+            lambda: self._conn.execute(self.SELECT, (jti,)).fetchone() is not None
+        )
+
+    async def since(self, last_id: int, now: float) -> list[tuple[int, str, float]]:
+        rows = await self._run(
+            lambda: self._conn.execute(self.SINCE, (last_id, now)).fetchall()
+        )
+        return [(row_id, jti, exp, bool(known)) for row_id, jti, exp, known in rows]
+
+    async def add_subject(self, sub: str, before: float, exp: float) -> None:
+        await self._run(self._conn.execute, self.INSERT_SUBJECT, (sub, before, exp))
+
+    async def subjects_since(self, last_id: int, now: float) -> list[tuple]:
+        return await self._run(
+            lambda: self._conn.execute(self.SUBJECTS_SINCE, (last_id, now)).fetchall()
+        )
+
+    async def purge(self, before: float) -> int:
+        def delete():
+            self._conn.execute(self.PURGE_SUBJECTS, (before,))
+            return self._conn.execute(self.PURGE, (before,)).rowcount
+
+        return await self._run(delete)
+
+    async def close(self) -> None:
+        # Ditutup di thread I/O setelah query yang masih antre; event loop
+        # tidak ikut menunggu thread itu berhenti
+        await self._run(self._conn.close)
+        self._io.shutdown(wait=False)
+
+
+def create_revocation_store_from_env() -> RevocationStore:
+    """REVOCATION_STORE=sqlite|memory (defaults to USER_STORE), REVOCATION_DB_PATH"""
+    backend = os.getenv("REVOCATION_STORE") or os.getenv("USER_STORE", "memory")
+    if backend == "memory":
+        return InMemoryRevocationStore()
+    if backend == "sqlite":
+        return SQLiteRevocationStore(os.getenv("REVOCATION_DB_PATH", "revocations.db"))
+    raise ValueError(f"Unknown REVOCATION_STORE backend: {backend}")
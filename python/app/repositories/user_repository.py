@@ -0,0 +1,214 @@
+"""
+Durable user store for AuthService.
+
+The in-process dict loses every account on restart and cannot be shared
+between uvicorn workers. ``SQLiteUserRepository`` (USER_STORE=sqlite) keeps
+users in one file with a unique index on ``username``. It needs a writable
+USER_DB_PATH, so it is opt-in: ``InMemoryUserRepository`` stays the default,
+which also runs on read-only serverless filesystems.
+"""
+
+import asyncio
+import itertools
+import os
+import queue
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+
+class DuplicateUserError(ValueError):
+    pass
+
+
+class UserRepository(ABC):
+    """Storage for username -> password hash used by AuthService."""
+
+    async def exists(self, username: str) -> bool:
+        return await self.find_password_hash(username) is not None
+
+    @abstractmethod
+    async def find_password_hash(self, username: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    async def create(self, username: str, password_hash: bytes) -> None:
+        """Insert a new user; raises DuplicateUserError if the name is taken."""
+
+    @abstractmethod
+    async def bulk_import(
+        self, users: Iterable[tuple[str, bytes]], batch_size: int = 50000
+    ) -> dict:
+        """Insert many (username, password_hash) rows, skipping existing names."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryUserRepository(UserRepository):
+    """Process-local dict; for tests and single-worker development only."""
+
+    def __init__(self):
+        self._users: dict[str, bytes] = {}
+
+    async def find_password_hash(self, username: str) -> Optional[bytes]:
+        return self._users.get(username)
+
+    async def create(self, username: str, password_hash: bytes) -> None:
+        if username in self._users:
+            raise DuplicateUserError("Username already exists")
+        self._users[username] = password_hash
+
+    async def bulk_import(
+        self, users: Iterable[tuple[str, bytes]], batch_size: int = 50000
+    ) -> dict:
+        inserted = skipped = 0
+        for username, password_hash in users:
+            if username in self._users:
+                skipped += 1
+            else:
+                self._users[username] = password_hash
+                inserted += 1
+        return {"inserted": inserted, "skipped": skipped}
+
+
+class SQLiteUserRepository(UserRepository):
+    """
+    SQLite store shared by every uvicorn worker on the host.
+
+    WAL mode lets readers proceed while a writer commits, and the unique index
+    keeps username lookups at a few B-tree pages even at 10M rows. Queries run
+    on a small dedicated thread pool, one pooled connection per thread, so
+    they never block the event loop. The SQL strings are constants, so
+    sqlite3's per-connection statement cache keeps them prepared.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            password_hash BLOB NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+    )
+    SELECT_HASH = "SELECT password_hash FROM users WHERE username = ?"
+    INSERT_USER = (
+        "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)"
+    )
+    IMPORT_USER = (
+        "INSERT OR IGNORE INTO users (username, password_hash, created_at) "
+        "VALUES (?, ?, ?)"
+    )
+
+    def __init__(self, path: str, pool_size: int = 4, busy_timeout: float = 5.0):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all: list[sqlite3.Connection] = []
+        self._io = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="userdb")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+        for _ in range(pool_size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=64,
+            isolation_level=None,  # autocommit; transactions are explicit
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        self._all.append(conn)
+        return conn
+
+    async def _run(self, fn, *args):
+        def call():
+            conn = self._connections.get()
+            try:
+                return fn(conn, *args)
+            finally:
+                self._connections.put(conn)
+
+        return await asyncio.get_running_loop().run_in_executor(self._io, call)
+
+    async def find_password_hash(self, username: str) -> Optional[bytes]:
+        def query(conn: sqlite3.Connection):
+            row = conn.execute(self.SELECT_HASH, (username,)).fetchone()
+            return bytes(row[0]) if row else None
+
+        return await self._run(query)
+
+    async def create(self, username: str, password_hash: bytes) -> None:
+        def insert(conn: sqlite3.Connection):
+            try:
+                conn.execute(self.INSERT_USER, (username, password_hash, time.time()))
+            except sqlite3.IntegrityError:
+                raise DuplicateUserError("Username already exists")
+
+        await self._run(insert)
+
+    async def bulk_import(
+        self, users: Iterable[tuple[str, bytes]], batch_size: int = 50000
+    ) -> dict:
+        """
+        Import in transactions of ``batch_size`` rows with INSERT OR IGNORE, so
+        a migration can be re-run after a partial failure.
+        """
+
+        def load(conn: sqlite3.Connection):
+            inserted = total = 0
+            rows = iter(users)
+            now = time.time()
+            while True:
+                batch = [
+                    (username, password_hash, now)
+                    for username, password_hash in itertools.islice(rows, batch_size)
+                ]
+                if not batch:
+                    break
+                before = conn.total_changes
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(self.IMPORT_USER, batch)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                inserted += conn.total_changes - before
+                total += len(batch)
+            return {"inserted": inserted, "skipped": total - inserted}
+
+        return await self._run(load)
+
+    async def close(self) -> None:
+        # Query yang masih berjalan (mis. bulk_import) ditunggu di thread lain,
+        # bukan di event loop
+        await asyncio.to_thread(self._io.shutdown, wait=True)
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
+
+
+def create_user_repository_from_env() -> UserRepository:
+    """USER_STORE=memory|sqlite, USER_DB_PATH, USER_DB_POOL_SIZE"""
+    backend = os.getenv("USER_STORE", "memory")
+    if backend == "memory":
+        return InMemoryUserRepository()
+    if backend == "sqlite":
+        return SQLiteUserRepository(
+            os.getenv("USER_DB_PATH", "users.db"),
+            pool_size=int(os.getenv("USER_DB_POOL_SIZE", "4")),
+        )
+    raise ValueError(f"Unknown USER_STORE backend: {backend}")
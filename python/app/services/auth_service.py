@@ -1,7 +1,9 @@
 import os
-import bcrypt
+import secrets
+import time
 import jwt
 from datetime import datetime, timedelta
+from typing import Optional
 from ..models.schemas import (
     User,
     LoginResponse,
@@ -11,70 +13,197 @@ from ..models.schemas import (
     VerifyPasswordResponse,
     RefreshTokenRequest,
     RefreshTokenResponse,
+    LogoutAllResponse,
     MessageResponse,
 )
+from ..repositories.user_repository import (
+    DuplicateUserError,
+    InMemoryUserRepository,
+    UserRepository,
+)
+from ..utils import jobs
+from ..utils.revocation import RevocationList
+from ..utils.sessions import SessionStore
+from ..utils.token_cache import VerifiedTokenCache
+from ..utils.verify_cache import PasswordVerifyCache
+from ..utils.executor import (
+    CryptoExecutor,
+    ExecutorSaturatedError,
+    get_default_executor,
+)
+
+REFRESH_TOKEN_LIFETIME = timedelta(days=7)
 
 
 class AuthService:
-    def __init__(self):
-        # In production, use a proper database
-        self.users = {}
-        self.secret_key = os.environ.get("JWT_SECRET_KEY", os.urandom(32).hex())
-        self.algorithm = "HS512"
+    def __init__(
+        self,
+        executor: Optional[CryptoExecutor] = None,
+        users: Optional[UserRepository] = None,
+        token_cache: Optional[VerifiedTokenCache] = None,
+        verify_cache: Optional[PasswordVerifyCache] = None,
+        secret_key: Optional[str] = None,
+        algorithm: str = "HS256",
+        revocations: Optional[RevocationList] = None,
+        sessions: Optional[SessionStore] = None,
+        rotate_refresh_tokens: bool = False,
+    ):
+        self.users = users or InMemoryUserRepository()
+        self.executor = executor or get_default_executor()
+        # Must match the secret/algorithm main.py verifies refresh tokens with
+        self.secret_key = secret_key or os.environ.get(
+            "JWT_SECRET_KEY", os.urandom(32).hex()
+        )
+        self.algorithm = algorithm
+        self.token_cache = token_cache or VerifiedTokenCache.from_env()
+        self.verify_cache = verify_cache or PasswordVerifyCache.from_env()
+        # None: tokens cannot be revoked (no store configured)
+        self.revocations = revocations
+        self.sessions = sessions
+        # Rotasi: tiap refresh token hanya bisa dipakai sekali
+        self.rotate_refresh_tokens = rotate_refresh_tokens
 
     async def register(self, user: User) -> MessageResponse:
-        if user.username in self.users:
+        # Cheap indexed lookup first so duplicates never cost a bcrypt hash
+        if await self.users.exists(user.username):
             raise ValueError("Username already exists")
 
         # Hash the password before storing
-        hashed = bcrypt.hashpw(user.password.encode(), bcrypt.gensalt())
-        self.users[user.username] = hashed
+        hashed = await self.executor.run(
+            "bcrypt", jobs.bcrypt_hash, user.password.encode()
+        )
+        try:
+            await self.users.create(user.username, hashed)
+        except DuplicateUserError:
+            raise ValueError("Username already exists")
+        # Cached matches against any previous hash of this user are stale now
+        self.verify_cache.invalidate_user(user.username)
         return MessageResponse(message="User registered successfully")
 
     async def login(self, user: User) -> LoginResponse:
-        stored_hash = self.users.get(user.username)
+        stored_hash = await self.users.find_password_hash(user.username)
 
-        if not stored_hash or not bcrypt.checkpw(user.password.encode(), stored_hash):
+        if not stored_hash or not await self.verify_cache.verify(
+            "bcrypt",
+            user.password.encode(),
+            stored_hash,
+            lambda: self.executor.run(
+                "bcrypt", jobs.bcrypt_check, user.password.encode(), stored_hash
+            ),
+            username=user.username,
+        ):
             raise ValueError("Invalid credentials")
 
         # Generate tokens
         access_token = self.create_access_token(
             data={"sub": user.username}, expires_delta=timedelta(minutes=15)
         )
-        refresh_token = self.create_access_token(
-            data={"sub": user.username, "refresh": True},
-            expires_delta=timedelta(days=7),
-        )
+        refresh_token = self.issue_refresh_token(user.username)
         return LoginResponse(access_token=access_token, refresh_token=refresh_token)
 
+    def issue_refresh_token(self, sub: str, replaces: Optional[str] = None) -> str:
+        """New refresh token for ``sub``; its session replaces ``replaces`` if given."""
+        jti = secrets.token_urlsafe(16)
+        token = self.create_access_token(
+            data={"sub": sub, "refresh": True, "jti": jti},
+            expires_delta=REFRESH_TOKEN_LIFETIME,
+        )
+        if self.sessions is not None:
+            exp = time.time() + REFRESH_TOKEN_LIFETIME.total_seconds()
+            if replaces:
+                self.sessions.rotate(replaces, jti, sub, exp)
+            else:
+                self.sessions.add(jti, sub, exp)
+        return token
+
+    async def rotate_refresh_token(self, payload: dict) -> RefreshTokenResponse:
+        """
+        Trade the (verified, unrevoked) refresh token with these claims for a
+        new access token and a new refresh token. The old one stops working.
+        """
+        jti = payload.get("jti")
+        if not jti:
+            raise ValueError("Invalid refresh token")
+        # Hanya pemanggil pertama yang berhasil mencabut jti lama; penyimpan
+        # revocation dibagi antar worker, jadi ini berlaku di semua worker
+        if self.revocations is not None:
+            first = await self.revocations.revoke(
+                jti, payload["exp"], payload["sub"]
+            )
+        else:
+            first = self.sessions is not None and self.sessions.get(jti) is not None
+        if not first:
+            raise ValueError("Refresh token revoked")
+
+        access_token = self.create_access_token(
+            data={"sub": payload["sub"]}, expires_delta=timedelta(minutes=30)
+        )
+        refresh_token = self.issue_refresh_token(payload["sub"], replaces=jti)
+        return RefreshTokenResponse(
+            access_token=access_token, refresh_token=refresh_token
+        )
+
+    async def logout_all(self, sub: str) -> LogoutAllResponse:
+        """End every session of ``sub``: all its tokens issued until now are revoked."""
+        ended = self.sessions.remove_user(sub) if self.sessions is not None else []
+        revoked_before = None
+        if self.revocations is not None:
+            revoked_before = await self.revocations.revoke_subject(sub)
+        return LogoutAllResponse(
+            sub=sub, sessions_ended=len(ended), revoked_before=revoked_before
+        )
+
     async def hash_password(self, request: HashPasswordRequest) -> HashPasswordResponse:
-        hashed = bcrypt.hashpw(request.password.encode(), bcrypt.gensalt())
+        hashed = await self.executor.run(
+            "bcrypt", jobs.bcrypt_hash, request.password.encode()
+        )
         return HashPasswordResponse(hash=hashed.decode())
 
     async def verify_password(
         self, request: VerifyPasswordRequest
     ) -> VerifyPasswordResponse:
         try:
-            valid = bcrypt.checkpw(request.password.encode(), request.hash.encode())
+            valid = await self.verify_cache.verify(
+                "bcrypt",
+                request.password.encode(),
+                request.hash.encode(),
+                lambda: self.executor.run(
+                    "bcrypt",
+                    jobs.bcrypt_check,
+                    request.password.encode(),
+                    request.hash.encode(),
+                ),
+            )
             return VerifyPasswordResponse(valid=valid)
+        except ExecutorSaturatedError:
+            raise
         except Exception:
             return VerifyPasswordResponse(valid=False)
 
     async def refresh_token(self, request: RefreshTokenRequest) -> RefreshTokenResponse:
         try:
-            payload = jwt.decode(
+            payload = self.token_cache.decode(
                 request.refresh_token, self.secret_key, algorithms=[self.algorithm]
             )
             if not payload.get("refresh"):
                 raise ValueError("Invalid refresh token")
+            if self.revocations is not None and await self.revocations.is_revoked(
+                payload
+            ):
+                raise ValueError("Refresh token revoked")
+            if self.rotate_refresh_tokens:
+                return await self.rotate_refresh_token(payload)
 
-            access_token = self.create_access_token(
-                data={"sub": payload["sub"]}, expires_delta=timedelta(minutes=30)
+            access_token = self.token_cache.mint_once(
+                request.refresh_token,
+                lambda: self.create_access_token(
+                    data={"sub": payload["sub"]}, expires_delta=timedelta(minutes=30)
+                ),
             )
             return RefreshTokenResponse(access_token=access_token)
         except jwt.ExpiredSignatureError:
             raise ValueError("Refresh token expired")
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise ValueError("Invalid refresh token")
 
     def create_access_token(self, data: dict, expires_delta: timedelta = None) -> str:
@@ -83,6 +212,10 @@ class AuthService:
             expire = datetime.utcnow() + expires_delta
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
+        # iat pecahan detik (NumericDate boleh pecahan) dari jam yang sama dengan
+        # cutoff logout-all: login di detik yang sama tidak ikut tercabut
+        to_encode.update({"exp": expire, "iat": time.time()})
+        # jti membuat token bisa dicabut satu per satu, iat per pengguna
+        to_encode.setdefault("jti", secrets.token_urlsafe(16))
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
@@ -2,13 +2,36 @@ import os
 import secrets
 import hashlib
 import base64
+import asyncio
+from typing import AsyncIterator, Optional
 from kyber_py.ml_kem import ML_KEM_512
 
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from ..models.schemas import EncryptRequest, DecryptRequest
+from ..models.schemas import (
+    BatchEncryptRequest,
+    BatchEncryptResponse,
+    BatchEncryptResult,
+    BatchDecryptRequest,
+    BatchDecryptResponse,
+    BatchDecryptResult,
+)
 from ..models.schemas import AesEncryptPasswordRequest, AesEncryptPasswordResponse
+from ..utils import jobs
+from ..utils.executor import (
+    CryptoExecutor,
+    ExecutorSaturatedError,
+    get_default_executor,
+)
+from ..utils.key_cache import DerivedKey, DerivedKeyCache
+from ..utils.metrics import timed
+from ..utils.kem_pool import KemKeyPool
+from ..utils.nonces import NonceLimitError, NonceManager, default_nonce_manager
+from ..utils import envelope, stream_aead
+from ..utils.hybrid_session import HybridSessionReceiver, HybridSessionSender
 
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -22,9 +45,54 @@ from cryptography.hazmat.primitives import padding
 
 
 class CryptoService:
-    def __init__(self):
-        self.salt = os.urandom(16)  # Generate a random salt for each instance
+    def __init__(
+        self,
+        executor: Optional[CryptoExecutor] = None,
+        key_cache: Optional[DerivedKeyCache] = None,
+        kem_pool: Optional[KemKeyPool] = None,
+        nonces: Optional[NonceManager] = None,
+    ):
+        # Salt acak per instance; ikut disimpan di setiap envelope sehingga
+        # worker lain (atau proses setelah restart) tetap bisa mendekripsi
+        self.salt = os.urandom(16)
+        self.kdf_iterations = 100000
         self.kyber_kem = ML_KEM_512  # Initialize Kyber KEM instance
+        self.executor = executor or get_default_executor()
+        self.key_cache = key_cache or DerivedKeyCache.from_env()
+        self.kem_pool = kem_pool or KemKeyPool.from_env(self.executor)
+        self.nonces = nonces or default_nonce_manager
+        self.rekeys = 0
+        # Batas untuk endpoint batch
+        self.batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+        self.batch_max_bytes = int(os.getenv("BATCH_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.stream_chunk_size = int(os.getenv("STREAM_CHUNK_SIZE", str(64 * 1024)))
+        # Salt dan iterasi envelope berasal dari pengirim: tiap salt baru berarti
+        # satu PBKDF2, jadi iterasi dibatasi ke daftar ini dan salt per batch
+        self.envelope_iterations = {self.kdf_iterations} | {
+            int(value)
+            for value in os.getenv("ENVELOPE_ACCEPTED_ITERATIONS", "").split(",")
+            if value.strip()
+        }
+        self.batch_max_salts = int(os.getenv("BATCH_MAX_SALTS", "16"))
+        # Mode sesi hybrid: satu enkapsulasi per penerima per jendela rotasi
+        session_max_messages = int(os.getenv("HYBRID_SESSION_MAX_MESSAGES", "10000"))
+        session_max_age = float(os.getenv("HYBRID_SESSION_MAX_AGE", "3600"))
+        self.hybrid_sender = HybridSessionSender(
+            self._kem_encapsulate,
+            max_messages=session_max_messages,
+            max_bytes=int(os.getenv("HYBRID_SESSION_MAX_BYTES", str(1024**3))),
+            max_age_seconds=session_max_age,
+        )
+        self.hybrid_receiver = HybridSessionReceiver(
+            self._kem_decapsulate,
+            max_messages=session_max_messages,
+            max_age_seconds=session_max_age,
+            max_sessions=int(os.getenv("HYBRID_SESSION_CACHE_SIZE", "1024")),
+        )
+
+    def rotate_salt(self) -> None:
+        # Envelope lama tetap bisa dibuka karena salt-nya ikut tersimpan
+        self.salt = os.urandom(16)
 
     def derive_key(self, key: str, salt: bytes = None) -> tuple[bytes, bytes]:
         if salt is None:
@@ -38,9 +106,68 @@ class CryptoService:
         derived_key = kdf.derive(key.encode())
         return derived_key, salt
 
+    async def derive_key_async(
+        self, key: str, salt: bytes = None, iterations: int = 100000
+    ) -> tuple[bytes, bytes]:
+        # Same derivation as derive_key, but run on the crypto executor
+        if salt is None:
+            salt = self.salt
+        derived_key = await self.executor.run(
+            "pbkdf2", jobs.pbkdf2_sha256, key.encode(), salt, iterations
+        )
+        return derived_key, salt
+
+    async def _cipher_for(
+        self, key: str, salt: bytes = None, iterations: int = 100000
+    ) -> AESGCM:
+        # AESGCM siap pakai dari cache; PBKDF2 hanya dijalankan sekali per (kunci, salt)
+        if salt is None:
+            salt = self.salt
+        entry = await self.key_cache.get_or_derive(
+            key.encode(),
+            salt,
+            iterations,
+            lambda: self._derive_checked(key, salt, iterations),
+        )
+        return entry.aesgcm
+
+    async def _encryption_key(self, key: str) -> tuple[DerivedKey, bytes]:
+        """The cached key for new envelopes and the salt it was derived with."""
+        # Salt dibaca sekali: re-key di tengah batch tidak boleh membuat header
+        # memuat salt yang berbeda dari kunci yang dipakai
+        salt = self.salt
+        entry = await self.key_cache.get_or_derive(
+            key.encode(),
+            salt,
+            self.kdf_iterations,
+            lambda: self._derive_checked(key, salt, self.kdf_iterations),
+        )
+        if entry.usage is None:
+            entry.usage = self.nonces.usage(entry.key)
+        return entry, salt
+
+    async def _rekey(self, key: str, salt: bytes) -> tuple[DerivedKey, bytes]:
+        """
+        The key derived with ``salt`` has sealed as many messages as GCM
+        safely allows: new envelopes move to a fresh salt, and so a fresh key.
+        """
+        if self.salt == salt:
+            self.rotate_salt()
+            self.rekeys += 1
+        return await self._encryption_key(key)
+
+    async def _derive_checked(
+        self, key: str, salt: bytes, iterations: int = 100000
+    ) -> bytes:
+        key_bytes, _ = await self.derive_key_async(key, salt, iterations)
+        # Periksa panjang kunci setelah derivasi
+        if len(key_bytes) != 32:
+            raise ValueError("Derived key is not 256-bit.")
+        return key_bytes
+
     async def generate_kem_key_pair(self) -> dict:
-        # Gunakan self.kyber_kem, bukan variabel yang tidak didefinisikan
-        public_key, private_key = self.kyber_kem.keygen()
+        # Pasangan kunci diambil dari pool yang diisi di background
+        public_key, private_key = await self.kem_pool.acquire()
 
         # Anda bisa mengembalikan dalam bentuk hex/base64 agar lebih mudah disimpan atau dikirim
         return {"publicKey": public_key.hex(), "privateKey": private_key.hex()}
@@ -52,70 +179,131 @@ class CryptoService:
         public_key = hashlib.sha256(private_key.encode()).hexdigest()
         return {"publicKey": public_key, "privateKey": private_key}
 
-    async def encrypt_data(self, request: EncryptRequest) -> dict:
-        try:
-            iv = os.urandom(
-                12
-            )  # IV 12 byte (96 bit) adalah standar yang baik untuk GCM
-            key_bytes, _ = self.derive_key(request.key)  # Mendapatkan kunci 256-bit
-
-            # Periksa panjang kunci setelah derivasi
-            if len(key_bytes) != 32:
-                raise ValueError("Derived key is not 256-bit.")
+    def _seal(self, entry: DerivedKey, salt: bytes, data: bytes) -> bytes:
+        # IV 12 byte (96 bit) adalah standar yang baik untuk GCM; dihitung per kunci
+        nonce = self.nonces.next(entry.usage)
+        header = envelope.pack_header(
+            envelope.KDF_PBKDF2_SHA256, self.kdf_iterations, salt, nonce
+        )
+        with timed("aes_gcm_encrypt", len(data)):
+            # Header envelope dipakai sebagai AAD
+            return header + entry.aesgcm.encrypt(nonce, data, header)
 
-            aesgcm = AESGCM(key_bytes)  # AESGCM dengan kunci 256-bit
-            data_bytes = request.data.encode()
-            ct = aesgcm.encrypt(
-                iv, data_bytes, None
-            )  # 'None' berarti tidak ada Additional Authenticated Data (AAD)
+    async def encrypt_bytes(self, data: bytes, key: str) -> bytes:
+        """AES-GCM over raw bytes; returns a self-describing ``utils.envelope``."""
+        entry, salt = await self._encryption_key(key)
+        try:
+            return self._seal(entry, salt, data)
+        except NonceLimitError:
+            entry, salt = await self._rekey(key, salt)
+            return self._seal(entry, salt, data)
+
+    async def _open(self, sealed: envelope.Envelope, key: str) -> bytes:
+        # Kunci diturunkan dari salt dan parameter yang tertanam di envelope
+        salt, iterations = bytes(sealed.salt), sealed.iterations
+        if iterations not in self.envelope_iterations:
+            raise envelope.EnvelopeError(f"KDF iterations not accepted: {iterations}")
+        entry = await self.key_cache.get_or_derive(
+            key.encode(),
+            salt,
+            iterations,
+            lambda: self._derive_checked(key, salt, iterations),
+            admit=False,
+        )
+        with timed("aes_gcm_decrypt", len(sealed.sealed) - envelope.TAG_SIZE):
+            plaintext = entry.aesgcm.decrypt(sealed.nonce, sealed.sealed, sealed.header)
+        # Hanya kunci yang terbukti membuka envelope yang masuk cache
+        self.key_cache.admit(key.encode(), salt, iterations, entry)
+        return plaintext
 
-            ciphertext, tag = ct[:-16], ct[-16:]  # Tag GCM adalah 16 byte (128 bit)
+    async def decrypt_bytes(
+        self,
+        encrypted: bytes,
+        key: str,
+        iv: Optional[bytes] = None,
+        tag: Optional[bytes] = None,
+    ) -> bytes:
+        """
+        Decrypt an envelope, or a legacy (ciphertext, iv, tag) triple produced
+        with this instance's salt when ``iv`` and ``tag`` are given.
+        """
+        legacy = iv is not None and tag is not None
+        if envelope.looks_like_envelope(encrypted):
+            try:
+                return await self._open(envelope.parse(encrypted), key)
+            except (envelope.EnvelopeError, InvalidTag):
+                # Ciphertext lama bisa kebetulan diawali magic yang sama
+                if not legacy:
+                    raise
+        if not legacy:
+            raise ValueError("iv and tag are required for legacy ciphertexts")
+
+        aesgcm = await self._cipher_for(key)  # AESGCM dengan kunci 256-bit
+        # Gabungkan ciphertext dengan tag untuk dekripsi GCM
+        ct_with_tag = bytes(encrypted) + bytes(tag)
+        with timed("aes_gcm_decrypt", len(encrypted)):
+            return aesgcm.decrypt(iv, ct_with_tag, None)  # 'None' untuk AAD
 
+    async def encrypt_data(self, request: EncryptRequest) -> dict:
+        try:
+            sealed = await self.encrypt_bytes(request.data.encode(), request.key)
+            parsed = envelope.parse(sealed)
+            # iv dan tag tetap dikirim agar klien lama tidak berubah
             return {
-                "encrypted": base64.b64encode(ciphertext).decode("utf-8"),
-                "iv": base64.b64encode(iv).decode("utf-8"),
-                "tag": base64.b64encode(tag).decode("utf-8"),
+                "encrypted": base64.b64encode(sealed).decode("utf-8"),
+                "iv": base64.b64encode(parsed.nonce).decode("utf-8"),
+                "tag": base64.b64encode(parsed.tag).decode("utf-8"),
             }
+        except ExecutorSaturatedError:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to encrypt data: {str(e)}")
 
     async def decrypt_data(self, request: DecryptRequest) -> dict:
         try:
-            ciphertext = base64.b64decode(request.encrypted)
-            iv = base64.b64decode(request.iv)
-            tag = base64.b64decode(request.tag)
-            key_bytes, _ = self.derive_key(request.key)  # Mendapatkan kunci 256-bit
-
-            # Periksa panjang kunci setelah derivasi
-            if len(key_bytes) != 32:
-                raise ValueError("Derived key is not 256-bit for decryption.")
-
-            aesgcm = AESGCM(key_bytes)  # AESGCM dengan kunci 256-bit
-            ct_with_tag = (
-                ciphertext + tag
-            )  # Gabungkan ciphertext dengan tag untuk dekripsi GCM
-
-            decrypted = aesgcm.decrypt(iv, ct_with_tag, None)  # 'None' untuk AAD
+            decrypted = await self.decrypt_bytes(
+                base64.b64decode(request.encrypted),
+                request.key,
+                base64.b64decode(request.iv) if request.iv else None,
+                base64.b64decode(request.tag) if request.tag else None,
+            )
             return {"decrypted": decrypted.decode("utf-8")}
+        except ExecutorSaturatedError:
+            raise
         except Exception as e:
             # Exception bisa terjadi jika tag tidak cocok (gagal autentikasi)
             raise ValueError(f"Failed to decrypt data: {str(e)}")
 
-    async def hybrid_encrypt(
-        self, data_to_encrypt: str, kyber_public_key_b64: str
-    ) -> dict:
-        public_key = base64.b64decode(kyber_public_key_b64)
-
+    @staticmethod
+    def _decode_kem_key(value: str) -> bytes:
+        # /crypto/key/kem mengembalikan hex; base64 juga diterima
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return base64.b64decode(value)
+
+    async def hybrid_encrypt_bytes(
+        self, data: bytes, public_key: bytes
+    ) -> tuple[memoryview, bytes, memoryview, bytes]:
+        """Returns (ciphertext, iv, tag, encapsulated_key) as raw bytes."""
         # Langkah 1: Enkapsulasi → dapatkan shared_secret & ciphertext (encapsulated key)
-        encapsulated_key, shared_secret = self.kyber_kem.encapsulate(public_key)
+        # Kunci publik yang sama dipakai ulang dari cache (t_hat dan matriks A sudah diurai)
+        shared_secret, encapsulated_key = await self._kem_encapsulate(public_key)
 
         # Langkah 2: Enkripsi simetris pakai AES-GCM
-        iv = os.urandom(12)
+        # Kunci baru per pesan: nonce cukup segar, tidak perlu dihitung
+        iv = self.nonces.next()
         aesgcm = AESGCM(shared_secret)
-        data_bytes = data_to_encrypt.encode("utf-8")
-        ct_aes = aesgcm.encrypt(iv, data_bytes, None)
-        ciphertext_aes, tag = ct_aes[:-16], ct_aes[-16:]
+        with timed("aes_gcm_encrypt", len(data)):
+            ct_aes = memoryview(aesgcm.encrypt(iv, data, None))
+        return ct_aes[:-16], iv, ct_aes[-16:], encapsulated_key
 
+    async def hybrid_encrypt(
+        self, data_to_encrypt: str, kyber_public_key_b64: str
+    ) -> dict:
+        ciphertext_aes, iv, tag, encapsulated_key = await self.hybrid_encrypt_bytes(
+            data_to_encrypt.encode("utf-8"), self._decode_kem_key(kyber_public_key_b64)
+        )
         return {
             "encrypted_data": base64.b64encode(ciphertext_aes).decode(),
             "iv": base64.b64encode(iv).decode(),
@@ -123,32 +311,251 @@ class CryptoService:
             "encapsulated_key": base64.b64encode(encapsulated_key).decode(),
         }
 
-    async def hybrid_decrypt(
+    async def _kem_encapsulate(self, public_key: bytes) -> tuple[bytes, bytes]:
+        return await self.executor.run("kem_encaps", jobs.kem_encapsulate, public_key)
+
+    async def _kem_decapsulate(self, private_key: bytes, encapsulated_key: bytes) -> bytes:
+        return await self.executor.run(
+            "kem_decaps", jobs.kem_decapsulate, private_key, encapsulated_key
+        )
+
+    async def hybrid_session_encrypt(
+        self, data_to_encrypt: str, kyber_public_key: str
+    ) -> dict:
+        public_key = self._decode_kem_key(kyber_public_key)
+        data_bytes = data_to_encrypt.encode("utf-8")
+
+        # Kunci per pesan diturunkan dengan HKDF dari shared secret sesi + counter
+        key, header, encapsulated_key = await self.hybrid_sender.next_message(
+            public_key, len(data_bytes)
+        )
+        iv = self.nonces.next()
+        with timed("aes_gcm_encrypt", len(data_bytes)):
+            ct_aes = AESGCM(key).encrypt(iv, data_bytes, header)
+
+        return {
+            "encrypted": base64.b64encode(ct_aes[:-16]).decode(),
+            "iv": base64.b64encode(iv).decode(),
+            "tag": base64.b64encode(ct_aes[-16:]).decode(),
+            "session": base64.b64encode(header).decode(),
+            "encapsulatedKey": (
+                base64.b64encode(encapsulated_key).decode()
+                if encapsulated_key is not None
+                else None
+            ),
+        }
+
+    async def hybrid_session_decrypt(
         self,
         encrypted_data_b64: str,
         iv_b64: str,
         tag_b64: str,
-        encapsulated_key_b64: str,
-        kyber_private_key_b64: str,
+        session_b64: str,
+        kyber_private_key: str,
+        encapsulated_key_b64: Optional[str] = None,
     ) -> dict:
-        private_key = base64.b64decode(kyber_private_key_b64)
-        encapsulated_key = base64.b64decode(encapsulated_key_b64)
+        private_key = self._decode_kem_key(kyber_private_key)
+        header = base64.b64decode(session_b64)
+        encapsulated_key = (
+            base64.b64decode(encapsulated_key_b64) if encapsulated_key_b64 else None
+        )
 
+        # Shared secret sesi di-cache per session id, dekapsulasi hanya sekali
+        key = await self.hybrid_receiver.message_key(
+            private_key, header, encapsulated_key
+        )
+        ct_with_tag = base64.b64decode(encrypted_data_b64) + base64.b64decode(tag_b64)
+        try:
+            with timed("aes_gcm_decrypt", len(ct_with_tag) - 16):
+                decrypted_bytes = AESGCM(key).decrypt(
+                    base64.b64decode(iv_b64), ct_with_tag, header
+                )
+        except InvalidTag:
+            raise ValueError("Authentication failed")
+        return {"decrypted_data": decrypted_bytes.decode("utf-8")}
+
+    async def hybrid_decrypt_bytes(
+        self,
+        ciphertext: bytes,
+        iv: bytes,
+        tag: bytes,
+        encapsulated_key: bytes,
+        private_key: bytes,
+    ) -> bytes:
         # Dapatkan kembali shared secret yang sama
-        shared_secret = self.kyber_kem.decapsulate(encapsulated_key, private_key)
+        shared_secret = await self._kem_decapsulate(private_key, encapsulated_key)
 
         # Dekripsi dengan AES-GCM
-        ciphertext_aes = base64.b64decode(encrypted_data_b64)
-        iv = base64.b64decode(iv_b64)
-        tag = base64.b64decode(tag_b64)
-
         aesgcm = AESGCM(shared_secret)
-        ct_with_tag = ciphertext_aes + tag
-        decrypted_bytes = aesgcm.decrypt(iv, ct_with_tag, None)
+        ct_with_tag = bytes(ciphertext) + bytes(tag)
+        with timed("aes_gcm_decrypt", len(ciphertext)):
+            return aesgcm.decrypt(iv, ct_with_tag, None)
 
+    async def hybrid_decrypt(
+        self,
+        encrypted_data_b64: str,
+        iv_b64: str,
+        tag_b64: str,
+        encapsulated_key_b64: str,
+        kyber_private_key_b64: str,
+    ) -> dict:
+        decrypted_bytes = await self.hybrid_decrypt_bytes(
+            base64.b64decode(encrypted_data_b64),
+            base64.b64decode(iv_b64),
+            base64.b64decode(tag_b64),
+            base64.b64decode(encapsulated_key_b64),
+            self._decode_kem_key(kyber_private_key_b64),
+        )
         return {"decrypted_data": decrypted_bytes.decode("utf-8")}
 
-    def _derive_aes_key_from_password_and_salt(
+    def _check_batch_limits(self, count: int, total_bytes: int) -> None:
+        if count > self.batch_max_items:
+            raise ValueError(
+                f"Batch has {count} items, limit is {self.batch_max_items}"
+            )
+        if total_bytes > self.batch_max_bytes:
+            raise ValueError(
+                f"Batch payload is {total_bytes} bytes, limit is {self.batch_max_bytes}"
+            )
+
+    async def encrypt_batch(self, request: BatchEncryptRequest) -> BatchEncryptResponse:
+        # Satu derivasi kunci untuk seluruh batch, nonce baru untuk setiap item
+        encoded = [item.encode("utf-8") for item in request.items]
+        self._check_batch_limits(len(encoded), sum(len(item) for item in encoded))
+        entry, salt = await self._encryption_key(request.key)
+
+        results = []
+        for index, data_bytes in enumerate(encoded):
+            try:
+                try:
+                    sealed = self._seal(entry, salt, data_bytes)
+                except NonceLimitError:
+                    entry, salt = await self._rekey(request.key, salt)
+                    sealed = self._seal(entry, salt, data_bytes)
+                parsed = envelope.parse(sealed)
+                results.append(
+                    BatchEncryptResult(
+                        encrypted=base64.b64encode(sealed).decode("utf-8"),
+                        iv=base64.b64encode(parsed.nonce).decode("utf-8"),
+                        tag=base64.b64encode(parsed.tag).decode("utf-8"),
+                    )
+                )
+            except Exception as e:
+                results.append(BatchEncryptResult(error=str(e)))
+            if index % 256 == 255:
+                await asyncio.sleep(0)  # beri giliran ke request lain
+        return BatchEncryptResponse(results=results)
+
+    @staticmethod
+    def _envelope_salt(blob: bytes) -> Optional[bytes]:
+        if not envelope.looks_like_envelope(blob):
+            return None
+        try:
+            return bytes(envelope.parse(blob).salt)
+        except envelope.EnvelopeError:
+            return None
+
+    async def decrypt_batch(self, request: BatchDecryptRequest) -> BatchDecryptResponse:
+        self._check_batch_limits(
+            len(request.items), sum(len(item.encrypted) for item in request.items)
+        )
+        # Item dengan salt yang sama memakai satu derivasi (cache)
+        salts: set[bytes] = set()
+
+        results = []
+        for index, item in enumerate(request.items):
+            try:
+                encrypted = base64.b64decode(item.encrypted)
+                salt = self._envelope_salt(encrypted)
+                if salt is not None and salt not in salts:
+                    if len(salts) >= self.batch_max_salts:
+                        raise ValueError(
+                            f"Batch uses more than {self.batch_max_salts} salts"
+                        )
+                    salts.add(salt)
+                decrypted = await self.decrypt_bytes(
+                    encrypted,
+                    request.key,
+                    base64.b64decode(item.iv) if item.iv else None,
+                    base64.b64decode(item.tag) if item.tag else None,
+                )
+                results.append(BatchDecryptResult(decrypted=decrypted.decode("utf-8")))
+            except InvalidTag:
+                results.append(BatchDecryptResult(error="Authentication failed"))
+            except Exception as e:
+                results.append(BatchDecryptResult(error=str(e)))
+            if index % 256 == 255:
+                await asyncio.sleep(0)
+        return BatchDecryptResponse(results=results)
+
+    async def encrypt_stream(
+        self, chunks: AsyncIterator[bytes], key: str, chunk_size: int = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Encrypt an async byte stream into the segmented format of
+        ``utils.stream_aead``. The key is derived with a fresh per-stream salt
+        before the first byte is produced, so KDF errors surface up front.
+        """
+        salt = os.urandom(16)
+        key_bytes = await self._derive_checked(key, salt)
+        encryptor = stream_aead.StreamEncryptor(
+            key_bytes, salt, chunk_size or self.stream_chunk_size
+        )
+
+        async def generate():
+            yield encryptor.header
+            async for piece in chunks:
+                out = encryptor.update(piece)
+                if out:
+                    yield out
+            yield encryptor.finalize()
+
+        return generate()
+
+    async def decrypt_stream(
+        self, chunks: AsyncIterator[bytes], key: str
+    ) -> AsyncIterator[bytes]:
+        """
+        Decrypt a segmented stream, verifying each segment as it arrives.
+        The header and the first segment are checked before returning, so a
+        wrong key or malformed stream raises ValueError instead of producing a
+        truncated response.
+        """
+        reader = chunks.__aiter__()
+        head = bytearray()
+        async for piece in reader:
+            head += piece
+            if len(head) >= stream_aead.HEADER_SIZE:
+                break
+        _, salt, _ = stream_aead.parse_header(bytes(head))
+        key_bytes = await self._derive_checked(key, salt)
+        decryptor = stream_aead.StreamDecryptor(key_bytes, head)
+
+        first = decryptor.update(head[stream_aead.HEADER_SIZE :])
+        eof = False
+        while not first:
+            try:
+                piece = await reader.__anext__()
+            except StopAsyncIteration:
+                eof = True
+                first = decryptor.finalize()
+                break
+            first = decryptor.update(piece)
+
+        async def generate():
+            if first:
+                yield first
+            if eof:
+                return
+            async for piece in reader:
+                out = decryptor.update(piece)
+                if out:
+                    yield out
+            yield decryptor.finalize()
+
+        return generate()
+
+    async def _derive_aes_key_from_password_and_salt(
         self, password: str, salt_hex: str
     ) -> bytes:
         """
@@ -165,13 +572,10 @@ class CryptoService:
                 f"Invalid salt_for_kdf format. Must be hex or base64 decodable: {e}"
             )
 
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,  # 256-bit key
-            salt=salt_bytes,
-            iterations=390000,  # Sesuaikan iterasi, standar NIST >10,000. OWASP >310,000 untuk PBKDF2-SHA256
+        # 256-bit key, 390000 iterasi (standar NIST >10,000. OWASP >310,000 untuk PBKDF2-SHA256)
+        return await self.executor.run(
+            "pbkdf2", jobs.pbkdf2_sha256, password.encode("utf-8"), salt_bytes, 390000
         )
-        return kdf.derive(password.encode("utf-8"))
 
     async def aes_encrypt_password_gcm(
         self, request: AesEncryptPasswordRequest
@@ -183,7 +587,7 @@ class CryptoService:
             )  # Asumsi ini adalah salt dari Argon2id (hex/base64)
             iv_b64 = request.iv_b64
 
-            aes_key = self._derive_aes_key_from_password_and_salt(
+            aes_key = await self._derive_aes_key_from_password_and_salt(
                 password_to_encrypt, salt_for_kdf_str
             )
 
@@ -211,7 +615,7 @@ class CryptoService:
             return AesEncryptPasswordResponse(
                 cipherdata_b64=base64.b64encode(encrypted_blob).decode("utf-8")
             )
-        except ValueError as ve:
+        except (ValueError, ExecutorSaturatedError) as ve:
             raise ve  # Lemparkan kembali ValueError spesifik
         except Exception as e:
             # Log error yang lebih detail di sini jika perlu
@@ -226,7 +630,7 @@ class CryptoService:
             salt_for_kdf_str = request.salt_for_kdf
             iv_b64 = request.iv_b64
 
-            aes_key = self._derive_aes_key_from_password_and_salt(
+            aes_key = await self._derive_aes_key_from_password_and_salt(
                 password_to_encrypt, salt_for_kdf_str
             )
 
@@ -254,5 +658,7 @@ class CryptoService:
             return AesEncryptPasswordResponse(
                 cipherdata_b64=base64.b64encode(ciphertext_bytes).decode("utf-8")
             )
+        except ExecutorSaturatedError:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to AES-CBC encrypt password: {str(e)}")
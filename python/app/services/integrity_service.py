@@ -1,21 +1,69 @@
+import asyncio
 import hmac
 import hashlib
 import base64
+import os
+from collections import deque
+from typing import AsyncIterator, Optional
 from ..models.schemas import SignRequest, VerifyRequest
 from ..models.schemas import GenerateHmacRequest, GenerateHmacResponse
+from ..models.schemas import SignBatchRequest, VerifyBatchRequest
+from ..models.schemas import VerifyChunksRequest
+from ..utils import merkle
+from ..utils.hmac_cache import HmacContextCache, default_hmac_cache
+from ..utils.hmac_cache import hash_constructor, sign_many, verify_many
+from ..utils.executor import CryptoExecutor, get_default_executor
+
+# Names accepted by the streaming sign/verify API. String digestmods take
+# OpenSSL's HMAC; BLAKE2b goes through hmac's generic construction.
+HMAC_ALGORITHMS = {
+    "sha256": "sha256",
+    "sha512": "sha512",
+    "blake2b": hashlib.blake2b,
+}
+# Smaller updates are cheaper inline than a thread hop
+INLINE_UPDATE_MAX = 64 * 1024
+# Bytes of chunks hashed per executor job while building a manifest
+MERKLE_GROUP_BYTES = 4 * 1024 * 1024
+MAX_PROOF_CHUNKS = 4096
+# Batches up to this many items are signed inline, larger ones on the executor
+INLINE_BATCH_ITEMS = 64
+
+
+def new_hmac(key: bytes, algorithm: str = "sha256") -> hmac.HMAC:
+    digestmod = HMAC_ALGORITHMS.get(algorithm)
+    if digestmod is None:
+        raise ValueError(
+            f"Unsupported algorithm: {algorithm} (use {', '.join(HMAC_ALGORITHMS)})"
+        )
+    return hmac.new(key, digestmod=digestmod)
 
 
 class IntegrityService:
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[CryptoExecutor] = None,
+        hmac_cache: Optional[HmacContextCache] = None,
+    ):
         self.hmac_key = (
             b"your-hmac-key"  # In production, use a secure key management system
         )
+        self.executor = executor or get_default_executor()
+        # Konteks HMAC yang sudah menyerap kunci, dipakai ulang per pesan
+        self.hmac_cache = hmac_cache or default_hmac_cache
+        self.max_batch_items = int(os.getenv("SIGN_BATCH_MAX_ITEMS", "10000"))
+        # Body dikumpulkan per blok ini sebelum di-hash di thread executor
+        self.stream_buffer_size = int(
+            os.getenv("SIGN_STREAM_BUFFER", str(1024 * 1024))
+        )
+        self.merkle_chunk_size = int(os.getenv("MERKLE_CHUNK_SIZE", str(1024 * 1024)))
+
+    def sign_bytes(self, data: bytes, key: bytes) -> bytes:
+        return self.hmac_cache.digest(key, data)
 
     async def create_signature(self, request: SignRequest) -> dict:
         try:
-            key_bytes = request.key.encode()
-            data_bytes = request.data.encode()
-            signature = hmac.new(key_bytes, data_bytes, hashlib.sha256).digest()
+            signature = self.sign_bytes(request.data.encode(), request.key.encode())
             return {"signature": base64.b64encode(signature).decode("utf-8")}
         except Exception as e:
             raise ValueError(f"Failed to create signature: {str(e)}")
@@ -25,14 +73,290 @@ class IntegrityService:
             signature = base64.b64decode(request.signature)
             key_bytes = request.key.encode()
             data_bytes = request.data.encode()
-            expected_signature = hmac.new(
-                key_bytes, data_bytes, hashlib.sha256
-            ).digest()
+            expected_signature = self.hmac_cache.digest(key_bytes, data_bytes)
             valid = hmac.compare_digest(signature, expected_signature)
             return {"valid": valid}
         except Exception as e:
             raise ValueError(f"Failed to verify signature: {str(e)}")
 
+    def _batch_keys(self, request, items) -> list[bytes]:
+        if len(items) > self.max_batch_items:
+            raise ValueError(f"At most {self.max_batch_items} items per batch")
+        default = request.key.encode() if request.key is not None else None
+        keys = []
+        for index, item in enumerate(items):
+            if item.key is None and default is None:
+                raise ValueError(f"Item {index} has no key and the batch has no default")
+            keys.append(item.key.encode() if item.key is not None else default)
+        return keys
+
+    async def _run_batch(self, fn, items: list, algorithm: str) -> list:
+        if len(items) <= INLINE_BATCH_ITEMS:
+            return fn(self.hmac_cache, items, algorithm)
+        if self.executor.mode == "thread":
+            return await self.executor.run(
+                "hmac_batch", fn, self.hmac_cache, items, algorithm
+            )
+        # Konteks HMAC tidak bisa dikirim ke proses lain
+        return await asyncio.get_running_loop().run_in_executor(
+            None, fn, self.hmac_cache, items, algorithm
+        )
+
+    async def sign_batch(self, request: SignBatchRequest) -> dict:
+        keys = self._batch_keys(request, request.items)
+        hash_constructor(request.algorithm)
+        items = [(key, item.data.encode()) for key, item in zip(keys, request.items)]
+        signatures = await self._run_batch(sign_many, items, request.algorithm)
+        return {
+            "algorithm": request.algorithm,
+            "signatures": [
+                base64.b64encode(signature).decode("utf-8") for signature in signatures
+            ],
+        }
+
+    async def verify_batch(self, request: VerifyBatchRequest) -> dict:
+        """
+        Verify (data, signature) items in one call. Each item is compared in
+        constant time, and a malformed signature only fails its own item.
+        """
+        keys = self._batch_keys(request, request.items)
+        hash_constructor(request.algorithm)
+        items = []
+        for key, item in zip(keys, request.items):
+            try:
+                signature = base64.b64decode(item.signature, validate=True)
+            except ValueError:
+                signature = None
+            items.append((key, item.data.encode(), signature))
+        results = await self._run_batch(verify_many, items, request.algorithm)
+        valid = sum(results)
+        return {
+            "algorithm": request.algorithm,
+            "results": results,
+            "valid": valid,
+            "invalid": len(results) - valid,
+        }
+
+    async def _update(self, mac: hmac.HMAC, block) -> None:
+        if len(block) <= INLINE_UPDATE_MAX:
+            mac.update(block)
+        elif self.executor.mode == "thread":
+            # hashlib melepas GIL untuk buffer besar, jadi thread benar-benar paralel
+            await self.executor.run("hmac_stream", mac.update, block)
+        else:
+            # State HMAC tidak bisa dikirim ke proses lain
+            await asyncio.get_running_loop().run_in_executor(None, mac.update, block)
+
+    async def _digest_stream(
+        self, chunks: AsyncIterator[bytes], key: bytes, algorithm: str
+    ) -> tuple[bytes, int]:
+        """
+        HMAC over an async byte stream in ``stream_buffer_size`` blocks.
+        Reading the next block overlaps with hashing the previous one, and at
+        most two blocks are held at a time, so memory stays flat regardless of
+        the stream length.
+        """
+        mac = new_hmac(key, algorithm)
+        size = 0
+        buffer = bytearray()
+        pending: Optional[asyncio.Future] = None
+        try:
+            async for piece in chunks:
+                size += len(piece)
+                buffer += piece
+                if len(buffer) >= self.stream_buffer_size:
+                    if pending is not None:
+                        await pending
+                    block, buffer = buffer, bytearray()
+                    pending = asyncio.ensure_future(self._update(mac, block))
+            if pending is not None:
+                await pending
+                pending = None
+            await self._update(mac, buffer)
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+        return mac.digest(), size
+
+    async def sign_stream(
+        self, chunks: AsyncIterator[bytes], key: bytes, algorithm: str = "sha256"
+    ) -> dict:
+        signature, size = await self._digest_stream(chunks, key, algorithm)
+        return {
+            "signature": base64.b64encode(signature).decode("utf-8"),
+            "algorithm": algorithm,
+            "size": size,
+        }
+
+    async def verify_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        key: bytes,
+        signature: bytes,
+        algorithm: str = "sha256",
+    ) -> dict:
+        expected, size = await self._digest_stream(chunks, key, algorithm)
+        return {
+            "valid": hmac.compare_digest(signature, expected),
+            "algorithm": algorithm,
+            "size": size,
+        }
+
+    def _sign_manifest(
+        self, key: bytes, algorithm: str, chunk_size: int, size: int, count: int, root: bytes
+    ) -> bytes:
+        message = merkle.manifest_message(algorithm, chunk_size, size, count, root)
+        return self.hmac_cache.digest(key, message)
+
+    async def _hash_leaves(self, algorithm: str, group: bytes, chunk_size: int):
+        return await self.executor.run(
+            "merkle_leaves", merkle.hash_leaves, algorithm, group, chunk_size
+        )
+
+    async def build_manifest(
+        self,
+        chunks: AsyncIterator[bytes],
+        key: bytes,
+        chunk_size: Optional[int] = None,
+        algorithm: str = "sha256",
+        proof_range: Optional[range] = None,
+    ) -> dict:
+        """
+        Signed Merkle manifest of a byte stream, plus audit paths for the
+        chunk indices in ``proof_range`` when given.
+
+        Chunks are hashed in ~4 MiB groups on the crypto executor, with up
+        to ``max_workers`` groups in flight. Leaf hashing therefore spreads
+        over every executor thread while the body is still being read, and
+        memory is bounded by the groups in flight.
+        """
+        chunk_size = chunk_size or self.merkle_chunk_size
+        merkle.check_params(algorithm, chunk_size)
+        if proof_range is not None and len(proof_range) > MAX_PROOF_CHUNKS:
+            raise ValueError(f"At most {MAX_PROOF_CHUNKS} proofs per request")
+        group_bytes = chunk_size * max(1, MERKLE_GROUP_BYTES // chunk_size)
+        max_in_flight = max(1, self.executor.max_workers)
+
+        leaves: list[bytes] = []
+        in_flight: deque = deque()
+        buffer = bytearray()
+        size = 0
+        try:
+            async for piece in chunks:
+                size += len(piece)
+                buffer += piece
+                while len(buffer) >= group_bytes:
+                    group = bytes(buffer[:group_bytes])
+                    del buffer[:group_bytes]
+                    if len(in_flight) >= max_in_flight:
+                        leaves.extend(await in_flight.popleft())
+                    in_flight.append(
+                        asyncio.ensure_future(
+                            self._hash_leaves(algorithm, group, chunk_size)
+                        )
+                    )
+            while in_flight:
+                leaves.extend(await in_flight.popleft())
+        finally:
+            for future in in_flight:
+                future.cancel()
+        if len(buffer) > INLINE_UPDATE_MAX:
+            leaves.extend(await self._hash_leaves(algorithm, bytes(buffer), chunk_size))
+        else:
+            leaves.extend(merkle.hash_leaves(algorithm, buffer, chunk_size))
+        if not leaves:
+            # Objek kosong: satu leaf kosong supaya root tetap terdefinisi
+            leaves = [merkle.HASHES[algorithm](merkle.LEAF_PREFIX).digest()]
+
+        count = len(leaves)
+        if proof_range is not None and (
+            proof_range.start < 0 or proof_range.stop > count
+        ):
+            raise ValueError(f"Proof range must lie within [0, {count})")
+        levels = merkle.build_levels(algorithm, leaves)
+        root = levels[-1][0]
+        signature = self._sign_manifest(key, algorithm, chunk_size, size, count, root)
+        result = {
+            "manifest": {
+                "version": merkle.MANIFEST_VERSION,
+                "algorithm": algorithm,
+                "chunk_size": chunk_size,
+                "size": size,
+                "chunks": count,
+                "root": root.hex(),
+                "signature": base64.b64encode(signature).decode("utf-8"),
+            }
+        }
+        if proof_range is not None:
+            result["proofs"] = [
+                {
+                    "index": index,
+                    "proof": [node.hex() for node in merkle.audit_path(levels, index)],
+                }
+                for index in proof_range
+            ]
+        return result
+
+    async def verify_chunks(self, request: VerifyChunksRequest) -> dict:
+        """
+        Check a subset of chunks against a signed manifest without the rest
+        of the object: the manifest HMAC first, then one audit path per chunk.
+        """
+        manifest = request.manifest
+        try:
+            merkle.check_params(manifest.algorithm, manifest.chunk_size)
+            root = bytes.fromhex(manifest.root)
+            signature = base64.b64decode(manifest.signature)
+            items = [
+                (
+                    chunk.index,
+                    base64.b64decode(chunk.data),
+                    [bytes.fromhex(node) for node in chunk.proof],
+                )
+                for chunk in request.chunks
+            ]
+        except ValueError as e:
+            raise ValueError(f"Malformed manifest or chunk: {e}")
+
+        expected = self._sign_manifest(
+            request.key.encode(),
+            manifest.algorithm,
+            manifest.chunk_size,
+            manifest.size,
+            manifest.chunks,
+            root,
+        )
+        if manifest.version != merkle.MANIFEST_VERSION or not hmac.compare_digest(
+            signature, expected
+        ):
+            return {
+                "valid": False,
+                "manifest_valid": False,
+                "verified": [],
+                "failed": [chunk.index for chunk in request.chunks],
+            }
+
+        args = (
+            manifest.algorithm,
+            root,
+            manifest.chunk_size,
+            manifest.size,
+            manifest.chunks,
+            items,
+        )
+        if sum(len(data) for _, data, _ in items) <= INLINE_UPDATE_MAX:
+            verified, failed = merkle.verify_chunks(*args)
+        else:
+            verified, failed = await self.executor.run(
+                "merkle_verify", merkle.verify_chunks, *args
+            )
+        return {
+            "valid": not failed and bool(verified),
+            "manifest_valid": True,
+            "verified": verified,
+            "failed": failed,
+        }
+
     async def generate_combined_hmac(
         self, request: GenerateHmacRequest
     ) -> GenerateHmacResponse:
@@ -48,9 +372,9 @@ class IntegrityService:
             hmac_key_bytes = request.hmac_key_material.encode("utf-8")
 
             # Menggunakan SHA-256 untuk HMAC sesuai deskripsi Anda
-            hmac_digest = hmac.new(
-                hmac_key_bytes, data_to_hmac_bytes, hashlib.sha256
-            ).hexdigest()
+            hmac_digest = self.hmac_cache.digest(
+                hmac_key_bytes, data_to_hmac_bytes
+            ).hex()
 
             return GenerateHmacResponse(combined_hash_hex=hmac_digest)
         except Exception as e:
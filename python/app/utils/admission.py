@@ -0,0 +1,194 @@
+"""
+Memory-budgeted admission control for password hashing.
+
+Every Argon2id hash allocates ``memory_cost`` (64 MB with our parameters), so
+an unbounded burst of registrations can OOM the container. The controller
+admits a job only while the global memory budget and the per-algorithm
+concurrency limit both have room. Other jobs wait in a bounded FIFO queue.
+A full queue is rejected at once with 429, and a wait that outlives the
+timeout (or the request's remaining time budget, when shorter) gets 503. Both
+carry a Retry-After estimate.
+
+Waiters are granted in order. A waiter that is only blocked by its own
+algorithm's limit is skipped, but one blocked by the memory budget stops the
+scan, so small bcrypt jobs cannot starve a queued Argon2id hash.
+"""
+
+import asyncio
+import contextlib
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from . import deadline
+from .executor import ExecutorSaturatedError
+
+
+class AdmissionRejectedError(ExecutorSaturatedError):
+    def __init__(self, algorithm: str, reason: str, status_code: int, retry_after: float):
+        super().__init__(
+            algorithm,
+            pending=0,
+            retry_after=retry_after,
+            detail=f"Admission rejected for '{algorithm}': {reason}",
+        )
+        self.status_code = status_code
+
+
+class _Waiter:
+    __slots__ = ("future", "algorithm", "cost")
+
+    def __init__(self, future: asyncio.Future, algorithm: str, cost: int):
+        self.future = future
+        self.algorithm = algorithm
+        self.cost = cost
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        memory_budget: int,
+        limits: Optional[dict[str, int]] = None,
+        costs: Optional[dict[str, int]] = None,
+        max_waiters: int = 64,
+        timeout: float = 5.0,
+    ):
+        self.memory_budget = memory_budget
+        self.limits = dict(limits or {})
+        self.costs = dict(costs or {})
+        self.max_waiters = max_waiters
+        self.timeout = timeout
+        self.memory_in_use = 0
+        self._active: dict[str, int] = {}
+        self._waiters: deque = deque()
+        self._service_time: dict[str, float] = {}  # EWMA seconds per job
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @classmethod
+    def from_env(cls, costs: dict[str, int]) -> "AdmissionController":
+        """
+        ADMISSION_MEMORY_BUDGET_MB, ADMISSION_LIMITS="argon2id=4,bcrypt=8",
+        ADMISSION_MAX_WAITERS, ADMISSION_TIMEOUT (seconds)
+        """
+        limits = {}
+        for item in os.getenv("ADMISSION_LIMITS", "argon2id=4,bcrypt=8").split(","):
+            if "=" in item:
+                name, value = item.split("=", 1)
+                limits[name.strip()] = int(value)
+        return cls(
+            memory_budget=int(os.getenv("ADMISSION_MEMORY_BUDGET_MB", "512")) * 1024**2,
+            limits=limits,
+            costs=costs,
+            max_waiters=int(os.getenv("ADMISSION_MAX_WAITERS", "64")),
+            timeout=float(os.getenv("ADMISSION_TIMEOUT", "5")),
+        )
+
+    def governs(self, algorithm: str) -> bool:
+        return algorithm in self.limits or algorithm in self.costs
+
+    def _blocked_by_limit(self, algorithm: str) -> bool:
+        limit = self.limits.get(algorithm)
+        return limit is not None and self._active.get(algorithm, 0) >= limit
+
+    def _grant(self, waiter: _Waiter) -> None:
+        self.memory_in_use += waiter.cost
+        self._active[waiter.algorithm] = self._active.get(waiter.algorithm, 0) + 1
+        self.admitted += 1
+        waiter.future.set_result(None)
+
+    def _release(self, algorithm: str, cost: int) -> None:
+        self.memory_in_use -= cost
+        self._active[algorithm] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+            if self._blocked_by_limit(waiter.algorithm):
+                continue
+            if self.memory_in_use + waiter.cost > self.memory_budget:
+                break
+            self._waiters.remove(waiter)
+            self._grant(waiter)
+
+    def _discard(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def retry_after(self, algorithm: str) -> float:
+        service_time = self._service_time.get(algorithm, 1.0)
+        capacity = self.limits.get(algorithm) or 1
+        return max(1.0, math.ceil(service_time * (len(self._waiters) + 1) / capacity))
+
+    @contextlib.asynccontextmanager
+    async def admit(self, algorithm: str):
+        cost = self.costs.get(algorithm, 0)
+        if cost > self.memory_budget:
+            raise ValueError(f"'{algorithm}' needs more memory than the whole budget")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), algorithm, cost)
+        self._waiters.append(waiter)
+        self._wake()
+        if not waiter.future.done():
+            if len(self._waiters) > self.max_waiters:
+                self._discard(waiter)
+                self.rejected_queue_full += 1
+                raise AdmissionRejectedError(
+                    algorithm, "wait queue full", 429, self.retry_after(algorithm)
+                )
+            # Tidak menunggu lebih lama dari sisa budget request
+            budget = deadline.current()
+            timeout = self.timeout
+            if budget is not None and budget.remaining() < timeout:
+                timeout = max(0.0, budget.remaining())
+            try:
+                await asyncio.wait_for(waiter.future, timeout)
+            except asyncio.TimeoutError:
+                self._discard(waiter)
+                self.rejected_timeout += 1
+                if timeout < self.timeout:
+                    budget.shed("deadline")
+                raise AdmissionRejectedError(
+                    algorithm, "memory budget exhausted", 503, self.retry_after(algorithm)
+                )
+            except asyncio.CancelledError:
+                # Cancelled right after being granted: hand the slot back
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(algorithm, cost)
+                else:
+                    self._discard(waiter)
+                raise
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            previous = self._service_time.get(algorithm)
+            self._service_time[algorithm] = (
+                elapsed if previous is None else previous * 0.8 + elapsed * 0.2
+            )
+            self._release(algorithm, cost)
+
+    def stats(self) -> dict:
+        return {
+            "memory_budget_bytes": self.memory_budget,
+            "memory_in_use_bytes": self.memory_in_use,
+            "queue_length": len(self._waiters),
+            "max_waiters": self.max_waiters,
+            "timeout_seconds": self.timeout,
+            "active": dict(self._active),
+            "limits": self.limits,
+            "costs_bytes": self.costs,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
@@ -0,0 +1,92 @@
+"""
+Per-request time budgets.
+
+``LoadSheddingMiddleware`` (see ``shedding``) gives every request to an
+expensive route a ``RequestBudget``, an absolute ``time.monotonic()``
+deadline. The budget is kept in a context variable, so the crypto executor
+and the admission controller can check it without passing it through every
+service call. Code running outside such a request sees ``current() is None``
+and is never shed.
+
+Tasks copy the context they are created in, budget included. Work shared
+by several requests (single-flight loads) or running in the background is
+therefore started with ``detach``, so it never inherits the budget of
+whichever request started it. Each request then waits for it with
+``wait_shared`` under its own budget.
+"""
+
+import asyncio
+import contextvars
+import math
+import time
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RequestBudget:
+    __slots__ = ("route", "deadline", "shed_reason")
+
+    def __init__(self, route: str, deadline: Optional[float]):
+        self.route = route
+        self.deadline = deadline
+        # Set by whichever layer gave up on the request first
+        self.shed_reason: Optional[str] = None
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return math.inf
+        return self.deadline - time.monotonic()
+
+    def shed(self, reason: str) -> None:
+        if self.shed_reason is None:
+            self.shed_reason = reason
+
+
+_current: contextvars.ContextVar[Optional[RequestBudget]] = contextvars.ContextVar(
+    "request_budget", default=None
+)
+
+
+def current() -> Optional[RequestBudget]:
+    return _current.get()
+
+
+def activate(budget: RequestBudget) -> contextvars.Token:
+    return _current.set(budget)
+
+
+def reset(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def detach(coro: Awaitable[T]) -> "asyncio.Task[T]":
+    """Start ``coro`` as a task in an empty context, without any request budget."""
+    return asyncio.get_running_loop().create_task(coro, context=contextvars.Context())
+
+
+async def wait_shared(task: "asyncio.Future[T]", job_type: str) -> T:
+    """
+    Await shared work (usually from ``detach``) for as long as the current
+    request's budget allows. A request that runs out of time gets
+    ``DeadlineExceededError``; the work carries on for the other waiters.
+    Cancelling the caller does not cancel the task either.
+    """
+    budget = current()
+    if budget is None or budget.deadline is None:
+        return await asyncio.shield(task)
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(task), max(0.0, budget.remaining())
+        )
+    except asyncio.TimeoutError:
+        if task.done():
+            raise  # the shared work itself timed out
+        from .executor import DeadlineExceededError  # executor imports deadline
+
+        budget.shed("deadline")
+        raise DeadlineExceededError(
+            job_type,
+            0,
+            detail=f"Request budget ran out while waiting for shared '{job_type}'",
+        )
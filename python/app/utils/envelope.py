@@ -0,0 +1,94 @@
+"""
+Self-describing AES-256-GCM ciphertext envelope.
+
+Format::
+
+    header   = magic "DSHE" | version (1) | kdf id (1) | iterations (u32 BE)
+               | salt length (1) | salt | nonce (12)
+    envelope = header | ciphertext | tag (16)
+
+The envelope records which KDF, which parameters and which salt produced the
+key, so any worker (or a restarted one) can decrypt it. The header is also
+the AES-GCM AAD, so a tampered KDF id, salt or parameter fails
+authentication. ``parse`` returns ``memoryview`` slices into the original
+buffer. The ciphertext and tag are already contiguous, so decryption needs
+no copies.
+"""
+
+import struct
+
+MAGIC = b"DSHE"
+VERSION = 1
+KDF_PBKDF2_SHA256 = 1
+KDF_NAMES = {KDF_PBKDF2_SHA256: "pbkdf2-sha256"}
+PREFIX = struct.Struct(">4sBBIB")
+NONCE_SIZE = 12
+TAG_SIZE = 16
+MIN_SALT_SIZE = 16
+# Bounds on caller-controlled KDF cost: weak keys below, CPU exhaustion above
+MIN_ITERATIONS = 100_000
+MAX_ITERATIONS = 2_000_000
+
+
+class EnvelopeError(ValueError):
+    pass
+
+
+class Envelope:
+    __slots__ = ("header", "kdf", "iterations", "salt", "nonce", "sealed")
+
+    def __init__(self, header, kdf: int, iterations: int, salt, nonce, sealed):
+        self.header = header
+        self.kdf = kdf
+        self.iterations = iterations
+        self.salt = salt
+        self.nonce = nonce
+        self.sealed = sealed  # ciphertext || tag
+
+    @property
+    def ciphertext(self) -> memoryview:
+        return self.sealed[:-TAG_SIZE]
+
+    @property
+    def tag(self) -> memoryview:
+        return self.sealed[-TAG_SIZE:]
+
+
+def looks_like_envelope(blob) -> bool:
+    return bytes(blob[: len(MAGIC)]) == MAGIC
+
+
+def pack_header(kdf: int, iterations: int, salt: bytes, nonce: bytes) -> bytes:
+    if len(nonce) != NONCE_SIZE:
+        raise EnvelopeError(f"Nonce must be {NONCE_SIZE} bytes")
+    return PREFIX.pack(MAGIC, VERSION, kdf, iterations, len(salt)) + salt + nonce
+
+
+def parse(blob) -> Envelope:
+    view = memoryview(blob)
+    if len(view) < PREFIX.size:
+        raise EnvelopeError("Truncated envelope")
+    magic, version, kdf, iterations, salt_size = PREFIX.unpack_from(view)
+    if magic != MAGIC:
+        raise EnvelopeError("Not a ciphertext envelope")
+    if version != VERSION:
+        raise EnvelopeError(f"Unsupported envelope version: {version}")
+    if kdf not in KDF_NAMES:
+        raise EnvelopeError(f"Unsupported KDF id: {kdf}")
+    if not MIN_ITERATIONS <= iterations <= MAX_ITERATIONS:
+        raise EnvelopeError(f"KDF iterations out of range: {iterations}")
+    if salt_size < MIN_SALT_SIZE:
+        raise EnvelopeError("Salt too short")
+
+    salt_end = PREFIX.size + salt_size
+    header_end = salt_end + NONCE_SIZE
+    if len(view) < header_end + TAG_SIZE:
+        raise EnvelopeError("Truncated envelope")
+    return Envelope(
+        header=view[:header_end],
+        kdf=kdf,
+        iterations=iterations,
+        salt=view[PREFIX.size : salt_end],
+        nonce=view[salt_end:header_end],
+        sealed=view[header_end:],
+    )
@@ -0,0 +1,336 @@
+"""
+Bounded execution layer for CPU-bound crypto work.
+
+bcrypt, Argon2id and PBKDF2 must never run on the event loop: a single hash
+holds the worker for 100ms+ and stalls every other request. All of those
+paths go through a shared ``CryptoExecutor`` which runs them on a thread or
+process pool, caps the number of pending jobs and the concurrency per job
+type, and records queue-wait / run-time samples for sizing.
+
+Inside a request with a time budget (``deadline.current()``), a job whose
+estimated queue wait plus run time will not fit in the remaining budget is
+rejected up front. A queued job whose deadline has passed by the time a
+worker picks it up is dropped without running.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from . import deadline
+from .metrics import observe_primitive
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a job is rejected because the executor queue is full."""
+
+    status_code = 503
+
+    def __init__(
+        self,
+        job_type: str,
+        pending: int,
+        retry_after: float = 1.0,
+        detail: Optional[str] = None,
+    ):
+        super().__init__(
+            detail
+            or f"Crypto executor saturated ({pending} pending), rejected '{job_type}' job"
+        )
+        self.job_type = job_type
+        self.pending = pending
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(ExecutorSaturatedError):
+    """Raised when a job cannot finish within the request's time budget."""
+
+
+def _timed_call(
+    fn: Callable, args: tuple, expires_at: Optional[float] = None
+) -> tuple[float, Optional[float], Any]:
+    # Runs inside the pool worker; time.monotonic() is system-wide on Linux so
+    # the start timestamp is comparable with the submitting process.
+    started = time.monotonic()
+    if expires_at is not None and started > expires_at:
+        # Nobody is waiting for this answer any more
+        return started, None, None
+    result = fn(*args)
+    return started, time.monotonic(), result
+
+
+def _payload_size(args: tuple) -> int:
+    return sum(len(arg) for arg in args if isinstance(arg, (bytes, bytearray, str)))
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": ordered[int(last * 0.50)],
+        "p95": ordered[int(last * 0.95)],
+        "p99": ordered[int(last * 0.99)],
+    }
+
+
+class JobStats:
+    __slots__ = (
+        "submitted",
+        "completed",
+        "failed",
+        "rejected",
+        "shed",
+        "in_flight",
+        "wait_total",
+        "wait_max",
+        "run_total",
+        "run_max",
+        "run_ewma",
+        "wait_samples",
+        "run_samples",
+    )
+
+    def __init__(self, sample_size: int):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.shed = 0
+        self.in_flight = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+        self.run_ewma = 0.0
+        self.wait_samples = deque(maxlen=sample_size)
+        self.run_samples = deque(maxlen=sample_size)
+
+    def record(self, wait: float, run: float) -> None:
+        self.wait_total += wait
+        self.run_total += run
+        self.wait_max = max(self.wait_max, wait)
+        self.run_max = max(self.run_max, run)
+        self.wait_samples.append(wait)
+        self.run_samples.append(run)
+        if run > 0:
+            previous = self.run_ewma
+            self.run_ewma = run if not previous else previous * 0.8 + run * 0.2
+
+    def as_dict(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "in_flight": self.in_flight,
+            "queue_wait_seconds": {
+                "avg": self.wait_total / finished if finished else 0.0,
+                "max": self.wait_max,
+                **_percentiles(self.wait_samples),
+            },
+            "run_seconds": {
+                "avg": self.run_total / finished if finished else 0.0,
+                "max": self.run_max,
+                "ewma": self.run_ewma,
+                **_percentiles(self.run_samples),
+            },
+        }
+
+
+class CryptoExecutor:
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_pending: int = 256,
+        job_limits: Optional[dict[str, int]] = None,
+        sample_size: int = 1024,
+        admission=None,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.job_limits = dict(job_limits or {})
+        self._sample_size = sample_size
+        self._pool: Optional[Executor] = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._stats: dict[str, JobStats] = {}
+        self._pending = 0
+        # Optional AdmissionController gating memory-heavy job types
+        self.admission = admission
+
+    @classmethod
+    def from_env(cls, admission=None) -> "CryptoExecutor":
+        """
+        CRYPTO_EXECUTOR_MODE=thread|process, CRYPTO_EXECUTOR_WORKERS=<n>,
+        CRYPTO_EXECUTOR_MAX_QUEUE=<n>, CRYPTO_EXECUTOR_LIMITS="argon2id=2,bcrypt=4"
+        """
+        limits = {}
+        for item in os.getenv("CRYPTO_EXECUTOR_LIMITS", "").split(","):
+            if "=" in item:
+                name, value = item.split("=", 1)
+                limits[name.strip()] = int(value)
+        workers = os.getenv("CRYPTO_EXECUTOR_WORKERS")
+        return cls(
+            mode=os.getenv("CRYPTO_EXECUTOR_MODE", "thread"),
+            max_workers=int(workers) if workers else None,
+            max_pending=int(os.getenv("CRYPTO_EXECUTOR_MAX_QUEUE", "256")),
+            job_limits=limits,
+            admission=admission,
+        )
+
+    @property
+    def pool(self) -> Executor:
+        # Created lazily so importing the app never forks or spawns threads
+        if self._pool is None:
+            if self.mode == "process":
+                # multiprocessing is a noticeable import; only pay for it when used
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="crypto"
+                )
+        return self._pool
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _job_stats(self, job_type: str) -> JobStats:
+        stats = self._stats.get(job_type)
+        if stats is None:
+            stats = self._stats[job_type] = JobStats(self._sample_size)
+        return stats
+
+    def estimated_wait(self, job_type: Optional[str] = None) -> float:
+        """
+        Seconds a job submitted now should queue before a worker starts it:
+        the in-flight work (EWMA run time per job type) spread over the
+        workers, or over ``job_type``'s concurrency limit when that is tighter.
+        """
+        backlog = sum(s.in_flight * s.run_ewma for s in self._stats.values())
+        wait = backlog / self.max_workers
+        limit = self.job_limits.get(job_type) if job_type else None
+        stats = self._stats.get(job_type) if job_type else None
+        if limit and stats is not None:
+            wait = max(wait, stats.in_flight * stats.run_ewma / limit)
+        return wait
+
+    def _semaphore(self, job_type: str) -> Optional[asyncio.Semaphore]:
+        limit = self.job_limits.get(job_type)
+        if not limit:
+            return None
+        semaphore = self._semaphores.get(job_type)
+        if semaphore is None:
+            semaphore = self._semaphores[job_type] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def run(self, job_type: str, fn: Callable, *args) -> Any:
+        """Run ``fn(*args)`` on the pool, tagged as ``job_type`` for limits and stats."""
+        if self.admission is not None and self.admission.governs(job_type):
+            async with self.admission.admit(job_type):
+                return await self._submit(job_type, fn, args)
+        return await self._submit(job_type, fn, args)
+
+    async def _submit(self, job_type: str, fn: Callable, args: tuple) -> Any:
+        stats = self._job_stats(job_type)
+        if self._pending >= self.max_pending:
+            stats.rejected += 1
+            raise ExecutorSaturatedError(job_type, self._pending)
+
+        budget = deadline.current()
+        expires_at = budget.deadline if budget is not None else None
+        if expires_at is not None:
+            remaining = budget.remaining()
+            expected = self.estimated_wait(job_type) + stats.run_ewma
+            if expected > remaining:
+                stats.shed += 1
+                budget.shed("deadline")
+                raise DeadlineExceededError(
+                    job_type,
+                    self._pending,
+                    retry_after=expected,
+                    detail=f"'{job_type}' needs ~{expected:.2f}s, "
+                    f"{max(remaining, 0.0):.2f}s left of the request budget",
+                )
+
+        self._pending += 1
+        stats.submitted += 1
+        stats.in_flight += 1
+        submitted_at = time.monotonic()
+        try:
+            semaphore = self._semaphore(job_type)
+            if semaphore is not None:
+                async with semaphore:
+                    started, finished, result = await self._dispatch(
+                        fn, args, expires_at
+                    )
+            else:
+                started, finished, result = await self._dispatch(fn, args, expires_at)
+        except BaseException:
+            stats.failed += 1
+            stats.record(time.monotonic() - submitted_at, 0.0)
+            raise
+        finally:
+            self._pending -= 1
+            stats.in_flight -= 1
+
+        if finished is None:
+            stats.shed += 1
+            stats.record(max(started - submitted_at, 0.0), 0.0)
+            budget.shed("expired")
+            raise DeadlineExceededError(
+                job_type,
+                self._pending,
+                retry_after=self.estimated_wait(job_type),
+                detail=f"Request budget ran out while '{job_type}' was queued",
+            )
+        stats.completed += 1
+        stats.record(max(started - submitted_at, 0.0), finished - started)
+        observe_primitive(job_type, _payload_size(args), finished - started)
+        return result
+
+    async def _dispatch(self, fn: Callable, args: tuple, expires_at=None):
+        # Cancelling this await (client gone) also cancels the pool job if no
+        # worker has picked it up yet
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.pool, _timed_call, fn, args, expires_at
+        )
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "job_limits": self.job_limits,
+            "jobs": {name: s.as_dict() for name, s in self._stats.items()},
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+_default_executor: Optional[CryptoExecutor] = None
+
+
+def get_default_executor() -> CryptoExecutor:
+    """Shared executor for services constructed without an explicit one."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = CryptoExecutor.from_env()
+    return _default_executor
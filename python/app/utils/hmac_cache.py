@@ -0,0 +1,169 @@
+"""
+Prepared HMAC key contexts.
+
+HMAC (RFC 2104) pads the key to the hash block size and absorbs it with
+ipad and opad before it reads any message. A webhook verifier checks
+millions of small messages against a few dozen keys, so that setup costs
+more than the message itself. ``HmacContextCache`` keeps the inner and
+outer hash states with the key already absorbed, and each message works on
+``copy()`` of them. A signature then costs two state copies, one update and
+two finalisations. Results are byte-identical to ``hmac.new``.
+
+Entries are keyed by (keyed BLAKE2b fingerprint of the key, algorithm) and
+evicted LRU, so raw keys never sit in the index. The prepared states are
+key-equivalent, though, and ``clear()`` drops them all. Prepared contexts
+are only copied after construction, so one cache can be shared by executor
+threads; only inserts take the lock.
+
+Copying the states saves about half of a one-off ``hmac.new``, and the
+fingerprint lookup eats part of that. ``sign_many``/``verify_many`` look
+each distinct key up once per batch, so only the copies remain per message.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+HASHES = {
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+    "blake2b": hashlib.blake2b,
+}
+_IPAD = bytes(x ^ 0x36 for x in range(256))
+_OPAD = bytes(x ^ 0x5C for x in range(256))
+
+
+def hash_constructor(algorithm: str):
+    new = HASHES.get(algorithm)
+    if new is None:
+        raise ValueError(
+            f"Unsupported algorithm: {algorithm} (use {', '.join(HASHES)})"
+        )
+    return new
+
+
+class PreparedHmac:
+    __slots__ = ("inner", "outer")
+
+    def __init__(self, key: bytes, new):
+        inner, outer = new(), new()
+        if len(key) > inner.block_size:
+            key = new(key).digest()
+        key = key.ljust(inner.block_size, b"\0")
+        inner.update(key.translate(_IPAD))
+        outer.update(key.translate(_OPAD))
+        self.inner = inner
+        self.outer = outer
+
+    def digest(self, message) -> bytes:
+        inner = self.inner.copy()
+        inner.update(message)
+        outer = self.outer.copy()
+        outer.update(inner.digest())
+        return outer.digest()
+
+    def verify(self, message, signature: bytes) -> bool:
+        return hmac.compare_digest(self.digest(message), signature)
+
+
+class HmacContextCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._fingerprint = hashlib.blake2b(key=os.urandom(32), digest_size=16)
+        self._entries: "OrderedDict[tuple[bytes, str], PreparedHmac]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "HmacContextCache":
+        return cls(max_entries=int(os.getenv("HMAC_CACHE_SIZE", "256")))
+
+    def get(self, key: bytes, algorithm: str = "sha256") -> PreparedHmac:
+        fingerprint = self._fingerprint.copy()
+        fingerprint.update(key)
+        cache_key = (fingerprint.digest(), algorithm)
+        # Hit tanpa lock: get/move_to_end OrderedDict atomik di bawah GIL
+        prepared = self._entries.get(cache_key)
+        if prepared is not None:
+            self.hits += 1
+            try:
+                self._entries.move_to_end(cache_key)
+            except KeyError:
+                pass  # evicted by another thread meanwhile
+            return prepared
+
+        prepared = PreparedHmac(key, hash_constructor(algorithm))
+        with self._lock:
+            self.misses += 1
+            if self.max_entries > 0:
+                self._entries[cache_key] = prepared
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return prepared
+
+    def digest(self, key: bytes, message, algorithm: str = "sha256") -> bytes:
+        return self.get(key, algorithm).digest(message)
+
+    def verify(
+        self, key: bytes, message, signature: bytes, algorithm: str = "sha256"
+    ) -> bool:
+        return self.get(key, algorithm).verify(message, signature)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def sign_many(
+    cache: HmacContextCache, items: list[tuple[bytes, bytes]], algorithm: str
+) -> list[bytes]:
+    """Signatures of (key, message) items; each distinct key is looked up once."""
+    prepared: dict[bytes, PreparedHmac] = {}
+    signatures = []
+    for key, message in items:
+        context = prepared.get(key)
+        if context is None:
+            context = prepared[key] = cache.get(key, algorithm)
+        signatures.append(context.digest(message))
+    return signatures
+
+
+def verify_many(
+    cache: HmacContextCache,
+    items: list[tuple[bytes, bytes, Optional[bytes]]],
+    algorithm: str,
+) -> list[bool]:
+    """Checks (key, message, signature) items; a None signature never verifies."""
+    prepared: dict[bytes, PreparedHmac] = {}
+    results = []
+    for key, message, signature in items:
+        context = prepared.get(key)
+        if context is None:
+            context = prepared[key] = cache.get(key, algorithm)
+        # Digest dihitung juga untuk signature rusak agar waktunya tidak bocor
+        expected = context.digest(message)
+        results.append(
+            signature is not None and hmac.compare_digest(expected, signature)
+        )
+    return results
+
+
+# Shared by the services and executor threads; one per process in process mode
+default_hmac_cache = HmacContextCache.from_env()
@@ -0,0 +1,225 @@
+"""
+Hybrid session mode: one ML-KEM encapsulation per recipient per rotation window.
+
+The sender encapsulates once to a recipient public key and then derives a fresh
+AES-256-GCM key per message with HKDF-SHA256 over the shared secret and a
+message counter. Instead of the 768-byte encapsulated key each message carries
+a 25-byte session header::
+
+    version (1) | session_id (16) | counter (u64 BE)
+
+``session_id`` is the first 16 bytes of SHA-256(encapsulated_key). The
+receiver can therefore check that an encapsulated key belongs to the session
+before it caches the decapsulated secret. The first message of every session
+also returns the encapsulated key, which the recipient needs once to open
+the session. The message count, byte count and session age are all capped,
+and hitting a cap forces a new encapsulation.
+"""
+
+import asyncio
+import hashlib
+import struct
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from . import deadline
+
+SESSION_VERSION = 1
+SESSION_HEADER = struct.Struct(">B16sQ")
+HKDF_INFO = b"dsh-hybrid-session-v1"
+
+
+def session_id_for(encapsulated_key: bytes) -> bytes:
+    return hashlib.sha256(encapsulated_key).digest()[:16]
+
+
+def message_key(shared_secret: bytes, session_id: bytes, counter: int) -> bytes:
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=session_id,
+        info=HKDF_INFO + struct.pack(">Q", counter),
+    ).derive(shared_secret)
+
+
+def pack_header(session_id: bytes, counter: int) -> bytes:
+    return SESSION_HEADER.pack(SESSION_VERSION, session_id, counter)
+
+
+def unpack_header(header: bytes) -> tuple[bytes, int]:
+    if len(header) != SESSION_HEADER.size:
+        raise ValueError("Invalid session header length")
+    version, session_id, counter = SESSION_HEADER.unpack(header)
+    if version != SESSION_VERSION:
+        raise ValueError(f"Unsupported session header version: {version}")
+    return session_id, counter
+
+
+class _SenderSession:
+    __slots__ = (
+        "session_id",
+        "shared_secret",
+        "encapsulated_key",
+        "created_at",
+        "messages",
+        "bytes",
+    )
+
+    def __init__(self, shared_secret: bytes, encapsulated_key: bytes):
+        self.session_id = session_id_for(encapsulated_key)
+        self.shared_secret = shared_secret
+        self.encapsulated_key = encapsulated_key
+        self.created_at = time.monotonic()
+        self.messages = 0
+        self.bytes = 0
+
+
+class HybridSessionSender:
+    def __init__(
+        self,
+        encapsulate: Callable[[bytes], Awaitable[tuple[bytes, bytes]]],
+        max_messages: int = 10000,
+        max_bytes: int = 1024**3,
+        max_age_seconds: float = 3600.0,
+        max_recipients: int = 1024,
+    ):
+        self._encapsulate = encapsulate
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.max_recipients = max_recipients
+        self._sessions: "OrderedDict[bytes, _SenderSession]" = OrderedDict()
+        self._opening: dict[bytes, asyncio.Task] = {}
+        self.encapsulations = 0
+        self.messages = 0
+
+    def _usable(self, session: _SenderSession, size: int) -> bool:
+        return (
+            session.messages < self.max_messages
+            and session.bytes + size <= self.max_bytes
+            and time.monotonic() - session.created_at < self.max_age_seconds
+        )
+
+    async def _open(self, recipient: bytes, public_key: bytes) -> _SenderSession:
+        shared_secret, encapsulated_key = await self._encapsulate(public_key)
+        self.encapsulations += 1
+        session = _SenderSession(shared_secret, encapsulated_key)
+        self._sessions[recipient] = session
+        self._sessions.move_to_end(recipient)
+        while len(self._sessions) > self.max_recipients:
+            self._sessions.popitem(last=False)
+        return session
+
+    async def next_message(
+        self, public_key: bytes, size: int
+    ) -> tuple[bytes, bytes, Optional[bytes]]:
+        """
+        Reserve the next counter for a ``size``-byte message to ``public_key``.
+        Returns (message_key, session_header, encapsulated_key); the
+        encapsulated key is only set on the first message of a session.
+        """
+        if size > self.max_bytes:
+            raise ValueError("Message exceeds the session byte limit")
+        recipient = hashlib.sha256(public_key).digest()
+        while True:
+            session = self._sessions.get(recipient)
+            if session is not None and self._usable(session, size):
+                break
+            # Concurrent first messages to one recipient share a single encapsulation
+            task = self._opening.get(recipient)
+            if task is None:
+                # Tanpa budget request pemicunya; tiap pemanggil menunggu
+                # dengan budget-nya sendiri
+                task = deadline.detach(self._open(recipient, public_key))
+                self._opening[recipient] = task
+                task.add_done_callback(lambda _: self._opening.pop(recipient, None))
+            session = await deadline.wait_shared(task, "kem_encaps")
+            if self._usable(session, size):
+                break
+
+        counter = session.messages
+        session.messages += 1
+        session.bytes += size
+        self.messages += 1
+        key = message_key(session.shared_secret, session.session_id, counter)
+        header = pack_header(session.session_id, counter)
+        return key, header, session.encapsulated_key if counter == 0 else None
+
+    def stats(self) -> dict:
+        return {
+            "recipients": len(self._sessions),
+            "encapsulations": self.encapsulations,
+            "messages": self.messages,
+            "messages_per_encapsulation": (
+                self.messages / self.encapsulations if self.encapsulations else 0.0
+            ),
+            "max_messages": self.max_messages,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+        }
+
+
+class HybridSessionReceiver:
+    def __init__(
+        self,
+        decapsulate: Callable[[bytes, bytes], Awaitable[bytes]],
+        max_messages: int = 10000,
+        max_age_seconds: float = 3600.0,
+        max_sessions: int = 1024,
+    ):
+        self._decapsulate = decapsulate
+        self.max_messages = max_messages
+        self.max_age_seconds = max_age_seconds
+        self.max_sessions = max_sessions
+        # (private key fingerprint, session_id) -> (shared_secret, expires_at)
+        self._secrets: "OrderedDict[tuple, tuple[bytes, float]]" = OrderedDict()
+        self.hits = 0
+        self.decapsulations = 0
+
+    async def message_key(
+        self,
+        private_key: bytes,
+        header: bytes,
+        encapsulated_key: Optional[bytes] = None,
+    ) -> bytes:
+        session_id, counter = unpack_header(header)
+        if counter >= self.max_messages:
+            raise ValueError("Session message limit exceeded")
+
+        cache_key = (hashlib.sha256(private_key).digest(), session_id)
+        cached = self._secrets.get(cache_key)
+        if cached is not None and cached[1] > time.monotonic():
+            self._secrets.move_to_end(cache_key)
+            self.hits += 1
+            shared_secret = cached[0]
+        else:
+            if cached is not None:
+                del self._secrets[cache_key]
+            if encapsulated_key is None:
+                raise ValueError(
+                    "Unknown or expired session; encapsulatedKey is required"
+                )
+            if session_id_for(encapsulated_key) != session_id:
+                raise ValueError("encapsulatedKey does not match session")
+            shared_secret = await self._decapsulate(private_key, encapsulated_key)
+            self.decapsulations += 1
+            self._secrets[cache_key] = (
+                shared_secret,
+                time.monotonic() + self.max_age_seconds,
+            )
+            while len(self._secrets) > self.max_sessions:
+                self._secrets.popitem(last=False)
+
+        return message_key(shared_secret, session_id, counter)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._secrets),
+            "hits": self.hits,
+            "decapsulations": self.decapsulations,
+            "max_sessions": self.max_sessions,
+        }
@@ -0,0 +1,62 @@
+"""
+CPU-bound primitives dispatched through the crypto executor.
+
+Everything here is a plain module-level function over bytes/str so it can be
+pickled into a worker process as well as called from a thread.
+"""
+
+import functools
+import hashlib
+
+import bcrypt
+from argon2 import PasswordHasher, exceptions as argon2_exceptions
+from kyber_py.ml_kem import ML_KEM_512
+
+from .kem_cache import default_kem_key_cache
+
+
+def pbkdf2_sha256(
+    material: bytes, salt: bytes, iterations: int, length: int = 32
+) -> bytes:
+    # hashlib releases the GIL for the whole derivation, unlike a Python loop
+    return hashlib.pbkdf2_hmac("sha256", material, salt, iterations, length)
+
+
+def bcrypt_hash(password: bytes) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def bcrypt_check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+@functools.lru_cache(maxsize=8)
+def _password_hasher(params: tuple) -> PasswordHasher:
+    # Built once per parameter set (per worker process) and reused
+    return PasswordHasher(**dict(params))
+
+
+def argon2id_hash(password: str, params: dict) -> str:
+    return _password_hasher(tuple(sorted(params.items()))).hash(password)
+
+
+def argon2id_verify(hashed: str, password: str) -> bool:
+    # verify() reads the cost parameters from the encoded hash itself
+    try:
+        return _password_hasher(()).verify(hashed, password)
+    except argon2_exceptions.VerifyMismatchError:
+        return False
+
+
+def kem_keygen() -> tuple[bytes, bytes]:
+    # Pure-Python ML-KEM holds the GIL; process mode gives real parallelism
+    return ML_KEM_512.keygen()
+
+
+def kem_encapsulate(public_key: bytes) -> tuple[bytes, bytes]:
+    # Uses the per-process prepared-key cache; returns (shared_secret, ciphertext)
+    return default_kem_key_cache.encapsulate(public_key)
+
+
+def kem_decapsulate(private_key: bytes, ciphertext: bytes) -> bytes:
+    return default_kem_key_cache.decapsulate(private_key, ciphertext)
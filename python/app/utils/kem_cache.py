@@ -0,0 +1,197 @@
+"""
+Cache of parsed and expanded ML-KEM key state.
+
+``kyber_py`` re-decodes ``t_hat`` and re-expands the public matrix ``A`` from
+its seed on every ``encaps``/``decaps`` call, which is most of the work for a
+repeated recipient key. ``KemKeyCache`` keeps that state per key fingerprint
+(LRU bounded) and replays only the per-message part of FIPS 203 Algorithms
+14, 17 and 18 on top of it. Results are byte-identical to ``kem.encaps`` /
+``kem.decaps``.
+
+This builds on kyber_py's internal helpers (``_generate_matrix_from_seed``,
+``_generate_error_vector`` ...), which are stable across the 1.x releases in
+requirements.txt. Cached objects are only read after preparation, so one
+cache can be shared by executor threads.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from kyber_py.ml_kem import ML_KEM_512
+from kyber_py.utilities.utils import select_bytes
+
+
+class PreparedEncapsulationKey:
+    __slots__ = ("h", "t_hat", "A_hat_T")
+
+    def __init__(self, h, t_hat, A_hat_T):
+        self.h = h
+        self.t_hat = t_hat
+        self.A_hat_T = A_hat_T
+
+
+class PreparedDecapsulationKey:
+    __slots__ = ("s_hat", "h", "z", "ek")
+
+    def __init__(self, s_hat, h, z, ek: PreparedEncapsulationKey):
+        self.s_hat = s_hat
+        self.h = h
+        self.z = z
+        self.ek = ek
+
+
+class KemKeyCache:
+    def __init__(self, kem=ML_KEM_512, max_entries: int = 256):
+        self.kem = kem
+        self.max_entries = max_entries
+        self._public: "OrderedDict[bytes, PreparedEncapsulationKey]" = OrderedDict()
+        self._private: "OrderedDict[bytes, PreparedDecapsulationKey]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, table: OrderedDict, fingerprint: bytes):
+        with self._lock:
+            prepared = table.get(fingerprint)
+            if prepared is not None:
+                table.move_to_end(fingerprint)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return prepared
+
+    def _put(self, table: OrderedDict, fingerprint: bytes, prepared) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            table[fingerprint] = prepared
+            table.move_to_end(fingerprint)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+                self.evictions += 1
+
+    def _parse_ek(self, ek: bytes) -> PreparedEncapsulationKey:
+        kem = self.kem
+        if len(ek) != 384 * kem.k + 32:
+            raise ValueError(
+                f"Type check failed, ek_pke has the wrong length, expected {384 * kem.k + 32} bytes and received {len(ek)}"
+            )
+        t_hat_bytes, rho = ek[:-32], ek[-32:]
+        t_hat = kem.M.decode_vector(t_hat_bytes, kem.k, 12, is_ntt=True)
+        if t_hat.encode(12) != t_hat_bytes:
+            raise ValueError("Modulus check failed, t_hat does not encode correctly")
+        A_hat_T = kem._generate_matrix_from_seed(rho, transpose=True)
+        return PreparedEncapsulationKey(kem._H(ek), t_hat, A_hat_T)
+
+    def prepare_encapsulation_key(self, ek: bytes) -> PreparedEncapsulationKey:
+        fingerprint = hashlib.sha256(ek).digest()
+        prepared = self._get(self._public, fingerprint)
+        if prepared is None:
+            try:
+                prepared = self._parse_ek(ek)
+            except ValueError as e:
+                raise ValueError(f"Validation of encapsulation key failed: {e = }")
+            self._put(self._public, fingerprint, prepared)
+        return prepared
+
+    def prepare_decapsulation_key(self, dk: bytes) -> PreparedDecapsulationKey:
+        fingerprint = hashlib.sha256(dk).digest()
+        prepared = self._get(self._private, fingerprint)
+        if prepared is not None:
+            return prepared
+
+        kem = self.kem
+        k = kem.k
+        if len(dk) != 768 * k + 96:
+            raise ValueError(
+                f"decapsulation type check failed. Expected {768 * k + 96} bytes and obtained {len(dk)}"
+            )
+        dk_pke = dk[0 : 384 * k]
+        ek_pke = dk[384 * k : 768 * k + 32]
+        h = dk[768 * k + 32 : 768 * k + 64]
+        z = dk[768 * k + 64 :]
+        if kem._H(ek_pke) != h:
+            raise ValueError("hash check failed")
+
+        s_hat = kem.M.decode_vector(dk_pke, k, 12, is_ntt=True)
+        prepared = PreparedDecapsulationKey(s_hat, h, z, self._parse_ek(ek_pke))
+        self._put(self._private, fingerprint, prepared)
+        return prepared
+
+    def _k_pke_encrypt(
+        self, prepared: PreparedEncapsulationKey, m: bytes, r: bytes
+    ) -> bytes:
+        # Algorithm 14 without the key decoding and matrix expansion
+        kem = self.kem
+        N = 0
+        y, N = kem._generate_error_vector(r, kem.eta_1, N)
+        e1, N = kem._generate_error_vector(r, kem.eta_2, N)
+        e2, N = kem._generate_polynomial(r, kem.eta_2, N)
+
+        y_hat = y.to_ntt()
+        u = (prepared.A_hat_T @ y_hat).from_ntt() + e1
+        mu = kem.R.decode(m, 1).decompress(1)
+        v = prepared.t_hat.dot(y_hat).from_ntt() + e2 + mu
+
+        c1 = u.compress(kem.du).encode(kem.du)
+        c2 = v.compress(kem.dv).encode(kem.dv)
+        return c1 + c2
+
+    def encapsulate(self, ek: bytes) -> tuple[bytes, bytes]:
+        """Same contract as ``kem.encaps``: returns (shared_secret, ciphertext)."""
+        prepared = self.prepare_encapsulation_key(ek)
+        m = self.kem.random_bytes(32)
+        K, r = self.kem._G(m + prepared.h)
+        return K, self._k_pke_encrypt(prepared, m, r)
+
+    def decapsulate(self, dk: bytes, c: bytes) -> bytes:
+        """Same contract as ``kem.decaps``: returns the shared secret."""
+        kem = self.kem
+        k = kem.k
+        try:
+            if len(c) != 32 * (kem.du * k + kem.dv):
+                raise ValueError(
+                    f"ciphertext type check failed. Expected {32 * (kem.du * k + kem.dv)} bytes and obtained {len(c)}"
+                )
+            prepared = self.prepare_decapsulation_key(dk)
+        except ValueError as e:
+            raise ValueError(
+                f"Validation of decapsulation key or ciphertext failed: {e = }"
+            )
+
+        n = k * kem.du * 32
+        u = kem.M.decode_vector(c[:n], k, kem.du).decompress(kem.du)
+        v = kem.R.decode(c[n:], kem.dv).decompress(kem.dv)
+        w = v - prepared.s_hat.dot(u.to_ntt()).from_ntt()
+        m_prime = w.compress(1).encode(1)
+
+        K_prime, r_prime = kem._G(m_prime + prepared.h)
+        K_bar = kem._J(prepared.z + c)
+        c_prime = self._k_pke_encrypt(prepared.ek, m_prime, r_prime)
+        return select_bytes(K_bar, K_prime, c == c_prime)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._public.clear()
+            self._private.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "public_keys": len(self._public),
+            "private_keys": len(self._private),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared by the executor jobs; in process mode every worker holds its own copy
+default_kem_key_cache = KemKeyCache(
+    max_entries=int(os.getenv("KEM_KEY_CACHE_SIZE", "256"))
+)
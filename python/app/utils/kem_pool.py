@@ -0,0 +1,132 @@
+"""
+Pre-generated ML-KEM key pairs.
+
+A background producer keeps a bounded buffer of fresh key pairs between a low
+and a high watermark, so ``/crypto/key/kem`` only pops one off a deque. Pairs
+are removed on hand-out and never returned to the buffer, so no pair is served
+twice. When the buffer is empty the caller generates its own pair on the
+crypto executor.
+
+The producer runs in an empty context. When it is first started from inside a
+request, it must not inherit that request's time budget (``deadline``), or
+every keygen would be shed once the budget ran out.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from . import deadline, jobs
+from .executor import CryptoExecutor, ExecutorSaturatedError
+
+
+class KemKeyPool:
+    def __init__(
+        self,
+        executor: CryptoExecutor,
+        keygen: Callable[[], tuple[bytes, bytes]] = jobs.kem_keygen,
+        low_watermark: int = 8,
+        high_watermark: int = 32,
+        retry_delay: float = 0.5,
+    ):
+        if low_watermark > high_watermark:
+            raise ValueError("low_watermark must not exceed high_watermark")
+        self.executor = executor
+        self.keygen = keygen
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.retry_delay = retry_delay
+        self._pairs: deque = deque()
+        self._refill = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._generated_at: deque = deque(maxlen=256)
+        self.served = 0
+        self.fallbacks = 0
+        self.generated = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, executor: CryptoExecutor) -> "KemKeyPool":
+        return cls(
+            executor,
+            low_watermark=int(os.getenv("KEM_POOL_LOW", "8")),
+            high_watermark=int(os.getenv("KEM_POOL_HIGH", "32")),
+        )
+
+    def start(self) -> None:
+        if self.high_watermark > 0 and (self._task is None or self._task.done()):
+            self._refill.set()
+            self._task = deadline.detach(self._produce())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _produce(self) -> None:
+        while True:
+            await self._refill.wait()
+            while len(self._pairs) < self.high_watermark:
+                try:
+                    pair = await self.executor.run("kem_keygen", self.keygen)
+                except ExecutorSaturatedError:
+                    # Live requests win; try again once the queue drains
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                except Exception:
+                    self.errors += 1
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                self._pairs.append(pair)
+                self.generated += 1
+                self._generated_at.append(time.monotonic())
+            self._refill.clear()
+
+    def discard(self) -> int:
+        """Drop every buffered pair, e.g. after a process snapshot was restored."""
+        dropped = len(self._pairs)
+        self._pairs.clear()
+        self._refill.set()
+        return dropped
+
+    async def acquire(self) -> tuple[bytes, bytes]:
+        """Return a (public_key, private_key) pair that no other caller will see."""
+        self.start()
+        try:
+            pair = self._pairs.popleft()
+            self.served += 1
+        except IndexError:
+            self.fallbacks += 1
+            pair = await self.executor.run("kem_keygen", self.keygen)
+        if len(self._pairs) < self.low_watermark:
+            self._refill.set()
+        return pair
+
+    def refill_rate(self) -> float:
+        """Key pairs generated per second over the recent sample window."""
+        if len(self._generated_at) < 2:
+            return 0.0
+        elapsed = self._generated_at[-1] - self._generated_at[0]
+        return (len(self._generated_at) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._pairs),
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "fill_ratio": (
+                len(self._pairs) / self.high_watermark if self.high_watermark else 0.0
+            ),
+            "producer_running": self._task is not None and not self._task.done(),
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "generated": self.generated,
+            "errors": self.errors,
+            "refill_rate_per_second": self.refill_rate(),
+        }
@@ -0,0 +1,186 @@
+"""
+Bounded cache of PBKDF2-derived keys and ready AESGCM instances.
+
+Entries are keyed by (keyed digest of the key material, salt, iterations) so
+the plaintext key never sits in the cache index. Eviction is LRU with a TTL.
+An evicted entry may still be in use: a batch holds its key across awaits,
+and coalesced waiters resume after other keys were stored. So eviction only
+drops the cache's reference, and the key bytes are overwritten in place when
+the last holder releases the entry. Concurrent misses for the same key
+share one derivation (single-flight), which is cancelled when every caller
+waiting on it has been cancelled. The derivation runs without any request's
+time budget, and each caller waits for it under its own (``deadline``).
+
+Keys taken from untrusted input (an envelope's salt) are derived with
+``admit=False``: the result is only cached once ``admit`` is called, after
+it has opened a ciphertext. Forged envelopes then cannot evict real keys.
+
+The cache is only touched from the event loop thread, so it needs no locks.
+"""
+
+import asyncio
+import functools
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from . import deadline
+from .lazy import lazy_import
+
+# Imported on first derivation, not at app import time
+aead = lazy_import("cryptography.hazmat.primitives.ciphers.aead")
+
+
+class DerivedKey:
+    __slots__ = ("key", "aesgcm", "expires_at", "usage")
+
+    def __init__(self, key: bytes, expires_at: float):
+        # bytearray so the material can be zeroized once released. AESGCM
+        # keeps its own copy inside OpenSSL which is released with the object.
+        self.key = bytearray(key)
+        self.aesgcm = aead.AESGCM(key)
+        self.expires_at = expires_at
+        # Hitungan pesan kunci ini (utils.nonces.KeyUsage), dipasang oleh pemakai
+        self.usage = None
+
+    def __del__(self) -> None:
+        # Referensi terakhir (cache atau pemanggil yang masih memakainya) hilang
+        self.key[:] = bytes(len(self.key))
+
+
+class DerivedKeyCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._digest_key = os.urandom(32)
+        self._entries: "OrderedDict[tuple, DerivedKey]" = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._waiters: dict[tuple, int] = {}  # callers awaiting each inflight task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> "DerivedKeyCache":
+        return cls(
+            max_entries=int(os.getenv("KEY_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("KEY_CACHE_TTL", "300")),
+        )
+
+    def cache_key(self, material: bytes, salt: bytes, iterations: int) -> tuple:
+        digest = hmac.new(self._digest_key, material, hashlib.sha256).digest()
+        return digest, bytes(salt), iterations
+
+    async def get_or_derive(
+        self,
+        material: bytes,
+        salt: bytes,
+        iterations: int,
+        derive: Callable[[], Awaitable[bytes]],
+        admit: bool = True,
+    ) -> DerivedKey:
+        """
+        Return the cached entry for this key, or run ``derive()`` once no matter
+        how many callers miss concurrently. With ``admit=False`` a new key is
+        not cached until it is passed to ``admit``.
+        """
+        cache_key = self.cache_key(material, salt, iterations)
+        entry = self._lookup(cache_key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = deadline.detach(self._load(cache_key, derive, admit))
+            self._inflight[cache_key] = task
+            task.add_done_callback(functools.partial(self._loaded, cache_key))
+        self._waiters[cache_key] = self._waiters.get(cache_key, 0) + 1
+        try:
+            # Shielded: a cancelled or late caller must not cancel the derivation
+            # others wait on
+            entry = await deadline.wait_shared(task, "key_derivation")
+        except asyncio.CancelledError:
+            # ...but once the last one is gone (client disconnected), nobody is
+            if self._waiters[cache_key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[cache_key] -= 1
+            if not self._waiters[cache_key]:
+                del self._waiters[cache_key]
+        if admit:
+            # Bisa jadi derivasinya dimulai oleh pemanggil dengan admit=False
+            self._admit(cache_key, entry)
+        return entry
+
+    async def _load(
+        self, cache_key: tuple, derive: Callable[[], Awaitable[bytes]], admit: bool
+    ) -> DerivedKey:
+        key = await derive()
+        entry = DerivedKey(key, time.monotonic() + self.ttl_seconds)
+        if admit:
+            self._store(cache_key, entry)
+        return entry
+
+    def admit(
+        self, material: bytes, salt: bytes, iterations: int, entry: DerivedKey
+    ) -> None:
+        """Cache ``entry``, derived with ``admit=False``, now that it proved valid."""
+        self._admit(self.cache_key(material, salt, iterations), entry)
+
+    def _admit(self, cache_key: tuple, entry: DerivedKey) -> None:
+        if self._entries.get(cache_key) is not entry:
+            self._store(cache_key, entry)
+
+    def _loaded(self, cache_key: tuple, task: asyncio.Task) -> None:
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def _lookup(self, cache_key: tuple) -> Optional[DerivedKey]:
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[cache_key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(cache_key)
+        return entry
+
+    def _store(self, cache_key: tuple, entry: DerivedKey) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries.pop(cache_key, None)
+        self._entries[cache_key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,70 @@
+"""
+Deferred construction for cold starts.
+
+Serverless invocations of the app often hit a single cheap route, so the
+crypto backends and services should only be paid for when a request needs
+them. ``LazyObject`` stands in for a module-level object and builds it on
+first attribute access. ``lazy_import`` does the same for a module.
+Construction is guarded by a lock, so concurrent first uses from threads
+build exactly once.
+
+Once built, every attribute access costs one extra ``__getattr__`` hop
+(about 0.1 us), which is negligible next to any crypto call behind it.
+"""
+
+import importlib
+import threading
+from typing import Any, Callable
+
+_UNSET = object()
+
+
+class LazyObject:
+    __slots__ = ("_lazy_factory", "_lazy_wrapped", "_lazy_lock", "_lazy_name")
+
+    def __init__(self, factory: Callable[[], Any], name: str = ""):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_wrapped", _UNSET)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+        object.__setattr__(self, "_lazy_name", name or getattr(factory, "__name__", ""))
+
+    def _lazy_load(self):
+        wrapped = object.__getattribute__(self, "_lazy_wrapped")
+        if wrapped is _UNSET:
+            with object.__getattribute__(self, "_lazy_lock"):
+                wrapped = object.__getattribute__(self, "_lazy_wrapped")
+                if wrapped is _UNSET:
+                    wrapped = object.__getattribute__(self, "_lazy_factory")()
+                    object.__setattr__(self, "_lazy_wrapped", wrapped)
+        return wrapped
+
+    def __getattr__(self, name: str):
+        return getattr(self._lazy_load(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._lazy_load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._lazy_load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        wrapped = object.__getattribute__(self, "_lazy_wrapped")
+        if wrapped is _UNSET:
+            return f"<lazy {object.__getattribute__(self, '_lazy_name')} (not loaded)>"
+        return repr(wrapped)
+
+
+def lazy_import(name: str) -> LazyObject:
+    return LazyObject(lambda: importlib.import_module(name), name)
+
+
+def loaded(obj) -> bool:
+    """False only for a ``LazyObject`` that has not been built yet."""
+    if not isinstance(obj, LazyObject):
+        return True
+    return object.__getattribute__(obj, "_lazy_wrapped") is not _UNSET
+
+
+def unwrap(obj):
+    """The real object behind ``obj``, building it if needed."""
+    return obj._lazy_load() if isinstance(obj, LazyObject) else obj
@@ -0,0 +1,147 @@
+"""
+Merkle trees over fixed-size chunks, for integrity manifests.
+
+Hashing is domain-separated as in RFC 6962. A leaf is ``H(0x00 || chunk)``
+and an inner node is ``H(0x01 || left || right)``, so a leaf can never pass
+for a node. A node without a sibling (the last one on an odd-width level) is
+promoted to the next level unchanged. The leaf count is covered by the
+manifest signature, so the shape of the tree is fixed. A verifier derives
+the shape from ``(index, leaf_count)``, and an audit path is just the list
+of sibling hashes from the leaf up: at most ceil(log2 n) of them.
+
+The manifest signature is HMAC-SHA256 over ``manifest_message``, which binds
+the algorithm, chunk size, total size, leaf count and root. ``hash_leaves``
+and ``verify_chunks`` are plain functions so they can run on the crypto
+executor.
+"""
+
+import hashlib
+import struct
+from typing import Iterable, Optional
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+MANIFEST_VERSION = 1
+HASHES = {
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+    "blake2b": hashlib.blake2b,
+}
+MIN_CHUNK_SIZE = 4 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+_MESSAGE = struct.Struct(">4sB16sIQQ")
+
+
+def check_params(algorithm: str, chunk_size: int) -> None:
+    if algorithm not in HASHES:
+        raise ValueError(
+            f"Unsupported algorithm: {algorithm} (use {', '.join(HASHES)})"
+        )
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(
+            f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE}"
+        )
+
+
+def hash_leaves(algorithm: str, blob, chunk_size: int) -> list[bytes]:
+    """Leaf hashes of consecutive ``chunk_size`` pieces of ``blob`` (last may be short)."""
+    new = HASHES[algorithm]
+    view = memoryview(blob)
+    leaves = []
+    for offset in range(0, len(view), chunk_size):
+        h = new(LEAF_PREFIX)
+        h.update(view[offset : offset + chunk_size])
+        leaves.append(h.digest())
+    return leaves
+
+
+def _node(new, left: bytes, right: bytes) -> bytes:
+    return new(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(algorithm: str, leaves: list[bytes]) -> list[list[bytes]]:
+    """All levels, leaves first and the root level (one hash) last."""
+    new = HASHES[algorithm]
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parent = [
+            _node(new, level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parent.append(level[-1])
+        levels.append(parent)
+    return levels
+
+
+def audit_path(levels: list[list[bytes]], index: int) -> list[bytes]:
+    path = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append(level[sibling])
+        index //= 2
+    return path
+
+
+def root_from_path(
+    algorithm: str, leaf: bytes, index: int, count: int, path: list[bytes]
+) -> Optional[bytes]:
+    """Recompute the root from a leaf and its audit path; None if the path is malformed."""
+    new = HASHES[algorithm]
+    node = leaf
+    remaining = iter(path)
+    width = count
+    while width > 1:
+        sibling = index ^ 1
+        if sibling < width:
+            other = next(remaining, None)
+            if other is None:
+                return None
+            node = _node(new, node, other) if index % 2 == 0 else _node(new, other, node)
+        index //= 2
+        width = (width + 1) // 2
+    if next(remaining, None) is not None:
+        return None
+    return node
+
+
+def chunk_length(index: int, chunk_size: int, size: int) -> int:
+    return max(0, min(chunk_size, size - index * chunk_size))
+
+
+def manifest_message(
+    algorithm: str, chunk_size: int, size: int, count: int, root: bytes
+) -> bytes:
+    return (
+        _MESSAGE.pack(
+            b"DSHM",
+            MANIFEST_VERSION,
+            algorithm.encode().ljust(16, b"\0"),
+            chunk_size,
+            size,
+            count,
+        )
+        + root
+    )
+
+
+def verify_chunks(
+    algorithm: str,
+    root: bytes,
+    chunk_size: int,
+    size: int,
+    count: int,
+    items: Iterable[tuple[int, bytes, list[bytes]]],
+) -> tuple[list[int], list[int]]:
+    """Check (index, data, path) items against ``root``; returns (verified, failed)."""
+    new = HASHES[algorithm]
+    verified, failed = [], []
+    for index, data, path in items:
+        ok = 0 <= index < count and len(data) == chunk_length(index, chunk_size, size)
+        if ok:
+            h = new(LEAF_PREFIX)
+            h.update(data)
+            ok = root_from_path(algorithm, h.digest(), index, count, path) == root
+        (verified if ok else failed).append(index)
+    return verified, failed
@@ -0,0 +1,318 @@
+"""
+Minimal Prometheus-compatible metrics without external dependencies.
+
+Histograms, counters and gauges keep their series in plain dicts keyed by
+label values. A series is created once under a lock. After that, recording is
+a bisect plus a few integer increments with no locking, which is safe because
+every observation happens on the event loop thread. Executor jobs are timed
+by the submitting coroutine, not inside the worker. ``render()`` produces the
+text exposition format served at ``/metrics``. Collectors registered with
+``add_collector`` are evaluated only at scrape time. That is how executor and
+cache state become gauges without any per-request cost.
+
+``MetricsMiddleware`` is a pure ASGI middleware. It resolves the route
+template once per (method, path) through ``RouteResolver``, so label
+cardinality stays bounded by the route table. Unknown paths share the "unmatched" label.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (64, 1024, 16 * 1024, 256 * 1024, 1024 * 1024)
+
+
+def size_bucket(size: int) -> str:
+    """Upper bound label of the payload-size bucket ``size`` falls in."""
+    index = bisect_left(SIZE_BUCKETS, size)
+    return str(SIZE_BUCKETS[index]) if index < len(SIZE_BUCKETS) else "+Inf"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._series: dict = {}
+        self._lock = threading.Lock()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.get(values)
+                if series is None:
+                    series = self._series[values] = self._new_series()
+        return series
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, *values, amount: float = 1.0) -> None:
+        self.labels(*values).value += amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for values, series in list(self._series.items()):
+            lines.append(
+                f"{self.name}{_labels(self.label_names, values)} {_number(series.value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class _HistogramSeries:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float, *values) -> None:
+        self.labels(*values).observe(value)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for values, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                le = 'le="' + _number(float(bound)) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.label_names, values, le)} {cumulative}"
+                )
+            labels = _labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_number(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        # Called at scrape time: () -> iterable of (name, kind, help, [(labels, value)])
+        self._collectors: list[Callable] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, label_names: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, label_names))
+
+    def gauge(self, name: str, help: str, label_names: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, label_names, buckets))
+
+    def add_collector(self, collector: Callable) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names, values = tuple(labels), tuple(labels.values())
+                    lines.append(f"{name}{_labels(names, values)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+http_request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+)
+http_requests = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_in_flight = REGISTRY.gauge(
+    "http_requests_in_flight", "Requests currently being served", ("route",)
+)
+http_exceptions = REGISTRY.counter(
+    "http_exceptions_total", "Exceptions raised while serving requests", ("route", "type")
+)
+primitive_duration = REGISTRY.histogram(
+    "crypto_primitive_duration_seconds",
+    "Time spent in a crypto primitive, by payload size bucket (bytes)",
+    ("primitive", "size"),
+)
+
+
+def observe_primitive(primitive: str, size: int, seconds: float) -> None:
+    primitive_duration.labels(primitive, size_bucket(size)).observe(seconds)
+
+
+class timed:
+    """``with timed("aes_gcm_encrypt", len(data)):`` records into the primitive histogram."""
+
+    __slots__ = ("primitive", "size", "started")
+
+    def __init__(self, primitive: str, size: int):
+        self.primitive = primitive
+        self.size = size
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe_primitive(self.primitive, self.size, time.perf_counter() - self.started)
+        return False
+
+
+def count_exception(exc: BaseException, route: str = "") -> None:
+    http_exceptions.inc(route, type(exc).__name__)
+
+
+class RouteResolver:
+    """Maps a request scope to its route template, cached per (method, path)."""
+
+    def __init__(self, max_cached_paths: int = 4096):
+        self.max_cached_paths = max_cached_paths
+        self._routes: dict[tuple[str, str], str] = {}
+
+    def __call__(self, scope) -> str:
+        cache_key = (scope["method"], scope["path"])
+        template = self._routes.get(cache_key)
+        if template is not None:
+            return template
+        template = "unmatched"
+        router = getattr(scope.get("app"), "router", None)
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match != Match.NONE:
+                template = getattr(route, "path", template)
+                if match == Match.FULL:
+                    break
+        if template != "unmatched" and len(self._routes) < self.max_cached_paths:
+            self._routes[cache_key] = template
+        return template
+
+
+class MetricsMiddleware:
+    def __init__(self, app, max_cached_paths: int = 4096):
+        self.app = app
+        self._route_template = RouteResolver(max_cached_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        in_flight = http_in_flight.labels(route)
+        in_flight.value += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            count_exception(exc, route)
+            raise
+        finally:
+            in_flight.value -= 1
+            http_request_duration.labels(method, route).observe(
+                time.perf_counter() - started
+            )
+            http_requests.labels(method, route, str(status[0])).value += 1
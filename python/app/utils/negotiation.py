@@ -0,0 +1,214 @@
+"""
+Content negotiation for the crypto endpoints.
+
+JSON with base64 fields stays the default. Two binary alternatives skip the
+base64 round trip and the extra copies that come with it:
+
+- ``application/octet-stream``: the body is one raw payload, and everything
+  else (key, iv, tag ...) travels in ``X-*`` headers, base64 encoded where
+  binary.
+- ``application/msgpack`` / ``application/cbor``: a map with the same field
+  names as the JSON model, where binary fields are raw byte strings instead
+  of base64. These need the optional ``msgpack`` / ``cbor2`` packages;
+  without them the media type is answered with 415.
+
+The response format follows ``Accept``, highest q-value first, and types
+with ``q=0`` are never chosen. Ties keep the header's order. A wildcard (or
+no ``Accept`` at all) means the request's format. If nothing acceptable is
+offered by the route, the answer is 406.
+"""
+
+import base64
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import BaseModel, ValidationError
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional dependency
+    cbor2 = None
+
+JSON = "application/json"
+OCTET_STREAM = "application/octet-stream"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+FRAMED = (MSGPACK, CBOR)
+SUPPORTED = (JSON, OCTET_STREAM, MSGPACK, CBOR)
+
+
+def _normalize(value: str) -> str:
+    media = value.split(";", 1)[0].strip().lower()
+    return _ALIASES.get(media, media)
+
+
+def request_media_type(request: Request) -> str:
+    content_type = request.headers.get("content-type")
+    if not content_type:
+        return JSON
+    media = _normalize(content_type)
+    if media not in SUPPORTED:
+        raise HTTPException(status_code=415, detail=f"Unsupported media type: {media}")
+    return media
+
+
+def _quality(candidate: str) -> float:
+    for parameter in candidate.split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def response_media_type(
+    request: Request, request_media: str, offered: tuple = SUPPORTED
+) -> str:
+    """The reply format among ``offered``: by q-value, then header order."""
+    accept = request.headers.get("accept")
+    if not accept:
+        return request_media
+    ranked = [(_quality(c), _normalize(c)) for c in accept.split(",") if c.strip()]
+    refused = {media for quality, media in ranked if quality <= 0}
+    # sorted() is stable: equal q-values keep the client's order
+    for quality, media in sorted(ranked, key=lambda item: -item[0]):
+        if quality <= 0:
+            break
+        if media in offered:
+            return media
+        if media in ("*/*", "application/*"):
+            for choice in (request_media, *offered):
+                if choice in offered and choice not in refused:
+                    return choice
+    raise HTTPException(status_code=406, detail="Not acceptable")
+
+
+def _require_codec(media: str):
+    codec = msgpack if media == MSGPACK else cbor2
+    if codec is None:
+        package = "msgpack" if media == MSGPACK else "cbor2"
+        raise HTTPException(
+            status_code=415, detail=f"{media} needs the optional '{package}' package"
+        )
+    return codec
+
+
+def decode_frame(media: str, body: bytes) -> dict:
+    codec = _require_codec(media)
+    try:
+        frame = (
+            codec.unpackb(body, raw=False) if media == MSGPACK else codec.loads(body)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Malformed {media} body: {e}")
+    if not isinstance(frame, dict):
+        raise HTTPException(status_code=400, detail=f"{media} body must be a map")
+    return frame
+
+
+def encode_frame(media: str, payload: dict) -> bytes:
+    codec = _require_codec(media)
+    if media == MSGPACK:
+        return codec.packb(payload, use_bin_type=True)
+    # cbor2 would encode a memoryview as an array of ints
+    return codec.dumps(
+        {
+            name: bytes(value) if isinstance(value, memoryview) else value
+            for name, value in payload.items()
+        }
+    )
+
+
+async def read_request(request: Request, model: type[BaseModel]) -> tuple[str, Any]:
+    """
+    Returns (media type, payload): a validated ``model`` for JSON, a dict for
+    MessagePack/CBOR and the raw body for octet-stream.
+    """
+    media = request_media_type(request)
+    body = await request.body()
+    if media == JSON:
+        try:
+            return media, model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+    if media in FRAMED:
+        return media, decode_frame(media, body)
+    return media, body
+
+
+def field(frame: dict, name: str, kind: type, required: bool = True) -> Any:
+    value = frame.get(name)
+    if value is None and not required:
+        return None
+    if kind is bytes and isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if not isinstance(value, kind):
+        raise HTTPException(
+            status_code=400, detail=f"Field '{name}' must be {kind.__name__}"
+        )
+    return value
+
+
+def header(
+    request: Request, name: str, binary: bool = False, required: bool = True
+) -> Any:
+    value: Optional[str] = request.headers.get(name)
+    if value is None:
+        if not required:
+            return None
+        raise HTTPException(status_code=400, detail=f"Missing {name} header")
+    return decode_header(value, name) if binary else value
+
+
+def decode_header(value: str, name: str) -> bytes:
+    """Base64 header value to bytes; 400 if it is not base64."""
+    try:
+        return base64.b64decode(value, validate=True)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"{name} header must be base64")
+
+
+def binary_response(
+    media: str, payload: dict, raw: Optional[bytes] = None, headers: dict = None
+) -> Response:
+    """Build a framed or octet-stream response; ``raw`` is the octet-stream body."""
+    if media == OCTET_STREAM:
+        encoded_headers = {
+            name: base64.b64encode(value).decode() if isinstance(value, bytes) else value
+            for name, value in (headers or {}).items()
+        }
+        return Response(raw, media_type=OCTET_STREAM, headers=encoded_headers)
+    return Response(encode_frame(media, payload), media_type=media)
+
+
+def openapi_body(model: type[BaseModel], octet_headers: str = "") -> dict:
+    """``openapi_extra`` documenting the negotiated request body of a route."""
+    framed = {"schema": {"type": "object", "description": "Same fields, bytes unencoded"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                JSON: {"schema": model.model_json_schema()},
+                OCTET_STREAM: {
+                    "schema": {"type": "string", "format": "binary"},
+                    "description": octet_headers,
+                },
+                MSGPACK: framed,
+                CBOR: framed,
+            },
+        }
+    }
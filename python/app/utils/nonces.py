@@ -0,0 +1,185 @@
+"""
+AES-GCM nonces without a syscall per message, and per-key message limits.
+
+GCM breaks if a (key, nonce) pair ever repeats. ``os.urandom(12)`` per
+message is safe, but the getrandom syscall costs more than half as much as
+encrypting a small message. ``NonceManager`` has two modes (NONCE_MODE):
+
+random   (default) 96-bit random nonces, made ``buffer_nonces`` at a time by
+         one ``os.urandom`` call and handed out with ``list.pop``, which is
+         atomic under the GIL, so threads share the buffer without a lock.
+counter  the deterministic construction of SP 800-38D 8.2.1: a 4-byte
+         per-worker prefix (the fixed field) followed by a 64-bit counter
+         (the invocation field). No randomness is needed per message, and a
+         worker never repeats a nonce, whatever key it is used with. The
+         prefix is random per worker and the counter starts at a random
+         point below 2^63, so two workers only collide if their prefixes
+         match (2^-32) and their counter ranges overlap. This is the mode
+         for keys that see far more than 2^32 messages.
+
+Callers that reuse a key pass its ``KeyUsage`` (``usage(key)``, looked up by
+a keyed BLAKE2b fingerprint in an LRU table of NONCE_TRACKED_KEYS keys).
+``next`` raises ``NonceLimitError`` once that key has sealed
+NONCE_KEY_LIMIT messages, and the caller re-keys. The default limit is 2^32
+in random mode, the SP 800-38D bound for random IVs, where the chance of
+any repeat is about 2^-33. In counter mode it is 2^48. Counts are per
+worker: for a key shared by N workers, divide the limit by N. A key evicted
+from the table starts counting from zero again.
+
+The buffer, prefix and counter belong to one process. A forked child draws
+new ones (``os.register_at_fork``), and so must a restored snapshot
+(``reset``). Otherwise the copies would hand out the same nonces.
+"""
+
+import hashlib
+import itertools
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional
+
+NONCE_SIZE = 12
+PREFIX_SIZE = 4
+DEFAULT_LIMITS = {"random": 2**32, "counter": 2**48}
+
+
+class NonceLimitError(ValueError):
+    pass
+
+
+class KeyUsage:
+    __slots__ = ("issued", "messages")
+
+    def __init__(self):
+        # next() pada itertools.count atomik di bawah GIL: hitungan tetap
+        # tepat walau beberapa thread memakai kunci yang sama
+        self.issued = itertools.count(1)
+        self.messages = 0
+
+
+class NonceManager:
+    def __init__(
+        self,
+        mode: str = "random",
+        buffer_nonces: int = 1024,
+        max_messages: Optional[int] = None,
+        max_keys: int = 65536,
+    ):
+        if mode not in DEFAULT_LIMITS:
+            raise ValueError(
+                f"Unsupported nonce mode: {mode} (use {', '.join(DEFAULT_LIMITS)})"
+            )
+        self.mode = mode
+        self.buffer_nonces = max(1, buffer_nonces)
+        self.max_messages = max_messages or DEFAULT_LIMITS[mode]
+        self.max_keys = max_keys
+        self._fingerprint = hashlib.blake2b(key=os.urandom(32), digest_size=16)
+        self._keys: "OrderedDict[bytes, KeyUsage]" = OrderedDict()
+        self._counting = mode == "counter"
+        self.refills = 0
+        self.limit_hits = 0
+        self.resets = 0
+        self._draw()
+        _managers.add(self)
+
+    @classmethod
+    def from_env(cls) -> "NonceManager":
+        """
+        NONCE_MODE (random|counter), NONCE_BUFFER_SIZE (nonces per urandom
+        call), NONCE_KEY_LIMIT (0: the mode's default), NONCE_TRACKED_KEYS
+        """
+        return cls(
+            mode=os.getenv("NONCE_MODE", "random"),
+            buffer_nonces=int(os.getenv("NONCE_BUFFER_SIZE", "1024")),
+            max_messages=int(os.getenv("NONCE_KEY_LIMIT", "0")),
+            max_keys=int(os.getenv("NONCE_TRACKED_KEYS", "65536")),
+        )
+
+    def _draw(self) -> None:
+        self._lock = threading.Lock()
+        self._pool: list[bytes] = []
+        self.prefix = os.urandom(PREFIX_SIZE)
+        # Mulai di titik acak di bawah 2^63, jadi 8 byte tidak akan pernah habis
+        self._counter = itertools.count(int.from_bytes(os.urandom(8), "big") >> 1)
+
+    def reset(self) -> None:
+        """New prefix and counter, buffered nonces dropped: after a fork or restore."""
+        self._draw()
+        self.resets += 1
+
+    def _refill(self) -> bytes:
+        block = os.urandom(NONCE_SIZE * self.buffer_nonces)
+        pool = [block[i : i + NONCE_SIZE] for i in range(0, len(block), NONCE_SIZE)]
+        nonce = pool.pop()
+        # Thread lain yang juga mengisi ulang hanya membuang nonce segar
+        self._pool = pool
+        self.refills += 1
+        return nonce
+
+    def next(self, usage: Optional[KeyUsage] = None) -> bytes:
+        """
+        A fresh 12-byte nonce. With ``usage``, counts the message against its
+        key and raises ``NonceLimitError`` once the key is used up.
+        """
+        # Jalur panas: satu panggilan fungsi per nonce, tanpa lock
+        if usage is not None:
+            usage.messages = issued = next(usage.issued)
+            if issued > self.max_messages:
+                self.limit_hits += 1
+                raise NonceLimitError("Key has reached its AES-GCM message limit")
+        if self._counting:
+            return self.prefix + next(self._counter).to_bytes(8, "big")
+        try:
+            return self._pool.pop()
+        except IndexError:
+            return self._refill()
+
+    def usage(self, key: bytes) -> KeyUsage:
+        fingerprint = self._fingerprint.copy()
+        fingerprint.update(key)
+        digest = fingerprint.digest()
+        usage = self._keys.get(digest)
+        if usage is not None:
+            try:
+                self._keys.move_to_end(digest)
+            except KeyError:
+                pass  # evicted by another thread meanwhile
+            return usage
+        with self._lock:
+            usage = self._keys.get(digest)
+            if usage is None:
+                usage = self._keys[digest] = KeyUsage()
+                while len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+        return usage
+
+    def stats(self) -> dict:
+        usages = list(self._keys.values())
+        return {
+            "mode": self.mode,
+            "prefix": self.prefix.hex() if self.mode == "counter" else None,
+            "buffer_nonces": self.buffer_nonces,
+            "buffered": len(self._pool),
+            "refills": self.refills,
+            "max_messages_per_key": self.max_messages,
+            "tracked_keys": len(usages),
+            "max_key_messages": max((u.messages for u in usages), default=0),
+            "limit_hits": self.limit_hits,
+            "resets": self.resets,
+        }
+
+
+_managers: "weakref.WeakSet[NonceManager]" = weakref.WeakSet()
+
+
+def _reset_after_fork() -> None:
+    for manager in list(_managers):
+        manager.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# Shared by the services and executor threads; one per process
+default_nonce_manager = NonceManager.from_env()
@@ -0,0 +1,297 @@
+"""
+Opt-in statistical stack sampler for live workers.
+
+A daemon thread wakes every ``interval`` seconds, walks
+``sys._current_frames()`` and counts each thread's stack in collapsed form
+(``thread;outer;...;inner count``), the input format of flamegraph.pl and
+speedscope. Nothing runs until a profile is requested, and only one sampler
+is active per process at a time.
+
+Overhead: every sample holds the GIL while it walks all thread stacks, about
+5-20 us per thread at typical depths. Frame labels are memoised per code
+object. At the default 10 ms interval with a dozen threads, that is well
+under 2% of one core. The interval is clamped to at least 1 ms, a profile to
+at most PROFILE_MAX_SECONDS, and stacks to ``max_depth`` frames and
+``max_stacks`` distinct entries. Every profile reports its own measured
+sampling time, so the overhead of any run can be checked.
+
+Per-request mode: a request carrying ``X-Profile: 1`` and a valid API key is
+sampled for its whole duration. The response gets an ``X-Profile-Id``
+header, and if the request took longer than PROFILE_SLOW_MS the profile is
+kept under that id. Samples cover the whole process, so concurrent requests
+show up too.
+"""
+
+import asyncio
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+# Leaf frames that mean "waiting for work"; dropped unless idle=True
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+class StackProfile:
+    def __init__(self, stacks: dict, samples: int, duration: float, overhead: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.sampling_seconds = overhead
+
+    def collapsed(self) -> str:
+        ordered = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in ordered)
+
+    def summary(self) -> dict:
+        return {
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "duration_seconds": round(self.duration, 3),
+            "sampling_seconds": round(self.sampling_seconds, 4),
+            "overhead_ratio": (
+                round(self.sampling_seconds / self.duration, 4) if self.duration else 0.0
+            ),
+        }
+
+
+class StackSampler:
+    def __init__(
+        self,
+        interval: float = 0.01,
+        max_depth: int = 64,
+        max_stacks: int = 10000,
+        idle: bool = False,
+    ):
+        self.interval = max(interval, 0.001)
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.idle = idle
+        self._stacks: dict[str, int] = {}
+        self._labels: dict = {}  # code object -> "func (file.py:line)"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._samples = 0
+        self._sampling_seconds = 0.0
+        self._started = 0.0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, own_ident: int, names: dict) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            leaf = frame.f_code
+            if not self.idle and (
+                (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES
+            ):
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            stack = ";".join(reversed(labels))
+            if stack in self._stacks:
+                self._stacks[stack] += 1
+            elif len(self._stacks) < self.max_stacks:
+                self._stacks[stack] = 1
+            else:
+                self._stacks["[truncated]"] = self._stacks.get("[truncated]", 0) + 1
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            if self._samples % 100 == 0:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            self._sample(own_ident, names)
+            self._samples += 1
+            self._sampling_seconds += time.perf_counter() - started
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> StackProfile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return StackProfile(
+            dict(self._stacks),
+            self._samples,
+            time.perf_counter() - self._started,
+            self._sampling_seconds,
+        )
+
+
+class Profiler:
+    def __init__(
+        self,
+        interval: float = 0.01,
+        max_seconds: float = 60.0,
+        slow_threshold: float = 0.5,
+        keep: int = 32,
+    ):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._requests: "OrderedDict[str, tuple[dict, StackProfile]]" = OrderedDict()
+        self._keep = keep
+        self.sessions = 0
+        self.request_profiles = 0
+        self.busy_skips = 0
+        self._recent_overhead: deque = deque(maxlen=32)
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        """PROFILE_INTERVAL_MS, PROFILE_MAX_SECONDS, PROFILE_SLOW_MS, PROFILE_KEEP"""
+        return cls(
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+            max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "60")),
+            slow_threshold=float(os.getenv("PROFILE_SLOW_MS", "500")) / 1000,
+            keep=int(os.getenv("PROFILE_KEEP", "32")),
+        )
+
+    def try_start(
+        self, interval: Optional[float] = None, idle: bool = False
+    ) -> Optional[StackSampler]:
+        if not self._lock.acquire(blocking=False):
+            self.busy_skips += 1
+            return None
+        sampler = StackSampler(interval or self.interval, idle=idle)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler) -> StackProfile:
+        try:
+            profile = sampler.stop()
+        finally:
+            self._lock.release()
+        self._recent_overhead.append(profile.summary()["overhead_ratio"])
+        return profile
+
+    async def profile_for(
+        self, seconds: float, interval: Optional[float] = None, idle: bool = False
+    ) -> StackProfile:
+        if seconds <= 0 or seconds > self.max_seconds:
+            raise ValueError(f"seconds must be in (0, {self.max_seconds}]")
+        sampler = self.try_start(interval, idle)
+        if sampler is None:
+            raise ProfilerBusyError("Another profile is already running")
+        self.sessions += 1
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = self.finish(sampler)
+        return profile
+
+    def next_request_id(self) -> str:
+        return f"req-{next(self._ids)}"
+
+    def record_request(self, profile_id: str, info: dict, profile: StackProfile) -> None:
+        self.request_profiles += 1
+        self._requests[profile_id] = (info, profile)
+        while len(self._requests) > self._keep:
+            self._requests.popitem(last=False)
+
+    def get_request(self, profile_id: str) -> Optional[StackProfile]:
+        entry = self._requests.get(profile_id)
+        return entry[1] if entry else None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._lock.locked(),
+            "interval_ms": self.interval * 1000,
+            "max_seconds": self.max_seconds,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "sessions": self.sessions,
+            "request_profiles": self.request_profiles,
+            "busy_skips": self.busy_skips,
+            "max_overhead_ratio": max(self._recent_overhead, default=0.0),
+            "requests": [
+                {"id": profile_id, **info, **profile.summary()}
+                for profile_id, (info, profile) in reversed(self._requests.items())
+            ],
+        }
+
+
+class ProfilingMiddleware:
+    """Samples requests sent with ``X-Profile: 1`` and a valid API key header."""
+
+    def __init__(self, app, profiler: Profiler, api_key_header: str, api_key: str):
+        self.app = app
+        self.profiler = profiler
+        self.api_key_header = api_key_header.lower().encode()
+        self.api_key = api_key.encode() if api_key else None
+
+    def _wants_profile(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        return (
+            headers.get(b"x-profile") == b"1"
+            and self.api_key is not None
+            and hmac.compare_digest(
+                headers.get(self.api_key_header, b""), self.api_key
+            )
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = self.profiler.try_start()
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.profiler.next_request_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            profile = self.profiler.finish(sampler)
+            if elapsed >= self.profiler.slow_threshold:
+                self.profiler.record_request(
+                    profile_id,
+                    {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "elapsed_ms": round(elapsed * 1000, 3),
+                    },
+                    profile,
+                )
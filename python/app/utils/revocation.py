@@ -0,0 +1,302 @@
+"""
+Token revocation checks without I/O on the hot path.
+
+Every token carries a ``jti``. Revoked ids live in a ``RevocationStore``
+(SQLite, shared by the workers of a host), and each worker mirrors them in Bloom filters, so most
+checks are answered "definitely not revoked" from memory. A negative
+check costs one keyed BLAKE2b of the jti and usually one or two bit probes,
+about 1 us. Only a possible hit (a revoked token or a ~1% false positive)
+goes to the exact store.
+
+Filters are bucketed by expiry window (the token's ``exp`` //
+REVOCATION_WINDOW_SECONDS), and a token is only probed against its own
+window. Once a window has passed, every token in it has expired, so the
+whole filter is dropped. Memory therefore stays bounded by the revocations
+of still-live tokens, however long the process runs. A window that outgrows
+its capacity gets another filter chained behind it, so the false positive
+rate holds. An id revoked without its token's ``exp`` (the admin API) goes
+into every window up to REVOCATION_MAX_TTL from now.
+
+"Log out everywhere" revokes by subject instead: every token of that user
+with an ``iat`` at or before the cutoff. Cutoffs are kept in a plain dict
+(one lookup per check) and dropped REVOCATION_MAX_TTL later, when all
+tokens they cover have expired. Tokens carry a sub-second ``iat`` from the
+same clock as the cutoff, so a login right after the cutoff is not revoked.
+
+The filters are built from the store on first use. After that each worker
+tails the store every REVOCATION_SYNC_SECONDS, in the background, to pick up
+revocations made by other workers. A revocation is immediate on the worker
+that made it and takes at most about that interval to reach the others.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import time
+from typing import Optional
+
+from ..repositories.revocation_repository import RevocationStore
+from . import deadline
+
+
+class BloomFilter:
+    __slots__ = ("size", "hashes", "bits", "count", "capacity")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(8, math.ceil(bits))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, digest: bytes) -> None:
+        # Double hashing (Kirsch-Mitzenmacher) from one 128-bit digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    def __init__(
+        self,
+        store: RevocationStore,
+        window_seconds: float = 86400.0,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+        sync_seconds: float = 1.0,
+        max_ttl: float = 7 * 86400.0,
+    ):
+        self.store = store
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.max_ttl = max_ttl
+        self._hasher = hashlib.blake2b(key=os.urandom(32), digest_size=16)
+        self._filters: dict[int, list[BloomFilter]] = {}
+        self._last_id = 0
+        # sub -> (cutoff, exp)
+        self._subjects: dict[str, tuple[float, float]] = {}
+        self._last_subject_id = 0
+        self._subjects_expire = math.inf
+        self._loading: Optional[asyncio.Task] = None
+        self._loaded = False
+        self._syncing: Optional[asyncio.Task] = None
+        self._next_sync = 0.0
+        self.checks = 0
+        self.possible_hits = 0
+        self.false_positives = 0
+        self.revoked = 0
+        self.windows_dropped = 0
+        self.sync_errors = 0
+        self.subjects_revoked = 0
+
+    @classmethod
+    def from_env(cls, store: RevocationStore) -> "RevocationList":
+        """
+        REVOCATION_WINDOW_SECONDS, REVOCATION_BLOOM_CAPACITY (per window),
+        REVOCATION_BLOOM_ERROR_RATE, REVOCATION_SYNC_SECONDS, REVOCATION_MAX_TTL
+        """
+        return cls(
+            store,
+            window_seconds=float(os.getenv("REVOCATION_WINDOW_SECONDS", "86400")),
+            capacity=int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000")),
+            error_rate=float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.01")),
+            sync_seconds=float(os.getenv("REVOCATION_SYNC_SECONDS", "1")),
+            max_ttl=float(os.getenv("REVOCATION_MAX_TTL", str(7 * 86400))),
+        )
+
+    def _digest(self, jti: str) -> bytes:
+        hasher = self._hasher.copy()
+        hasher.update(jti.encode())
+        return hasher.digest()
+
+    def _insert(self, jti: str, exp: float, exp_known: bool = True) -> None:
+        last = int(exp // self.window_seconds)
+        first = last if exp_known else int(time.time() // self.window_seconds)
+        digest = self._digest(jti)
+        for window in range(first, last + 1):
+            filters = self._filters.get(window)
+            if filters is None:
+                filters = self._filters[window] = [
+                    BloomFilter(self.capacity, self.error_rate)
+                ]
+            elif any(digest in bloom for bloom in filters):
+                # Already there, e.g. a local revocation read back by the sync
+                continue
+            elif filters[-1].count >= filters[-1].capacity:
+                filters.append(BloomFilter(self.capacity, self.error_rate))
+            filters[-1].add(digest)
+
+    def might_be_revoked(self, jti: str, exp: float) -> bool:
+        """The in-memory half of the check: False means definitely not revoked."""
+        filters = self._filters.get(int(exp // self.window_seconds))
+        if filters is None:
+            return False
+        digest = self._digest(jti)
+        return any(digest in bloom for bloom in filters)
+
+    def _apply(self, rows) -> None:
+        for row_id, jti, exp, exp_known in rows:
+            self._insert(jti, exp, exp_known)
+            self._last_id = max(self._last_id, row_id)
+
+    def _apply_subjects(self, rows) -> None:
+        for row_id, sub, before in rows:
+            self._revoke_subject(sub, before)
+            self._last_subject_id = max(self._last_subject_id, row_id)
+
+    def _revoke_subject(self, sub: str, before: float) -> None:
+        current = self._subjects.get(sub)
+        if current is None or current[0] < before:
+            self._subjects[sub] = (before, before + self.max_ttl)
+            self._subjects_expire = min(self._subjects_expire, before + self.max_ttl)
+
+    def _rotate(self, now: float) -> None:
+        current = int(now // self.window_seconds)
+        for window in [w for w in self._filters if w < current]:
+            del self._filters[window]
+            self.windows_dropped += 1
+        for sub in [s for s, (_, exp) in self._subjects.items() if exp <= now]:
+            del self._subjects[sub]
+        self._subjects_expire = min(
+            (exp for _, exp in self._subjects.values()), default=math.inf
+        )
+
+    async def _load(self) -> None:
+        now = time.time()
+        self._apply(await self.store.since(0, now))
+        self._apply_subjects(await self.store.subjects_since(0, now))
+        self._next_sync = time.monotonic() + self.sync_seconds
+        self._loaded = True
+
+    async def ready(self) -> None:
+        """Build the filters from the store; concurrent first callers share one load."""
+        if self._loaded:
+            return
+        if self._loading is None or self._loading.done():
+            # A failed load is retried by the next check instead of failing open
+            self._loading = deadline.detach(self._load())
+        await asyncio.shield(self._loading)
+
+    async def _sync(self) -> None:
+        now = time.time()
+        try:
+            self._apply(await self.store.since(self._last_id, now))
+            self._apply_subjects(
+                await self.store.subjects_since(self._last_subject_id, now)
+            )
+            if self._rotate_due(now):
+                self._rotate(now)
+                await self.store.purge(now)
+        except Exception:
+            self.sync_errors += 1
+
+    def _rotate_due(self, now: float) -> bool:
+        oldest = min(self._filters, default=None)
+        if oldest is not None and oldest < int(now // self.window_seconds):
+            return True
+        return self._subjects_expire <= now
+
+    def _maybe_sync(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sync or (self._syncing and not self._syncing.done()):
+            return
+        self._next_sync = now + self.sync_seconds
+        self._syncing = deadline.detach(self._sync())
+
+    async def is_revoked(self, claims: dict) -> bool:
+        """
+        True if the token with these (already verified) claims was revoked.
+        Tokens issued without a ``jti`` can only be revoked by subject.
+        """
+        if not self._loaded:
+            await self.ready()
+        self._maybe_sync()
+        self.checks += 1
+        if self._subjects:
+            cutoff = self._subjects.get(claims.get("sub"))
+            # Tokens without iat predate the cutoff as far as we can tell
+            if cutoff is not None and claims.get("iat", 0) <= cutoff[0]:
+                return True
+        jti = claims.get("jti")
+        if not jti:
+            return False
+        exp = claims.get("exp") or time.time() + self.max_ttl
+        if not self.might_be_revoked(jti, exp):
+            return False
+        self.possible_hits += 1
+        if await self.store.contains(jti):
+            return True
+        self.false_positives += 1
+        return False
+
+    async def revoke(
+        self, jti: str, exp: Optional[float] = None, sub: Optional[str] = None
+    ) -> bool:
+        """
+        Revoke ``jti`` until ``exp``, the token's own expiry. Without it the id
+        is revoked for REVOCATION_MAX_TTL from now, whatever its token's
+        expiry. Returns False if it was already revoked.
+        """
+        await self.ready()
+        exp_known = bool(exp)
+        exp = float(exp) if exp_known else time.time() + self.max_ttl
+        added = await self.store.add(jti, exp, sub, exp_known)
+        # Langsung berlaku di worker ini; worker lain lewat sync
+        self._insert(jti, exp, exp_known)
+        if added:
+            self.revoked += 1
+        return added
+
+    async def revoke_subject(self, sub: str, before: Optional[float] = None) -> float:
+        """Revoke every token of ``sub`` issued up to ``before`` (default: now)."""
+        await self.ready()
+        before = time.time() if before is None else float(before)
+        await self.store.add_subject(sub, before, before + self.max_ttl)
+        self._revoke_subject(sub, before)
+        self.subjects_revoked += 1
+        return before
+
+    async def close(self) -> None:
+        for task in (self._syncing, self._loading):
+            if task is not None and not task.done():
+                task.cancel()
+        await self.store.close()
+
+    def stats(self) -> dict:
+        filters = [bloom for window in self._filters.values() for bloom in window]
+        return {
+            "windows": len(self._filters),
+            "filters": len(filters),
+            "entries": sum(bloom.count for bloom in filters),
+            "memory_bytes": sum(len(bloom.bits) for bloom in filters),
+            "window_seconds": self.window_seconds,
+            "capacity_per_filter": self.capacity,
+            "error_rate": self.error_rate,
+            "checks": self.checks,
+            "possible_hits": self.possible_hits,
+            "false_positives": self.false_positives,
+            "revoked": self.revoked,
+            "subjects": len(self._subjects),
+            "subjects_revoked": self.subjects_revoked,
+            "windows_dropped": self.windows_dropped,
+            "sync_errors": self.sync_errors,
+            "last_id": self._last_id,
+        }
@@ -2,9 +2,9 @@ from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
-import os
 import hmac
-import hashlib
+from .hmac_cache import default_hmac_cache
+from .nonces import default_nonce_manager
 
 class SecurityUtils:
     @staticmethod
@@ -20,7 +20,8 @@ class SecurityUtils:
     @staticmethod
     def aes_gcm_encrypt(data: str, key: bytes) -> dict:
         aesgcm = AESGCM(key)
-        iv = os.urandom(12)
+        # Kunci dari pemanggil bisa dipakai berulang: pesannya dihitung per kunci
+        iv = default_nonce_manager.next(default_nonce_manager.usage(key))
         encrypted = aesgcm.encrypt(iv, data.encode(), None)
         return {
             "encrypted": base64.b64encode(encrypted[:-16]).decode(),
@@ -39,17 +40,11 @@ class SecurityUtils:
 
     @staticmethod
     def create_signature(data: str, key: str) -> str:
-        return hmac.new(
-            key.encode(),
-            data.encode(),
-            hashlib.sha512
-        ).hexdigest()
+        return default_hmac_cache.digest(key.encode(), data.encode(), "sha512").hex()
 
     @staticmethod
     def verify_signature(data: str, signature: str, key: str) -> bool:
-        expected = hmac.new(
-            key.encode(),
-            data.encode(),
-            hashlib.sha512
-        ).hexdigest()
+        expected = default_hmac_cache.digest(
+            key.encode(), data.encode(), "sha512"
+        ).hex()
         return hmac.compare_digest(signature, expected) 
\ No newline at end of file
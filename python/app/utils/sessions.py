@@ -0,0 +1,367 @@
+"""
+Refresh-token sessions, expired by a timer wheel.
+
+Every refresh token issued by ``AuthService`` is recorded as a session: its
+``jti`` (the session id), the user and the token's ``exp``. Sessions are
+indexed by user, for listing and "log out everywhere", and scheduled on a
+``TimerWheel`` by expiry. Each call advances the wheel first, so expired
+sessions are dropped at O(expired) cost instead of by a periodic full scan.
+
+The store belongs to one process. Across workers the revocation list
+enforces rotation and logout-everywhere: rotation revokes the old jti and
+logout revokes the user's tokens by subject, both in the shared revocation
+store. A worker handed a valid refresh token it has no session for (one
+issued by another worker) records its successor when it rotates it.
+
+Snapshots (SESSION_SNAPSHOT_PATH) are columnar and little-endian:
+
+    header   magic "RTSS", u16 version, u32 sessions, u32 users, f64 written_at
+    users    u32 byte length per user, then the UTF-8 names back to back
+    sids     u32 byte length per session id, then the ids back to back
+    columns  u32 user index, f64 exp, f64 created (one array each)
+    trailer  u32 CRC-32 of everything before it
+
+That comes to about 49 bytes per session with 22-character ids. Each array
+is read with one ``frombytes`` call, and expired sessions are skipped on load.
+Writes go to a temporary file that is renamed over the snapshot. When
+another worker has rewritten the file since this one read it, the two are
+merged instead of overwritten. A session ended on one worker can then
+reappear in another worker's list after a restart until it expires. It is
+still revoked, so it can never be used.
+"""
+
+import gc
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate
+from typing import Optional
+
+from .timer_wheel import TimerWheel
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process, nothing to coordinate
+    fcntl = None
+
+MAGIC = b"RTSS"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIId")
+_CRC = struct.Struct("<I")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class Session:
+    __slots__ = ("sid", "sub", "exp", "created")
+
+    def __init__(self, sid: str, sub: str, exp: float, created: float):
+        self.sid = sid
+        self.sub = sub
+        self.exp = exp
+        self.created = created
+
+    def to_dict(self) -> dict:
+        return {
+            "sid": self.sid,
+            "sub": self.sub,
+            "expires_at": self.exp,
+            "created_at": self.created,
+        }
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.view = memoryview(data)
+        self.offset = 0
+
+    def take(self, size: int) -> memoryview:
+        if self.offset + size > len(self.view):
+            raise SnapshotError("Session snapshot is truncated")
+        chunk = self.view[self.offset : self.offset + size]
+        self.offset += size
+        return chunk
+
+    def array(self, typecode: str, count: int) -> array:
+        values = array(typecode)
+        values.frombytes(self.take(values.itemsize * count))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def strings(self, count: int) -> list[str]:
+        lengths = self.array("I", count)
+        blob = bytes(self.take(sum(lengths)))
+        ends = list(accumulate(lengths))
+        starts = [0, *ends[:-1]]
+        text = blob.decode()
+        if len(text) != len(blob):
+            # Non-ASCII: byte offsets no longer match string offsets
+            return [blob[a:b].decode() for a, b in zip(starts, ends)]
+        return [text[a:b] for a, b in zip(starts, ends)]
+
+
+class SessionStore:
+    def __init__(self, tick_seconds: float = 1.0, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self._sessions: dict[str, Session] = {}
+        self._by_user: dict[str, set[str]] = {}
+        self._wheel = TimerWheel(tick=tick_seconds, now=time.time())
+        # written_at of the snapshot this process last read or wrote
+        self._snapshot_mark: Optional[float] = None
+        self.created = 0
+        self.rotated = 0
+        self.ended = 0
+        self.expired = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionStore":
+        """SESSION_SNAPSHOT_PATH (empty: no snapshots), SESSION_TICK_SECONDS"""
+        return cls(
+            tick_seconds=float(os.getenv("SESSION_TICK_SECONDS", "1")),
+            snapshot_path=os.getenv("SESSION_SNAPSHOT_PATH") or None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self, now: float) -> None:
+        expired = self._wheel.advance(now)
+        for sid in expired:
+            self._unlink(sid)
+        self.expired += len(expired)
+
+    def _unlink(self, sid: str) -> Optional[Session]:
+        session = self._sessions.pop(sid, None)
+        if session is not None:
+            sids = self._by_user[session.sub]
+            sids.discard(sid)
+            if not sids:
+                del self._by_user[session.sub]
+        return session
+
+    def _link(self, session: Session) -> None:
+        self._sessions[session.sid] = session
+        sids = self._by_user.get(session.sub)
+        if sids is None:
+            sids = self._by_user[session.sub] = set()
+        sids.add(session.sid)
+        self._wheel.schedule(session.sid, session.exp)
+
+    def add(
+        self, sid: str, sub: str, exp: float, created: Optional[float] = None
+    ) -> Session:
+        now = time.time()
+        self._expire(now)
+        self._unlink(sid)
+        session = Session(sid, sub, float(exp), now if created is None else created)
+        self._link(session)
+        self.created += 1
+        return session
+
+    def get(self, sid: str) -> Optional[Session]:
+        now = time.time()
+        self._expire(now)
+        session = self._sessions.get(sid)
+        # The wheel works in whole ticks; exp itself is exact
+        if session is None or session.exp <= now:
+            return None
+        return session
+
+    def remove(self, sid: str) -> Optional[Session]:
+        self._expire(time.time())
+        session = self._unlink(sid)
+        if session is not None:
+            self._wheel.cancel(sid)
+            self.ended += 1
+        return session
+
+    def rotate(
+        self, old_sid: str, new_sid: str, sub: str, exp: float
+    ) -> Optional[Session]:
+        """
+        Replace session ``old_sid`` by ``new_sid``. Returns the old session,
+        or None if this process did not know it.
+        """
+        self._expire(time.time())
+        old = self._unlink(old_sid)
+        if old is not None:
+            self._wheel.cancel(old_sid)
+        self.add(new_sid, sub, exp, created=old.created if old else None)
+        self.rotated += 1
+        return old
+
+    def remove_user(self, sub: str) -> list[Session]:
+        self._expire(time.time())
+        sessions = [self._unlink(sid) for sid in list(self._by_user.get(sub, ()))]
+        for session in sessions:
+            self._wheel.cancel(session.sid)
+        self.ended += len(sessions)
+        return sessions
+
+    def for_user(self, sub: str) -> list[Session]:
+        self._expire(time.time())
+        sessions = [self._sessions[sid] for sid in self._by_user.get(sub, ())]
+        return sorted(sessions, key=lambda session: session.created)
+
+    def dump(self, written_at: Optional[float] = None) -> bytes:
+        written_at = time.time() if written_at is None else written_at
+        self._expire(written_at)
+        users: dict[str, int] = {}
+        user_index, exps, created = array("I"), array("d"), array("d")
+        sids = []
+        for session in self._sessions.values():
+            index = users.get(session.sub)
+            if index is None:
+                index = users[session.sub] = len(users)
+            user_index.append(index)
+            exps.append(session.exp)
+            created.append(session.created)
+            sids.append(session.sid.encode())
+        names = [name.encode() for name in users]
+        parts = [
+            _HEADER.pack(MAGIC, VERSION, len(sids), len(names), written_at),
+            _little_endian(array("I", map(len, names))),
+            b"".join(names),
+            _little_endian(array("I", map(len, sids))),
+            b"".join(sids),
+            _little_endian(user_index),
+            _little_endian(exps),
+            _little_endian(created),
+        ]
+        crc = 0
+        for part in parts:
+            crc = zlib.crc32(part, crc)
+        parts.append(_CRC.pack(crc))
+        return b"".join(parts)
+
+    @staticmethod
+    def parse(data: bytes) -> tuple[float, list[tuple[str, str, float, float]]]:
+        """(written_at, [(sid, sub, exp, created)]) from ``dump`` output."""
+        if len(data) < _HEADER.size + _CRC.size:
+            raise SnapshotError("Session snapshot is truncated")
+        (crc,) = _CRC.unpack_from(data, len(data) - _CRC.size)
+        if zlib.crc32(memoryview(data)[: -_CRC.size]) != crc:
+            raise SnapshotError("Session snapshot checksum mismatch")
+        magic, version, count, user_count, written_at = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError("Not a session snapshot (or unsupported version)")
+        reader = _Reader(data)
+        reader.take(_HEADER.size)
+        users = reader.strings(user_count)
+        sids = reader.strings(count)
+        user_index = reader.array("I", count)
+        exps = reader.array("d", count)
+        created = reader.array("d", count)
+        subs = [users[index] for index in user_index]
+        return written_at, list(zip(sids, subs, exps, created))
+
+    def load(self, data: bytes) -> int:
+        """Add the live sessions of a snapshot; returns how many were added."""
+        written_at, rows = self.parse(data)
+        self._snapshot_mark = written_at
+        return self._load_rows(rows)
+
+    def _load_rows(self, rows) -> int:
+        now = time.time()
+        self._expire(now)
+        sessions, by_user = self._sessions, self._by_user
+        timers = []
+        # Millions of acyclic objects: collector passes would only slow this down
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for sid, sub, exp, created in rows:
+                if exp <= now or sid in sessions:
+                    continue
+                sessions[sid] = Session(sid, sub, exp, created)
+                sids = by_user.get(sub)
+                if sids is None:
+                    sids = by_user[sub] = set()
+                sids.add(sid)
+                timers.append((sid, exp))
+            self._wheel.schedule_many(timers)
+        finally:
+            if collecting:
+                gc.enable()
+        return len(timers)
+
+    def restore(self, path: Optional[str] = None) -> int:
+        """Load the snapshot at ``path`` (default SESSION_SNAPSHOT_PATH), if any."""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, "rb") as snapshot:
+            return self.load(snapshot.read())
+
+    def save(self, path: Optional[str] = None) -> int:
+        """
+        Write a snapshot to ``path`` (default SESSION_SNAPSHOT_PATH); returns
+        the number of sessions written. Runs on the event loop thread: the
+        dump must not interleave with requests changing the store.
+        """
+        path = path or self.snapshot_path
+        if not path:
+            return 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with _locked(path + ".lock"):
+            if os.path.exists(path):
+                with open(path, "rb") as snapshot:
+                    existing = snapshot.read()
+                try:
+                    written_at, rows = self.parse(existing)
+                except SnapshotError:
+                    written_at, rows = self._snapshot_mark, []
+                if written_at != self._snapshot_mark:
+                    # Another worker wrote it since we last did: keep its sessions
+                    self._load_rows(rows)
+            written_at = time.time()
+            data = self.dump(written_at)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as snapshot:
+                snapshot.write(data)
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(temporary, path)
+        self._snapshot_mark = written_at
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        self._expire(time.time())
+        return {
+            "sessions": len(self._sessions),
+            "users": len(self._by_user),
+            "created": self.created,
+            "rotated": self.rotated,
+            "ended": self.ended,
+            "expired": self.expired,
+            "snapshot_path": self.snapshot_path,
+            "wheel": self._wheel.stats(),
+        }
+
+
+@contextmanager
+def _locked(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
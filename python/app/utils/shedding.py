@@ -0,0 +1,240 @@
+"""
+Deadline-aware load shedding for the expensive routes.
+
+Routes are ranked by cost class. Unlisted routes (/, HMAC, admin, metrics)
+are "light" and pass straight through. The others get a time budget: the
+``X-Request-Timeout`` header (seconds) when the client sends one, otherwise
+the class default. Before its body is read, such a request is answered with
+503 and Retry-After when:
+
+- the crypto executor queue is fuller than the class threshold. KDF routes
+  go at 50% of CRYPTO_EXECUTOR_MAX_QUEUE and ML-KEM routes at 80%, so
+  bcrypt/Argon2id/PBKDF2 traffic is shed first and the rest keep headroom;
+- the executor's estimated queue wait already exceeds the remaining budget.
+
+The budget then travels with the request (``deadline.current()``). The
+executor refuses jobs that will not fit in it and drops queued jobs that
+outlived it, and admission waits no longer than it. Once the body has been
+read, a client disconnect cancels the handler. That releases its semaphore
+or admission slot and cancels its pool job if no worker has started it; a
+job already running finishes, and its result is discarded. The request is
+then logged with status 499.
+
+Shed requests are counted per route and reason (overload, deadline,
+expired, disconnect) in ``http_requests_shed_total`` and
+``/admin/load-shedding/stats``.
+"""
+
+import asyncio
+import math
+import os
+import time
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from . import deadline
+from .metrics import REGISTRY, RouteResolver
+
+# (default budget in seconds, shed above this fraction of the executor queue)
+COST_CLASSES = {
+    "crypto": (2.0, 0.8),
+    "kdf": (5.0, 0.5),
+}
+CLIENT_CLOSED_REQUEST = 499
+
+http_shed = REGISTRY.counter(
+    "http_requests_shed_total",
+    "Requests shed or cancelled before completion, by route and reason",
+    ("route", "reason"),
+)
+
+
+def _parse_pairs(value: str) -> dict[str, float]:
+    pairs = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            pairs[name.strip()] = float(number)
+    return pairs
+
+
+class LoadShedder:
+    def __init__(
+        self,
+        routes: dict[str, str],
+        budgets: Optional[dict[str, float]] = None,
+        thresholds: Optional[dict[str, float]] = None,
+        executor=None,
+        header: str = "X-Request-Timeout",
+        max_budget: float = 60.0,
+        enabled: bool = True,
+    ):
+        unknown = set(routes.values()) - set(COST_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown cost class: {', '.join(sorted(unknown))}")
+        self.routes = dict(routes)
+        self.budgets = {name: budget for name, (budget, _) in COST_CLASSES.items()}
+        self.budgets.update(budgets or {})
+        self.thresholds = {name: share for name, (_, share) in COST_CLASSES.items()}
+        self.thresholds.update(thresholds or {})
+        self.executor = executor
+        self.header = header.lower().encode()
+        self.max_budget = max_budget
+        self.enabled = enabled
+        self._shed: dict[str, dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls, routes: dict[str, str], executor=None) -> "LoadShedder":
+        """
+        LOAD_SHEDDING=1|0, LOAD_SHED_BUDGETS="kdf=5,crypto=2" (seconds),
+        LOAD_SHED_THRESHOLDS="kdf=0.5,crypto=0.8" (share of the executor queue),
+        DEADLINE_HEADER, DEADLINE_MAX_SECONDS
+        """
+        return cls(
+            routes,
+            budgets=_parse_pairs(os.getenv("LOAD_SHED_BUDGETS", "")),
+            thresholds=_parse_pairs(os.getenv("LOAD_SHED_THRESHOLDS", "")),
+            executor=executor,
+            header=os.getenv("DEADLINE_HEADER", "X-Request-Timeout"),
+            max_budget=float(os.getenv("DEADLINE_MAX_SECONDS", "60")),
+            enabled=os.getenv("LOAD_SHEDDING", "1") == "1",
+        )
+
+    def cost_class(self, route: str) -> Optional[str]:
+        return self.routes.get(route) if self.enabled else None
+
+    def budget(self, route: str, cost: str, headers) -> deadline.RequestBudget:
+        seconds = self.budgets.get(cost)
+        for name, value in headers:
+            if name == self.header:
+                try:
+                    requested = float(value)
+                except ValueError:
+                    break
+                if math.isfinite(requested):
+                    seconds = min(max(requested, 0.0), self.max_budget)
+                break
+        return deadline.RequestBudget(
+            route, time.monotonic() + seconds if seconds is not None else None
+        )
+
+    def check(self, cost: str, budget: deadline.RequestBudget) -> Optional[tuple]:
+        """(reason, retry_after) when the request should be shed at the door."""
+        executor = self.executor
+        if executor is None:
+            return None
+        wait = executor.estimated_wait()
+        if executor.pending >= executor.max_pending * self.thresholds[cost]:
+            return "overload", wait
+        if wait >= budget.remaining():
+            return "deadline", wait
+        return None
+
+    def record(self, route: str, reason: str) -> None:
+        counts = self._shed.setdefault(route, {})
+        counts[reason] = counts.get(reason, 0) + 1
+        http_shed.inc(route, reason)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "header": self.header.decode(),
+            "budgets_seconds": self.budgets,
+            "thresholds": self.thresholds,
+            "estimated_wait_seconds": (
+                self.executor.estimated_wait() if self.executor is not None else 0.0
+            ),
+            "routes": self.routes,
+            "shed": self._shed,
+        }
+
+
+def _rejection(reason: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Request shed ({reason}), retry later"},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class LoadSheddingMiddleware:
+    """Pure ASGI middleware applying a ``LoadShedder`` to every HTTP request."""
+
+    def __init__(self, app, shedder: LoadShedder):
+        self.app = app
+        self.shedder = shedder
+        self._route_template = RouteResolver()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self._route_template(scope)
+        cost = self.shedder.cost_class(route)
+        if cost is None:
+            await self.app(scope, receive, send)
+            return
+
+        budget = self.shedder.budget(route, cost, scope["headers"])
+        rejected = self.shedder.check(cost, budget)
+        if rejected is not None:
+            self.shedder.record(route, rejected[0])
+            await _rejection(*rejected)(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        state = {"started": False, "finished": False, "disconnected": False}
+        disconnected = asyncio.Event()
+        watcher: Optional[asyncio.Task] = None
+
+        async def watch_disconnect():
+            # The body has been read, so the next message can only be a disconnect
+            await receive()
+            disconnected.set()
+            if not state["finished"]:
+                state["disconnected"] = True
+                task.cancel()
+
+        async def receive_wrapper():
+            nonlocal watcher
+            if watcher is not None:
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body"):
+                watcher = asyncio.ensure_future(watch_disconnect())
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body"
+            ):
+                # Before send(): the server may wake the watcher as it completes
+                state["finished"] = True
+            await send(message)
+
+        token = deadline.activate(budget)
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except asyncio.CancelledError:
+            if not state["disconnected"]:
+                raise
+            task.uncancel()
+            budget.shed("disconnect")
+            if not state["started"]:
+                try:
+                    await send(
+                        {"type": "http.response.start", "status": CLIENT_CLOSED_REQUEST}
+                    )
+                    await send({"type": "http.response.body", "body": b""})
+                except OSError:
+                    pass
+        finally:
+            deadline.reset(token)
+            if watcher is not None and not watcher.done():
+                watcher.cancel()
+            if budget.shed_reason is not None:
+                self.shedder.record(route, budget.shed_reason)
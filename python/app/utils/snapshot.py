@@ -0,0 +1,35 @@
+"""
+Optional warm snapshot of the initialised app.
+
+Some platforms checkpoint a fully initialised process and restore copies of
+it for later cold starts (AWS Lambda SnapStart exposes this to Python through
+the ``snapshot_restore_py`` runtime hooks). When those hooks are importable,
+the app registers a before-snapshot hook that runs the warmup and builds the
+lazy services, so restored instances skip both. An after-restore hook then
+replaces per-process random material that restored copies would otherwise
+share.
+
+Everywhere else (including Vercel, whose warm instances simply keep module
+state between invocations) ``install`` does nothing. WARM_SNAPSHOT=0 turns
+it off where it is available.
+"""
+
+import os
+from typing import Callable
+
+try:
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+except ImportError:  # optional, only present on snapshotting runtimes
+    register_before_snapshot = register_after_restore = None
+
+
+def available() -> bool:
+    return register_before_snapshot is not None
+
+
+def install(before: Callable[[], None], after_restore: Callable[[], None]) -> bool:
+    if not available() or os.getenv("WARM_SNAPSHOT", "1") == "0":
+        return False
+    register_before_snapshot(before)
+    register_after_restore(after_restore)
+    return True
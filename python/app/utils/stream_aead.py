@@ -0,0 +1,130 @@
+"""
+Segmented AES-256-GCM for payloads that do not fit in memory.
+
+Format (STREAM construction)::
+
+    header  = magic "DSHS" | version (1) | chunk_size (u32 BE) | salt (16) | nonce_prefix (7)
+    segment = AES-GCM(plaintext[i*chunk_size : (i+1)*chunk_size]) || tag (16)
+
+Every segment except the last carries exactly ``chunk_size`` bytes of
+plaintext; the last carries 0..chunk_size bytes. The nonce of segment ``i`` is
+``nonce_prefix | i (u32 BE) | final flag (1 byte)`` and the header is bound to
+each segment as AAD, so reordering, truncation and header tampering all fail
+authentication. Both directions hold at most one segment in memory.
+"""
+
+import os
+import struct
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"DSHS"
+VERSION = 1
+HEADER = struct.Struct(">4sBI16s7s")
+HEADER_SIZE = HEADER.size
+TAG_SIZE = 16
+MIN_CHUNK_SIZE = 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_SEGMENTS = 2**32 - 1
+
+
+def _nonce(prefix: bytes, index: int, final: bool) -> bytes:
+    if index >= MAX_SEGMENTS:
+        raise ValueError("Stream too long for this chunk size")
+    return prefix + struct.pack(">IB", index, 1 if final else 0)
+
+
+def parse_header(header: bytes) -> tuple[int, bytes, bytes]:
+    """Return (chunk_size, salt, nonce_prefix) from a stream header."""
+    if len(header) < HEADER_SIZE:
+        raise ValueError("Truncated stream header")
+    magic, version, chunk_size, salt, prefix = HEADER.unpack(header[:HEADER_SIZE])
+    if magic != MAGIC:
+        raise ValueError("Not an encrypted stream")
+    if version != VERSION:
+        raise ValueError(f"Unsupported stream version: {version}")
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"Invalid stream chunk size: {chunk_size}")
+    return chunk_size, salt, prefix
+
+
+class StreamEncryptor:
+    def __init__(self, key: bytes, salt: bytes, chunk_size: int):
+        if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(
+                f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE}"
+            )
+        self.chunk_size = chunk_size
+        self._aesgcm = AESGCM(key)
+        self._prefix = os.urandom(7)
+        self.header = HEADER.pack(MAGIC, VERSION, chunk_size, salt, self._prefix)
+        self._buffer = bytearray()
+        self._index = 0
+        self._finalized = False
+
+    def _seal(self, plaintext: bytes, final: bool) -> bytes:
+        nonce = _nonce(self._prefix, self._index, final)
+        self._index += 1
+        return self._aesgcm.encrypt(nonce, plaintext, self.header)
+
+    def update(self, data: bytes) -> bytes:
+        """Buffer ``data`` and return every segment that is known not to be last."""
+        if self._finalized:
+            raise ValueError("Stream already finalized")
+        self._buffer += data
+        out = []
+        # Keep at least one byte back: only EOF decides which segment is final
+        while len(self._buffer) > self.chunk_size:
+            out.append(self._seal(bytes(self._buffer[: self.chunk_size]), False))
+            del self._buffer[: self.chunk_size]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        if self._finalized:
+            raise ValueError("Stream already finalized")
+        self._finalized = True
+        segment = self._seal(bytes(self._buffer), True)
+        self._buffer.clear()
+        return segment
+
+
+class StreamDecryptor:
+    def __init__(self, key: bytes, header: bytes):
+        self.chunk_size, _, self._prefix = parse_header(header)
+        self.header = bytes(header[:HEADER_SIZE])
+        self._segment_size = self.chunk_size + TAG_SIZE
+        self._aesgcm = AESGCM(key)
+        self._buffer = bytearray()
+        self._index = 0
+        self._finalized = False
+
+    def _open(self, segment: bytes, final: bool) -> bytes:
+        nonce = _nonce(self._prefix, self._index, final)
+        try:
+            plaintext = self._aesgcm.decrypt(nonce, segment, self.header)
+        except InvalidTag:
+            raise ValueError(f"Authentication failed for stream segment {self._index}")
+        self._index += 1
+        return plaintext
+
+    def update(self, data: bytes) -> bytes:
+        """Verify and return plaintext for every complete non-final segment."""
+        if self._finalized:
+            raise ValueError("Stream already finalized")
+        self._buffer += data
+        out = []
+        while len(self._buffer) > self._segment_size:
+            out.append(self._open(bytes(self._buffer[: self._segment_size]), False))
+            del self._buffer[: self._segment_size]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        if self._finalized:
+            raise ValueError("Stream already finalized")
+        self._finalized = True
+        if len(self._buffer) < TAG_SIZE:
+            raise ValueError("Truncated stream")
+        plaintext = self._open(bytes(self._buffer), True)
+        self._buffer.clear()
+        return plaintext
@@ -0,0 +1,21 @@
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator consumes the request body.
+
+    The stock StreamingResponse reads ``receive()`` in parallel to watch for
+    disconnects, which steals the request body messages the iterator is
+    waiting on. Here a disconnect surfaces as ``ClientDisconnect`` from
+    ``request.stream()`` (or OSError on send) instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,167 @@
+"""
+Hierarchical timer wheel (Varghese & Lauck), used to expire sessions.
+
+Time is cut into ticks. Level 0 has one slot per tick for the next ``slots``
+ticks. Each level above covers ``slots`` times the span of the one below it
+with the same number of slots: with the defaults (1 s ticks, 64 slots, 4
+levels) that is about 1 minute, 68 minutes, 73 hours and 194 days. A timer
+goes into the coarsest slot that still tells it apart from "now". When the
+wheel reaches that slot, the timers in it are moved one level down, and they
+end up in level 0 for their exact tick.
+
+Scheduling and cancelling are O(1). ``advance`` touches only the slots of
+the ticks that passed and the timers in them. A timer is moved at most
+``levels - 1`` times before it fires, so expiring n timers costs O(n) and
+never depends on how many timers are still pending. Timers beyond the top
+level wait in an overflow list, which is redistributed once per top-level
+turn.
+
+Timers never fire early. They fire on the first ``advance`` at or after
+their deadline, rounded up to a whole tick.
+"""
+
+import math
+from typing import Hashable, Iterable
+
+_OVERFLOW = -1
+
+
+class TimerWheel:
+    def __init__(
+        self,
+        tick: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+        now: float = 0.0,
+    ):
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("TimerWheel needs tick > 0, slots >= 2 and levels >= 1")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        # spans[level]: ticks covered by one slot of that level
+        self._spans = [slots**level for level in range(levels + 1)]
+        self._wheels: list[list[dict]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: dict = {}
+        # key -> (level, slot), so cancel() finds its timer without searching
+        self._where: dict[Hashable, tuple[int, int]] = {}
+        self._current = math.floor(now / tick)
+        self.fired = 0
+        self.cascaded = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def _place(self, key: Hashable, due: int, earliest: int) -> None:
+        # The slot of the current tick has already been read, except while
+        # cascading into it
+        due = max(due, earliest)
+        delta = due - self._current
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                slot = (due // self._spans[level]) % self.slots
+                self._wheels[level][slot][key] = due
+                self._where[key] = (level, slot)
+                return
+        self._overflow[key] = due
+        self._where[key] = (_OVERFLOW, 0)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """(Re)schedule ``key`` to fire at ``deadline`` (same clock as ``advance``)."""
+        self.cancel(key)
+        self._place(key, math.ceil(deadline / self.tick), self._current + 1)
+
+    def schedule_many(self, timers: Iterable[tuple[Hashable, float]]) -> None:
+        """``schedule`` for many (key, deadline) pairs, e.g. restoring a snapshot."""
+        tick, slots, current = self.tick, self.slots, self._current
+        wheels, where, overflow = self._wheels, self._where, self._overflow
+        # (level, ticks per slot, first delta that no longer fits the level)
+        bounds = [
+            (level, self._spans[level], self._spans[level + 1])
+            for level in range(self.levels)
+        ]
+        for key, deadline in timers:
+            if key in where:
+                self.cancel(key)
+            due = -int(-deadline // tick)  # ceil
+            if due <= current:
+                due = current + 1
+            delta = due - current
+            for level, span, limit in bounds:
+                if delta < limit:
+                    slot = (due // span) % slots
+                    wheels[level][slot][key] = due
+                    where[key] = (level, slot)
+                    break
+            else:
+                overflow[key] = due
+                where[key] = (_OVERFLOW, 0)
+
+    def cancel(self, key: Hashable) -> bool:
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        level, slot = where
+        if level == _OVERFLOW:
+            del self._overflow[key]
+        else:
+            del self._wheels[level][slot][key]
+        return True
+
+    def _cascade(self, timers: dict) -> None:
+        for key, due in timers.items():
+            self._place(key, due, self._current)
+        self.cascaded += len(timers)
+
+    def advance(self, now: float) -> list:
+        """Move the wheel to ``now`` and return the keys whose deadline passed."""
+        target = math.floor(now / self.tick)
+        if target <= self._current:
+            return []
+        if not self._where:
+            # Nothing scheduled: skip the idle ticks instead of walking them
+            self._current = target
+            return []
+        expired = []
+        wheels, spans, slots = self._wheels, self._spans, self.slots
+        while self._current < target:
+            self._current += 1
+            tick = self._current
+            if tick % spans[self.levels] == 0 and self._overflow:
+                overflow, self._overflow = self._overflow, {}
+                self._cascade(overflow)
+            # Coarse levels first, so their timers can land in this tick's slot
+            for level in range(self.levels - 1, 0, -1):
+                if tick % spans[level] == 0:
+                    slot = (tick // spans[level]) % slots
+                    timers = wheels[level][slot]
+                    if timers:
+                        wheels[level][slot] = {}
+                        self._cascade(timers)
+            timers = wheels[0][tick % slots]
+            if timers:
+                wheels[0][tick % slots] = {}
+                for key in timers:
+                    del self._where[key]
+                expired.extend(timers)
+            if not self._where:
+                self._current = target
+        self.fired += len(expired)
+        return expired
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._where),
+            "overflow": len(self._overflow),
+            "fired": self.fired,
+            "cascaded": self.cascaded,
+            "tick_seconds": self.tick,
+            "slots": self.slots,
+            "levels": self.levels,
+            "horizon_seconds": self._spans[self.levels] * self.tick,
+        }
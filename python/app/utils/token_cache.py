@@ -0,0 +1,129 @@
+"""
+Cache of verified JWT claims for the refresh-token endpoints.
+
+Clients retry refreshes in tight loops, so the same refresh token is decoded
+and HMAC-verified over and over. Successful verifications are cached under a
+keyed digest of the token until the token's own ``exp`` (LRU bounded), and
+failures are never cached. Each cache is bound to a secret fingerprint. When
+the signing secret changes, every entry verified under the old secret is
+dropped.
+
+Access tokens minted from one refresh token are reused for a short grace
+window, so a refresh stampede yields one token instead of thousands of
+near-identical ones.
+
+Only touched from the event loop thread, so no locks.
+"""
+
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .lazy import lazy_import
+
+jwt = lazy_import("jwt")
+
+
+class VerifiedTokenCache:
+    def __init__(self, max_entries: int = 4096, grace_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.grace_seconds = grace_seconds
+        self._digest_key = os.urandom(32)
+        self._secret_fingerprint: Optional[bytes] = None
+        # token digest -> (claims, exp)
+        self._claims: "OrderedDict[bytes, tuple[dict, float]]" = OrderedDict()
+        # token digest -> (access_token, reusable_until)
+        self._minted: "OrderedDict[bytes, tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rotations = 0
+        self.minted = 0
+        self.reused = 0
+
+    @classmethod
+    def from_env(cls) -> "VerifiedTokenCache":
+        return cls(
+            max_entries=int(os.getenv("TOKEN_CACHE_SIZE", "4096")),
+            grace_seconds=float(os.getenv("TOKEN_REUSE_GRACE", "5")),
+        )
+
+    def _digest(self, token: str) -> bytes:
+        return hmac.new(self._digest_key, token.encode(), hashlib.sha256).digest()
+
+    def _check_secret(self, secret: str) -> None:
+        fingerprint = hmac.new(self._digest_key, secret.encode(), hashlib.sha256).digest()
+        if fingerprint != self._secret_fingerprint:
+            if self._secret_fingerprint is not None:
+                self.rotations += 1
+            self.clear()
+            self._secret_fingerprint = fingerprint
+
+    def decode(self, token: str, secret: str, algorithms: list[str]) -> dict:
+        """``jwt.decode`` with the same errors, served from cache while valid."""
+        self._check_secret(secret)
+        digest = self._digest(token)
+        cached = self._claims.get(digest)
+        if cached is not None:
+            claims, exp = cached
+            if exp > time.time():
+                self._claims.move_to_end(digest)
+                self.hits += 1
+                return dict(claims)
+            # Expired: drop it and let jwt.decode raise ExpiredSignatureError
+            del self._claims[digest]
+            self._minted.pop(digest, None)
+
+        self.misses += 1
+        claims = jwt.decode(token, secret, algorithms=algorithms)
+        exp = claims.get("exp")
+        if self.max_entries > 0 and isinstance(exp, (int, float)):
+            self._claims[digest] = (dict(claims), float(exp))
+            while len(self._claims) > self.max_entries:
+                evicted, _ = self._claims.popitem(last=False)
+                self._minted.pop(evicted, None)
+                self.evictions += 1
+        return claims
+
+    def mint_once(self, token: str, mint: Callable[[], str]) -> str:
+        """
+        Return the access token minted for ``token`` within the last
+        ``grace_seconds``, or call ``mint()`` and remember the result.
+        """
+        digest = self._digest(token)
+        now = time.monotonic()
+        cached = self._minted.get(digest)
+        if cached is not None and cached[1] > now:
+            self.reused += 1
+            return cached[0]
+
+        access_token = mint()
+        self.minted += 1
+        if self.grace_seconds > 0 and digest in self._claims:
+            self._minted[digest] = (access_token, now + self.grace_seconds)
+            self._minted.move_to_end(digest)
+            while len(self._minted) > self.max_entries:
+                self._minted.popitem(last=False)
+        return access_token
+
+    def clear(self) -> None:
+        self._claims.clear()
+        self._minted.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._claims),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "secret_rotations": self.rotations,
+            "grace_seconds": self.grace_seconds,
+            "access_tokens_minted": self.minted,
+            "access_tokens_reused": self.reused,
+        }
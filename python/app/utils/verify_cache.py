@@ -0,0 +1,130 @@
+"""
+Opt-in cache of successful password verifications.
+
+Step-up and re-auth flows verify the same (password, hash) pair again within
+seconds, at 100-300 ms of bcrypt/Argon2id CPU each time. When enabled
+(PASSWORD_VERIFY_CACHE_TTL > 0), a positive result is remembered for a short
+TTL under an HMAC of (algorithm, password, hash) with a per-process random key,
+so neither the password nor a plain hash of it is ever stored. Failed checks
+are never cached, so a wrong password always pays the full verification cost.
+
+Entries recorded for a username are dropped when that user's hash changes
+through ``AuthService.register``.
+"""
+
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+
+class PasswordVerifyCache:
+    def __init__(self, ttl_seconds: float = 0.0, max_entries: int = 4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._digest_key = os.urandom(32)
+        # digest -> (expires_at, username)
+        self._entries: "OrderedDict[bytes, tuple[float, Optional[str]]]" = OrderedDict()
+        self._by_user: dict[str, set[bytes]] = {}
+        self._cost: dict[str, float] = {}  # EWMA seconds per verification
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.cpu_seconds_saved = 0.0
+
+    @classmethod
+    def from_env(cls) -> "PasswordVerifyCache":
+        """PASSWORD_VERIFY_CACHE_TTL (seconds, 0 disables), PASSWORD_VERIFY_CACHE_SIZE"""
+        return cls(
+            ttl_seconds=float(os.getenv("PASSWORD_VERIFY_CACHE_TTL", "0")),
+            max_entries=int(os.getenv("PASSWORD_VERIFY_CACHE_SIZE", "4096")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _digest(self, algorithm: str, password: bytes, password_hash: bytes) -> bytes:
+        mac = hmac.new(self._digest_key, digestmod=hashlib.sha256)
+        for part in (algorithm.encode(), password, password_hash):
+            mac.update(len(part).to_bytes(4, "big"))
+            mac.update(part)
+        return mac.digest()
+
+    def _remove(self, digest: bytes) -> None:
+        _, username = self._entries.pop(digest)
+        if username is not None:
+            digests = self._by_user.get(username)
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del self._by_user[username]
+
+    async def verify(
+        self,
+        algorithm: str,
+        password: bytes,
+        password_hash: bytes,
+        check: Callable[[], Awaitable[bool]],
+        username: Optional[str] = None,
+    ) -> bool:
+        """Return ``await check()``, or a cached True for a recent match."""
+        if not self.enabled:
+            return await check()
+
+        digest = self._digest(algorithm, password, password_hash)
+        entry = self._entries.get(digest)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                self.cpu_seconds_saved += self._cost.get(algorithm, 0.0)
+                return True
+            self._remove(digest)
+
+        self.misses += 1
+        started = time.perf_counter()
+        valid = await check()
+        elapsed = time.perf_counter() - started
+        previous = self._cost.get(algorithm)
+        self._cost[algorithm] = (
+            elapsed if previous is None else previous * 0.8 + elapsed * 0.2
+        )
+
+        if valid:
+            if digest in self._entries:
+                self._remove(digest)
+            self._entries[digest] = (time.monotonic() + self.ttl_seconds, username)
+            if username is not None:
+                self._by_user.setdefault(username, set()).add(digest)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return valid
+
+    def invalidate_user(self, username: str) -> None:
+        for digest in self._by_user.pop(username, ()):
+            if self._entries.pop(digest, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "cpu_seconds_saved": round(self.cpu_seconds_saved, 3),
+        }
@@ -0,0 +1,97 @@
+"""
+Import and exercise the heavy crypto dependencies once before serving.
+
+The first bcrypt, Argon2id, PBKDF2, AES-GCM and ML-KEM call in a process pays
+for module imports, OpenSSL/CFFI initialisation and lazily built tables.
+``warm_up`` pays that cost up front with the cheapest parameters each
+primitive accepts. ``python -m python.serve`` runs it in the parent before
+forking, so workers inherit warm modules through copy-on-write. Under plain
+uvicorn the app runs it at startup instead.
+
+Until it has finished, ``is_ready()`` is False and ``/ready`` answers 503.
+"""
+
+import importlib
+import os
+import threading
+import time
+
+HEAVY_MODULES = (
+    "cryptography.hazmat.primitives.ciphers.aead",
+    "cryptography.hazmat.primitives.kdf.pbkdf2",
+    "argon2",
+    "bcrypt",
+    "jwt",
+    "kyber_py.ml_kem",
+)
+
+_lock = threading.Lock()
+_report: dict = {}
+_ready = threading.Event()
+
+
+def _exercise() -> dict:
+    import bcrypt
+    from argon2 import PasswordHasher
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from kyber_py.ml_kem import ML_KEM_512
+
+    def pbkdf2():
+        PBKDF2HMAC(
+            algorithm=hashes.SHA256(), length=32, salt=b"\0" * 16, iterations=1
+        ).derive(b"warmup")
+
+    def aes_gcm():
+        AESGCM(AESGCM.generate_key(256)).encrypt(os.urandom(12), b"warmup", None)
+
+    def ml_kem():
+        ek, dk = ML_KEM_512.keygen()
+        key, ct = ML_KEM_512.encaps(ek)
+        ML_KEM_512.decaps(dk, ct)
+
+    steps = {
+        "bcrypt": lambda: bcrypt.hashpw(b"warmup", bcrypt.gensalt(rounds=4)),
+        "argon2id": lambda: PasswordHasher(
+            time_cost=1, memory_cost=8, parallelism=1
+        ).hash("warmup"),
+        "pbkdf2": pbkdf2,
+        "aes_gcm": aes_gcm,
+        "ml_kem": ml_kem,
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def warm_up() -> dict:
+    """Idempotent; returns import and first-call timings in seconds."""
+    with _lock:
+        if _ready.is_set():
+            return _report
+        started = time.perf_counter()
+        imports = {}
+        for name in HEAVY_MODULES:
+            module_started = time.perf_counter()
+            importlib.import_module(name)
+            imports[name] = time.perf_counter() - module_started
+        _report.update(
+            pid=os.getpid(),
+            imports=imports,
+            primitives=_exercise(),
+        )
+        _report["total_seconds"] = time.perf_counter() - started
+        _ready.set()
+        return _report
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def report() -> dict:
+    return dict(_report)
@@ -0,0 +1,239 @@
+"""
+Cold start of the app: a fresh interpreter imports python.main and serves one request.
+
+    python -m python.benchmarks.bench_cold_start [--runs 5] [--path /]
+        [--budget-ratio 2] [--budget-ms 0] [--importtime]
+        [--import-budget-ratio 2]
+
+This is what a serverless cold start pays. The request goes straight into the
+ASGI app, with no server and no lifespan. Every run also checks that none of
+the heavy crypto backends were imported on the way. The framework floor
+(fastapi + pydantic + dotenv alone) is measured separately, so it is clear
+how much of the total the app still controls.
+
+The exit status is 1 if a backend leaked onto the cold path or the median
+exceeds the budget: --budget-ratio times the framework floor, which scales
+with the machine, and --budget-ms if given. ``python/tests/test_cold_start.py``
+runs the same checks under pytest.
+
+``--importtime`` adds an import budget. Under ``python -X importtime``, the
+cumulative import time of ``python.main`` must stay within
+--import-budget-ratio times that of the framework modules imported on their
+own. This counts import work only, without interpreter start-up or the
+request. The modules with the highest self time are printed too. The tests
+always check this budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Must stay off the cold path of routes that do not use them
+HEAVY_MODULES = (
+    "bcrypt",
+    "argon2",
+    "jwt",
+    "kyber_py",
+    "cryptography",
+    "multiprocessing",
+    "python.app.services.auth_service",
+    "python.app.services.crypto_service",
+    "python.app.services.integrity_service",
+)
+
+_COLD_START = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+from python.main import app
+imported = time.perf_counter()
+
+async def request(path):
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"cold")],
+        "client": ("127.0.0.1", 1), "server": ("cold", 80),
+    }
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+status = asyncio.run(request(sys.argv[1]))
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "request_ms": (done - imported) * 1000,
+    "total_ms": (done - started) * 1000,
+    "status": status,
+    "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+FRAMEWORK_MODULES = (
+    "dotenv",
+    "fastapi",
+    "fastapi.middleware.cors",
+    "fastapi.security.api_key",
+    "pydantic",
+)
+
+_FLOOR = r"""
+import json, time
+started = time.perf_counter()
+import dotenv, fastapi, fastapi.middleware.cors, fastapi.security.api_key, pydantic
+print(json.dumps({"total_ms": (time.perf_counter() - started) * 1000}))
+"""
+
+
+# Repository root, so the child finds ``python.main`` from any working directory
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _child_env() -> dict:
+    # No users.db side effects; lazily built services would not touch it anyway
+    path = os.pathsep.join(filter(None, [_ROOT, os.getenv("PYTHONPATH")]))
+    return {
+        **os.environ,
+        "PYTHONPATH": path,
+        "USER_STORE": os.getenv("USER_STORE", "memory"),
+    }
+
+
+def _run(code: str, *args: str, flags: tuple = ()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code, *args],
+        capture_output=True,
+        text=True,
+        env=_child_env(),
+        check=True,
+    )
+
+
+def cold_start(path: str) -> dict:
+    result = _run(_COLD_START, path, json.dumps(HEAVY_MODULES))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def framework_floor() -> float:
+    return json.loads(_run(_FLOOR).stdout)["total_ms"]
+
+
+def _importtime(stderr: str) -> list[tuple[int, int, str]]:
+    # (self us, cumulative us, name); nested imports keep their indentation
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name[1:].rstrip()))
+    return rows
+
+
+def slowest_imports(path: str, top: int = 15) -> list[tuple[int, int, str]]:
+    result = _run(_COLD_START, path, "[]", flags=("-X", "importtime"))
+    rows = [(s, c, name.strip()) for s, c, name in _importtime(result.stderr)]
+    return sorted(rows, reverse=True)[:top]
+
+
+def import_ms(modules: tuple) -> float:
+    """
+    Cumulative ``-X importtime`` of importing ``modules`` in a fresh
+    interpreter. Only top-level entries count, so nothing is counted twice.
+    """
+    result = _run(f"import {', '.join(modules)}", flags=("-X", "importtime"))
+    return sum(
+        cumulative / 1000
+        for _, cumulative, name in _importtime(result.stderr)
+        if name in modules
+    )
+
+
+def import_times(runs: int = 3) -> dict:
+    return {
+        "main_import_ms": statistics.median(
+            import_ms(("python.main",)) for _ in range(runs)
+        ),
+        "framework_import_ms": statistics.median(
+            import_ms(FRAMEWORK_MODULES) for _ in range(runs)
+        ),
+    }
+
+
+def run(path: str = "/", runs: int = 5) -> dict:
+    samples = [cold_start(path) for _ in range(runs)]
+    floors = [framework_floor() for _ in range(runs)]
+    return {
+        "path": path,
+        "status": samples[-1]["status"],
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "request_ms": statistics.median(s["request_ms"] for s in samples),
+        "total_ms": statistics.median(s["total_ms"] for s in samples),
+        "framework_floor_ms": statistics.median(floors),
+        "heavy_modules_loaded": sorted({m for s in samples for m in s["loaded"]}),
+    }
+
+
+def budget_failures(result: dict, budget_ratio: float, budget_ms: float = 0) -> list:
+    failures = []
+    if result["heavy_modules_loaded"]:
+        loaded = ", ".join(result["heavy_modules_loaded"])
+        failures.append(f"heavy modules on the cold path: {loaded}")
+    floor = result["framework_floor_ms"]
+    if result["total_ms"] > floor * budget_ratio:
+        failures.append(
+            f"cold start {result['total_ms']:.1f} ms exceeds {budget_ratio:g}x the"
+            f" framework floor ({floor:.1f} ms)"
+        )
+    if budget_ms and result["total_ms"] > budget_ms:
+        failures.append(
+            f"cold start {result['total_ms']:.1f} ms exceeds budget {budget_ms:.0f} ms"
+        )
+    return failures
+
+
+def import_budget_failures(times: dict, budget_ratio: float) -> list:
+    floor = times["framework_import_ms"]
+    if times["main_import_ms"] > floor * budget_ratio:
+        return [
+            f"import python.main {times['main_import_ms']:.1f} ms exceeds"
+            f" {budget_ratio:g}x the framework imports ({floor:.1f} ms)"
+        ]
+    return []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ratio", type=float, default=2.0)
+    parser.add_argument("--budget-ms", type=float, default=0.0)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--import-budget-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+
+    result = run(args.path, args.runs)
+    failures = budget_failures(result, args.budget_ratio, args.budget_ms)
+    if args.importtime:
+        times = import_times(args.runs)
+        result.update(times)
+        failures += import_budget_failures(times, args.import_budget_ratio)
+    print(json.dumps(result, indent=2))
+    if args.importtime:
+        print(f"\n{'self ms':>8} {'cumul ms':>9}  module")
+        for self_us, cumulative_us, name in slowest_imports(args.path):
+            print(f"{self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
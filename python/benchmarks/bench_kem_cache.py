@@ -0,0 +1,54 @@
+"""
+Cached vs uncached ML-KEM encapsulation/decapsulation throughput.
+
+    python -m python.benchmarks.bench_kem_cache [--iterations N]
+"""
+
+import argparse
+import time
+
+from kyber_py.ml_kem import ML_KEM_512
+
+from ..app.utils.kem_cache import KemKeyCache
+
+
+def _ops_per_second(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - started)
+
+
+def run(iterations: int = 200) -> dict:
+    ek, dk = ML_KEM_512.keygen()
+    cache = KemKeyCache()
+    _, ciphertext = ML_KEM_512.encaps(ek)
+    cache.encapsulate(ek)  # warm both entries before timing
+    cache.decapsulate(dk, ciphertext)
+
+    results = {
+        "encaps_uncached": _ops_per_second(lambda: ML_KEM_512.encaps(ek), iterations),
+        "encaps_cached": _ops_per_second(lambda: cache.encapsulate(ek), iterations),
+        "decaps_uncached": _ops_per_second(
+            lambda: ML_KEM_512.decaps(dk, ciphertext), iterations
+        ),
+        "decaps_cached": _ops_per_second(
+            lambda: cache.decapsulate(dk, ciphertext), iterations
+        ),
+    }
+    results["encaps_speedup"] = results["encaps_cached"] / results["encaps_uncached"]
+    results["decaps_speedup"] = results["decaps_cached"] / results["decaps_uncached"]
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    for name, value in run(args.iterations).items():
+        unit = "x" if name.endswith("speedup") else " ops/s"
+        print(f"{name:<18} {value:10.2f}{unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Integrity-manifest throughput versus crypto executor threads.
+
+    python -m python.benchmarks.bench_merkle [--size-mb 256] [--chunk-size 1048576]
+        [--workers 1,2,4,8] [--algorithm sha256]
+
+Streams ``--size-mb`` of random data in 64 KiB pieces through
+``IntegrityService.build_manifest`` once per thread count. Leaf hashing
+releases the GIL, so MB/s should grow close to linearly until the thread
+count reaches the number of physical cores.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from ..app.services.integrity_service import IntegrityService
+from ..app.utils.executor import CryptoExecutor
+
+PIECE = 64 * 1024
+
+
+async def run(size: int, chunk_size: int, workers: int, algorithm: str) -> float:
+    executor = CryptoExecutor(max_workers=workers)
+    service = IntegrityService(executor=executor)
+    data = os.urandom(size)
+    view = memoryview(data)
+
+    async def pieces():
+        for offset in range(0, size, PIECE):
+            yield view[offset : offset + PIECE]
+
+    try:
+        await service.build_manifest(pieces(), b"bench", chunk_size, algorithm)  # warmup
+        started = time.perf_counter()
+        await service.build_manifest(pieces(), b"bench", chunk_size, algorithm)
+        return size / (time.perf_counter() - started) / 1024**2
+    finally:
+        executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--chunk-size", type=int, default=1024 * 1024)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--algorithm", default="sha256")
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{os.cpu_count()} CPU(s), {args.size_mb} MiB, chunk {args.chunk_size} B")
+    for workers in (int(w) for w in args.workers.split(",")):
+        mb_per_sec = asyncio.run(
+            run(args.size_mb * 1024**2, args.chunk_size, workers, args.algorithm)
+        )
+        baseline = baseline or mb_per_sec
+        print(
+            f"{workers:>3} thread(s) {mb_per_sec:9.1f} MB/s  {mb_per_sec / baseline:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
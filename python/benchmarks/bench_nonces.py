@@ -0,0 +1,84 @@
+"""
+Small-message AES-GCM throughput by nonce source.
+
+    python -m python.benchmarks.bench_nonces [--sizes 16,64,256,1024]
+        [--messages 200000] [--buffer 1024] [--repeat 5]
+
+Encrypts ``--messages`` messages of each size under one key, taking the
+nonce from ``os.urandom(12)`` per message (what the services did before),
+from ``NonceManager`` in random mode (one urandom call per ``--buffer``
+nonces) and in counter mode. Both managers also count each message against
+the key, as ``CryptoService`` does. The first row times the nonces alone.
+Each rate is the best of ``--repeat`` runs.
+"""
+
+import argparse
+import os
+import time
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from ..app.utils.nonces import NonceManager
+
+
+def rate(encrypt, messages: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(messages):
+            encrypt()
+        best = min(best, time.perf_counter() - started)
+    return messages / best
+
+
+def sources(buffer_nonces: int, key: bytes) -> dict:
+    random_mode = NonceManager("random", buffer_nonces)
+    counter_mode = NonceManager("counter")
+    random_usage = random_mode.usage(key)
+    counter_usage = counter_mode.usage(key)
+    return {
+        "urandom": lambda: os.urandom(12),
+        "buffered": lambda: random_mode.next(random_usage),
+        "counter": lambda: counter_mode.next(counter_usage),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="16,64,256,1024")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--buffer", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    key = AESGCM.generate_key(256)
+    aesgcm = AESGCM(key)
+    nonces = sources(args.buffer, key)
+    print(f"{'size':>10}" + "".join(f"{name:>16}" for name in nonces) + "   speedup")
+
+    rows = [("nonce only", nonces)]
+    for size in (int(s) for s in args.sizes.split(",")):
+        data = os.urandom(size)
+        rows.append(
+            (
+                f"{size} B",
+                {
+                    name: (lambda s=source, d=data: aesgcm.encrypt(s(), d, None))
+                    for name, source in nonces.items()
+                },
+            )
+        )
+    for label, calls in rows:
+        rates = {
+            name: rate(call, args.messages, args.repeat) for name, call in calls.items()
+        }
+        best = max(rates["buffered"], rates["counter"])
+        print(
+            f"{label:>10}"
+            + "".join(f"{r / 1e3:>11.0f} k/s " for r in rates.values())
+            + f"  x{best / rates['urandom']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Micro-benchmarks for every service primitive, with baseline regression checks.
+
+    python -m python.benchmarks.bench_primitives [--quick] [--output baseline.json]
+    python -m python.benchmarks.bench_primitives --compare baseline.json [--threshold 0.15]
+
+Each case runs for at least ``--min-time`` seconds (and ``--min-iterations``
+calls) after one warmup call. Payload-dependent primitives are measured at
+every size in ``--sizes``. Results carry ops/sec and p50/p95/p99 latency.
+``--output`` writes them as a JSON baseline. ``--compare`` exits with status 1
+when any case present in both runs lost more than ``--threshold`` of its
+baseline throughput. Everything runs in-process and offline. Services get a
+dedicated thread executor, an in-memory user store, and no background KEM
+pool, so results do not depend on the environment.
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from ..app.models.schemas import (
+    AesEncryptPasswordRequest,
+    DecryptRequest,
+    EncryptRequest,
+    GenerateHmacRequest,
+    SignRequest,
+    User,
+    VerifyRequest,
+)
+from ..app.repositories.user_repository import InMemoryUserRepository
+from ..app.services.auth_service import AuthService
+from ..app.services.crypto_service import CryptoService
+from ..app.services.integrity_service import IntegrityService
+from ..app.utils.executor import CryptoExecutor
+from ..app.utils.kem_pool import KemKeyPool
+from ..app.utils import metrics
+from ..app.utils.security import SecurityUtils
+from ..app.utils.verify_cache import PasswordVerifyCache
+
+DEFAULT_SIZES = (64, 1024, 16 * 1024, 256 * 1024)
+QUICK_SIZES = (64, 4096)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[int((len(ordered) - 1) * fraction)]
+
+
+async def measure(
+    fn: Callable[[], Awaitable], min_time: float, min_iterations: int
+) -> dict:
+    await fn()  # warmup: caches, lazy pools, first-call imports
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_iterations or time.perf_counter() - started < min_time:
+        call_started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - call_started)
+    total = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "ops_per_sec": len(latencies) / total,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _sync(fn: Callable, *args) -> Callable[[], Awaitable]:
+    async def call():
+        return fn(*args)
+
+    return call
+
+
+def metrics_cases() -> list[tuple[str, Callable[[], Awaitable]]]:
+    """Recording cost of the /metrics subsystem: bare vs instrumented ASGI call."""
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    async def endpoint(request):
+        return Response(b"ok")
+
+    bare = Starlette(routes=[Route("/bench", endpoint, methods=["POST"])])
+    instrumented = Starlette(routes=[Route("/bench", endpoint, methods=["POST"])])
+    instrumented.add_middleware(metrics.MetricsMiddleware)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def request(app):
+        async def call():
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "POST",
+                "scheme": "http",
+                "path": "/bench",
+                "raw_path": b"/bench",
+                "root_path": "",
+                "query_string": b"",
+                "headers": [],
+                "client": ("127.0.0.1", 1),
+                "server": ("127.0.0.1", 80),
+            }
+            await app(scope, receive, send)
+
+        return call
+
+    return [
+        (
+            "metrics.observe_primitive",
+            _sync(metrics.observe_primitive, "bench", 1024, 0.001),
+        ),
+        ("metrics.asgi_request[bare]", request(bare)),
+        ("metrics.asgi_request[instrumented]", request(instrumented)),
+    ]
+
+
+def sized_cases(
+    size: int,
+    crypto: CryptoService,
+    integrity: IntegrityService,
+    key: str,
+    utils_key: bytes,
+) -> list[tuple[str, Callable[[], Awaitable]]]:
+    data = "x" * size
+    encrypt_request = EncryptRequest(data=data, key=key)
+    sign_request = SignRequest(data=data, key=key)
+    hmac_request = GenerateHmacRequest(
+        data_to_hmac_b64=base64.b64encode(data.encode()).decode(),
+        hmac_key_material=key,
+    )
+    utils_encrypted = SecurityUtils.aes_gcm_encrypt(data, utils_key)
+    utils_signature = SecurityUtils.create_signature(data, key)
+    encrypted: dict = {}
+    signature: dict = {}
+
+    async def encrypt_data():
+        encrypted.update(await crypto.encrypt_data(encrypt_request))
+
+    async def decrypt_data():
+        if not encrypted:
+            await encrypt_data()
+        await crypto.decrypt_data(DecryptRequest(key=key, **encrypted))
+
+    async def create_signature():
+        signature.update(await integrity.create_signature(sign_request))
+
+    async def verify_signature():
+        if not signature:
+            await create_signature()
+        await integrity.verify_signature(VerifyRequest(data=data, key=key, **signature))
+
+    return [
+        (f"crypto.encrypt_data[{size}]", encrypt_data),
+        (f"crypto.decrypt_data[{size}]", decrypt_data),
+        (f"integrity.create_signature[{size}]", create_signature),
+        (f"integrity.verify_signature[{size}]", verify_signature),
+        (
+            f"integrity.generate_combined_hmac[{size}]",
+            lambda: integrity.generate_combined_hmac(hmac_request),
+        ),
+        (
+            f"security.aes_gcm_encrypt[{size}]",
+            _sync(SecurityUtils.aes_gcm_encrypt, data, utils_key),
+        ),
+        (
+            f"security.aes_gcm_decrypt[{size}]",
+            _sync(
+                SecurityUtils.aes_gcm_decrypt,
+                utils_encrypted["encrypted"],
+                utils_encrypted["iv"],
+                utils_encrypted["tag"],
+                utils_key,
+            ),
+        ),
+        (
+            f"security.create_signature[{size}]",
+            _sync(SecurityUtils.create_signature, data, key),
+        ),
+        (
+            f"security.verify_signature[{size}]",
+            _sync(SecurityUtils.verify_signature, data, utils_signature, key),
+        ),
+    ]
+
+
+async def build_cases(sizes) -> list[tuple[str, Callable[[], Awaitable]]]:
+    executor = CryptoExecutor(mode="thread")
+    auth = AuthService(
+        executor=executor,
+        users=InMemoryUserRepository(),
+        verify_cache=PasswordVerifyCache(),  # disabled: measure the real check
+    )
+    crypto = CryptoService(
+        executor=executor,
+        kem_pool=KemKeyPool(executor, low_watermark=0, high_watermark=0),
+    )
+    integrity = IntegrityService()
+
+    usernames = (f"bench-user-{i}" for i in itertools.count())
+    login_user = User(username="bench-login", password="correct horse battery")
+    await auth.register(login_user)
+
+    key = "benchmark-key"
+    salt = os.urandom(16)
+    gcm_request = AesEncryptPasswordRequest(
+        password="correct horse battery",
+        salt_for_kdf=base64.b64encode(salt).decode(),
+        iv_b64=base64.b64encode(os.urandom(12)).decode(),
+    )
+    cbc_request = AesEncryptPasswordRequest(
+        password=gcm_request.password,
+        salt_for_kdf=gcm_request.salt_for_kdf,
+        iv_b64=base64.b64encode(os.urandom(16)).decode(),
+    )
+    public_key, private_key = crypto.kyber_kem.keygen()
+    _, encapsulated_key = crypto.kyber_kem.encaps(public_key)
+    utils_key = SecurityUtils.generate_key(key, salt)
+
+    async def register():
+        await auth.register(User(username=next(usernames), password="pw"))
+
+    cases = [
+        ("auth.register", register),
+        ("auth.login", lambda: auth.login(login_user)),
+        (
+            "auth.create_access_token",
+            _sync(auth.create_access_token, {"sub": "bench"}),
+        ),
+        ("crypto.derive_key", _sync(crypto.derive_key, key, salt)),
+        ("crypto.kem_keygen", crypto.generate_kem_key_pair),
+        ("crypto.kem_encapsulate", lambda: crypto._kem_encapsulate(public_key)),
+        (
+            "crypto.kem_decapsulate",
+            lambda: crypto._kem_decapsulate(private_key, encapsulated_key),
+        ),
+        (
+            "crypto.aes_encrypt_password_gcm",
+            lambda: crypto.aes_encrypt_password_gcm(gcm_request),
+        ),
+        (
+            "crypto.aes_encrypt_password_cbc",
+            lambda: crypto.aes_encrypt_password_cbc(cbc_request),
+        ),
+        ("security.generate_key", _sync(SecurityUtils.generate_key, key, salt)),
+    ]
+    for size in sizes:
+        cases.extend(sized_cases(size, crypto, integrity, key, utils_key))
+    cases.extend(metrics_cases())
+    return cases
+
+
+async def run(
+    sizes=DEFAULT_SIZES,
+    min_time: float = 1.0,
+    min_iterations: int = 5,
+    only: str = "",
+) -> dict:
+    results = {}
+    for name, fn in await build_cases(sizes):
+        if only and only not in name:
+            continue
+        results[name] = await measure(fn, min_time, min_iterations)
+        print(_format(name, results[name]), file=sys.stderr)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "sizes": list(sizes),
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+
+
+def _format(name: str, result: dict) -> str:
+    return (
+        f"{name:<42} {result['ops_per_sec']:>12.1f} ops/s"
+        f"  p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms"
+        f"  p99 {result['p99_ms']:8.3f} ms"
+    )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Names of cases whose throughput dropped by more than ``threshold``."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        change = result["ops_per_sec"] / base["ops_per_sec"] - 1
+        flag = "REGRESSION" if change < -threshold else ""
+        print(
+            f"{name:<42} {base['ops_per_sec']:>12.1f} -> "
+            f"{result['ops_per_sec']:>12.1f} ops/s  {change:+7.1%}  {flag}"
+        )
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", help="comma separated payload sizes in bytes")
+    parser.add_argument("--quick", action="store_true", help="short smoke run")
+    parser.add_argument("--min-time", type=float, default=1.0)
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--only", default="", help="substring filter on case names")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    if args.sizes:
+        sizes = tuple(int(size) for size in args.sizes.split(","))
+    else:
+        sizes = QUICK_SIZES if args.quick else DEFAULT_SIZES
+    min_time = 0.2 if args.quick else args.min_time
+    min_iterations = 2 if args.quick else args.min_iterations
+
+    current = asyncio.run(run(sizes, min_time, min_iterations, args.only))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+JSON vs binary encodings for /data/encrypt + /data/decrypt round trips.
+
+    python -m python.benchmarks.bench_wire_formats [--size 1048576] [--iterations 30]
+
+Drives the real FastAPI app in-process through httpx's ASGI transport, so
+routing, validation, content negotiation and (de)serialisation are all
+included; only the socket is missing. MessagePack/CBOR rows are skipped when
+the optional packages are not installed.
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import time
+
+import httpx
+
+from ..app.utils import negotiation
+
+KEY = "benchmark-key"
+
+
+async def _json_round_trip(client, headers, plaintext: str):
+    response = await client.post(
+        "/data/encrypt", json={"data": plaintext, "key": KEY}, headers=headers
+    )
+    encrypted = response.json()
+    response = await client.post(
+        "/data/decrypt", json={**encrypted, "key": KEY}, headers=headers
+    )
+    return response.json()["decrypted"]
+
+
+async def _octet_round_trip(client, headers, plaintext: bytes):
+    headers = {
+        **headers,
+        "Content-Type": negotiation.OCTET_STREAM,
+        "X-Encryption-Key": KEY,
+    }
+    response = await client.post("/data/encrypt", content=plaintext, headers=headers)
+    response = await client.post("/data/decrypt", content=response.content, headers=headers)
+    return response.content
+
+
+async def _framed_round_trip(client, headers, plaintext: bytes, media: str):
+    headers = {**headers, "Content-Type": media}
+    body = negotiation.encode_frame(media, {"data": plaintext, "key": KEY})
+    response = await client.post("/data/encrypt", content=body, headers=headers)
+    encrypted = negotiation.decode_frame(media, response.content)
+    body = negotiation.encode_frame(media, {**encrypted, "key": KEY})
+    response = await client.post("/data/decrypt", content=body, headers=headers)
+    return negotiation.decode_frame(media, response.content)["decrypted"]
+
+
+async def run(size: int = 1024 * 1024, iterations: int = 30) -> dict:
+    os.environ.setdefault("USER_STORE", "memory")
+    from ..main import API_KEY, API_KEY_NAME, app
+
+    # Printable payload so the JSON variant carries the same bytes
+    text = base64.b64encode(os.urandom(size))[:size].decode()
+    raw = text.encode()
+    cases = {
+        "json": lambda client, h: _json_round_trip(client, h, text),
+        "octet-stream": lambda client, h: _octet_round_trip(client, h, raw),
+    }
+    if negotiation.msgpack is not None:
+        cases["msgpack"] = lambda client, h: _framed_round_trip(
+            client, h, raw, negotiation.MSGPACK
+        )
+    if negotiation.cbor2 is not None:
+        cases["cbor"] = lambda client, h: _framed_round_trip(
+            client, h, raw, negotiation.CBOR
+        )
+
+    headers = {API_KEY_NAME: API_KEY}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, round_trip in cases.items():
+            result = await round_trip(client, headers)  # warmup + key derivation
+            assert result in (text, raw), f"{name} round trip mismatch"
+            started = time.perf_counter()
+            for _ in range(iterations):
+                await round_trip(client, headers)
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "round_trips_per_sec": iterations / elapsed,
+                "mb_per_sec": iterations * size / elapsed / 1024**2,
+            }
+    baseline = results["json"]["round_trips_per_sec"]
+    for result in results.values():
+        result["speedup_vs_json"] = result["round_trips_per_sec"] / baseline
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024 * 1024)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.size, args.iterations))
+    for name, result in results.items():
+        print(
+            f"{name:<14} {result['round_trips_per_sec']:8.1f} round trips/s"
+            f"  {result['mb_per_sec']:8.1f} MB/s  {result['speedup_vs_json']:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
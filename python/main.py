@@ -1,26 +1,67 @@
-from fastapi import FastAPI, HTTPException, Security, Depends
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Security, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security.api_key import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import os
 from dotenv import load_dotenv
 import secrets
+import time
 import hmac
 import hashlib
 import base64
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import bcrypt
-import jwt
 from datetime import datetime, timedelta
-from argon2 import PasswordHasher, exceptions as argon2_exceptions
 
-# Import services
-from python.app.services.auth_service import AuthService
-from python.app.services.crypto_service import CryptoService
-from python.app.services.integrity_service import IntegrityService
+from python.app.models.schemas import (
+    BatchEncryptRequest,
+    BatchEncryptResponse,
+    BatchDecryptRequest,
+    BatchDecryptResponse,
+    HybridEncryptRequest,
+    HybridEncryptResponse,
+    HybridDecryptRequest,
+    HybridSessionEncryptResponse,
+    HybridSessionDecryptRequest,
+    StreamSignResponse,
+    StreamVerifyResponse,
+    SignBatchRequest,
+    SignBatchResponse,
+    VerifyBatchRequest,
+    VerifyBatchResponse,
+    TokenRequest,
+    RevokeTokenResponse,
+    RevokeJtiRequest,
+    IntrospectResponse,
+    LogoutAllResponse,
+    SessionInfo,
+    IntegrityManifestResponse,
+    VerifyChunksRequest,
+    VerifyChunksResponse,
+)
+
+# Import services (service dan backend kripto berat dimuat saat pertama dipakai)
+from python.app.repositories.user_repository import create_user_repository_from_env
+from python.app.utils.executor import CryptoExecutor, ExecutorSaturatedError
+from python.app.utils.admission import AdmissionController
+from python.app.utils.hmac_cache import default_hmac_cache
+from python.app.utils.key_cache import DerivedKeyCache
+from python.app.utils.lazy import LazyObject, lazy_import, loaded, unwrap
+from python.app.utils.nonces import default_nonce_manager
+from python.app.utils.streaming import DuplexStreamingResponse
+from python.app.utils.token_cache import VerifiedTokenCache
+from python.app.utils.verify_cache import PasswordVerifyCache
+from python.app.utils import metrics
+from python.app.utils import envelope, negotiation, warmup
+from python.app.utils.profiler import Profiler, ProfilerBusyError, ProfilingMiddleware
+from python.app.utils.shedding import LoadShedder, LoadSheddingMiddleware
+from python.app.utils import snapshot
+
+jwt = lazy_import("jwt")
+jobs = lazy_import("python.app.utils.jobs")
+argon2_exceptions = lazy_import("argon2.exceptions")
+crypto_exceptions = lazy_import("cryptography.exceptions")
 
 # Load environment variables
 load_dotenv()
@@ -33,10 +74,12 @@ app = FastAPI(
 )
 
 # Security configuration
-API_KEY = os.getenv("API_KEY", secrets.token_urlsafe(32))
+API_KEY = os.getenv("API_KEY") or secrets.token_urlsafe(32)
 API_KEY_NAME = os.getenv("API_KEY_HEADER", "X-API-Key")
-JWT_SECRET = os.getenv("JWT_SECRET_KEY", secrets.token_urlsafe(32))
+JWT_SECRET = os.getenv("JWT_SECRET_KEY") or secrets.token_urlsafe(32)
 JWT_ALGORITHM = "HS256"
+# Refresh token sekali pakai; klien harus menyimpan refresh_token yang baru
+REFRESH_TOKEN_ROTATION = os.getenv("REFRESH_TOKEN_ROTATION", "0") == "1"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
 
 # CORS configuration
@@ -47,15 +90,288 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Saat overload rute KDF di-shed lebih dulu, lalu ML-KEM; rute lain (/, HMAC,
+# admin, stream) tidak pernah di-shed. Di dalam MetricsMiddleware agar 503/499
+# tetap tercatat.
+load_shedder = LoadShedder.from_env(
+    {
+        "/auth/register": "kdf",
+        "/auth/login": "kdf",
+        "/auth/hash-password": "kdf",
+        "/auth/verify-password": "kdf",
+        "/auth/argon2id-hash": "kdf",
+        "/auth/argon2id-verify": "kdf",
+        "/data/aes-encrypt-password": "kdf",
+        "/data/encrypt": "kdf",
+        "/data/decrypt": "kdf",
+        "/data/encrypt/batch": "kdf",
+        "/data/decrypt/batch": "kdf",
+        "/crypto/key/kem": "crypto",
+        "/crypto/key/sign": "crypto",
+        "/data/hybrid/encrypt": "crypto",
+        "/data/hybrid/decrypt": "crypto",
+        "/data/hybrid/session/encrypt": "crypto",
+        "/data/hybrid/session/decrypt": "crypto",
+    }
+)
+app.add_middleware(LoadSheddingMiddleware, shedder=load_shedder)
+# Latensi per route, request in-flight dan exception untuk /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+# Profiler sampling hanya aktif saat diminta (admin endpoint atau header X-Profile)
+profiler = Profiler.from_env()
+app.add_middleware(
+    ProfilingMiddleware,
+    profiler=profiler,
+    api_key_header=API_KEY_NAME,
+    api_key=API_KEY,
+)
+
+# 🔐 Argon2id Hasher - param tuning (bisa disesuaikan)
+ARGON2_PARAMS = dict(
+    time_cost=3,  # jumlah iterasi
+    memory_cost=64 * 1024,  # dalam KB (64MB)
+    parallelism=2,
+    hash_len=32,
+    salt_len=16,  # internal salt (beda dari salt_for_kdf)
+)
 
 # Initialize services
-auth_service = AuthService()
-crypto_service = CryptoService()
-integrity_service = IntegrityService()
+# Hashing yang boros memori dibatasi oleh anggaran memori global
+admission = AdmissionController.from_env(
+    costs={"argon2id": ARGON2_PARAMS["memory_cost"] * 1024, "bcrypt": 4 * 1024}
+)
+# Semua pekerjaan CPU-bound (bcrypt, Argon2id, PBKDF2) lewat executor bersama
+crypto_executor = CryptoExecutor.from_env(admission=admission)
+load_shedder.executor = crypto_executor
+# Hasil verifikasi password yang valid boleh di-cache sebentar (opt-in)
+password_verify_cache = PasswordVerifyCache.from_env()
+key_cache = DerivedKeyCache.from_env()
+# Refresh token yang sama tidak perlu diverifikasi ulang sampai exp-nya
+refresh_token_cache = VerifiedTokenCache.from_env()
+
+
+def _build_auth_service():
+    from python.app.services.auth_service import AuthService
+
+    # Secret dan algoritma JWT harus sama dengan yang dipakai /auth/refresh
+    return AuthService(
+        executor=crypto_executor,
+        users=unwrap(user_repository),
+        verify_cache=password_verify_cache,
+        secret_key=JWT_SECRET,
+        algorithm=JWT_ALGORITHM,
+        revocations=unwrap(revocation_list),
+        sessions=unwrap(session_store),
+        rotate_refresh_tokens=REFRESH_TOKEN_ROTATION,
+    )
+
+
+def _build_revocation_list():
+    from python.app.repositories.revocation_repository import (
+        create_revocation_store_from_env,
+    )
+    from python.app.utils.revocation import RevocationList
+
+    return RevocationList.from_env(create_revocation_store_from_env())
+
+
+def _build_session_store():
+    from python.app.utils.sessions import SessionStore
+
+    store = SessionStore.from_env()
+    # Sesi dari snapshot terakhir (SESSION_SNAPSHOT_PATH); yang kedaluwarsa dilewati
+    store.restore()
+    return store
+
+
+def _build_kem_pool():
+    from python.app.utils.kem_pool import KemKeyPool
+
+    return KemKeyPool.from_env(crypto_executor)
+
+
+def _build_crypto_service():
+    from python.app.services.crypto_service import CryptoService
+
+    return CryptoService(
+        executor=crypto_executor, key_cache=key_cache, kem_pool=unwrap(kem_pool)
+    )
+
+
+def _build_integrity_service():
+    from python.app.services.integrity_service import IntegrityService
+
+    return IntegrityService(executor=crypto_executor)
+
+
+def _load_kem_key_cache():
+    from python.app.utils.kem_cache import default_kem_key_cache
+
+    return default_kem_key_cache
+
+
+# Serverless: tiap service dibangun saat request pertama yang membutuhkannya,
+# sehingga request ke / tidak ikut membayar import bcrypt/argon2/kyber/jwt.
+# USER_STORE=sqlite agar user bertahan restart dan dibagi antar worker; default
+# memori karena filesystem serverless (Vercel) read-only kecuali /tmp
+user_repository = LazyObject(create_user_repository_from_env)
+revocation_list = LazyObject(_build_revocation_list)
+session_store = LazyObject(_build_session_store)
+auth_service = LazyObject(_build_auth_service)
+kem_pool = LazyObject(_build_kem_pool)
+crypto_service = LazyObject(_build_crypto_service)
+integrity_service = LazyObject(_build_integrity_service)
+default_kem_key_cache = LazyObject(_load_kem_key_cache)
+LAZY_SERVICES = (
+    user_repository,
+    revocation_list,
+    session_store,
+    auth_service,
+    kem_pool,
+    crypto_service,
+    integrity_service,
+    default_kem_key_cache,
+)
+# python -m python.serve menyalakan ini agar semuanya siap sebelum trafik masuk
+EAGER_SERVICES = os.getenv("EAGER_SERVICES", "0") == "1"
+
+
+def prepare_services() -> None:
+    """Build every lazily constructed service now."""
+    for service in LAZY_SERVICES:
+        unwrap(service)
+
+
+def _after_snapshot_restore() -> None:
+    # Semua instance hasil restore berbagi memori yang sama: material acak
+    # per proses harus diganti, kunci KEM yang sudah dibuat dibuang
+    crypto_service.rotate_salt()
+    kem_pool.discard()
+    # Buffer nonce, prefix dan counter juga ikut tersalin ke setiap instance
+    default_nonce_manager.reset()
+
+
+def _before_snapshot() -> None:
+    warmup.warm_up()
+    prepare_services()
+
+
+# Snapshot hangat (mis. Lambda SnapStart) bila platform mendukung
+snapshot.install(before=_before_snapshot, after_restore=_after_snapshot_restore)
+
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    metrics.count_exception(exc, request.url.path)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+def collect_service_metrics():
+    executor_stats = crypto_executor.stats()
+    jobs_stats = executor_stats["jobs"]
+    yield (
+        "crypto_executor_pending",
+        "gauge",
+        "Jobs submitted to the crypto executor and not finished",
+        [({}, executor_stats["pending"])],
+    )
+    yield (
+        "crypto_executor_in_flight",
+        "gauge",
+        "Crypto executor jobs in flight by job type",
+        [({"job": name}, s["in_flight"]) for name, s in jobs_stats.items()],
+    )
+    yield (
+        "crypto_executor_rejected_total",
+        "counter",
+        "Jobs rejected because the executor queue was full",
+        [({"job": name}, s["rejected"]) for name, s in jobs_stats.items()],
+    )
+    admission_stats = admission.stats()
+    yield (
+        "admission_memory_in_use_bytes",
+        "gauge",
+        "Memory reserved by admitted password hashing jobs",
+        [({}, admission_stats["memory_in_use_bytes"])],
+    )
+    yield (
+        "admission_queue_length",
+        "gauge",
+        "Password hashing jobs waiting for admission",
+        [({}, admission_stats["queue_length"])],
+    )
+    # Scrape tidak boleh memicu pembangunan service yang belum dipakai
+    if loaded(kem_pool):
+        yield (
+            "kem_pool_available",
+            "gauge",
+            "Pre-generated ML-KEM key pairs ready to serve",
+            [({}, kem_pool.stats()["size"])],
+        )
+    if loaded(session_store):
+        yield (
+            "refresh_sessions_active",
+            "gauge",
+            "Refresh-token sessions held by this worker",
+            [({}, session_store.stats()["sessions"])],
+        )
+    caches = {
+        "derived_key": key_cache.stats(),
+        "refresh_token": refresh_token_cache.stats(),
+        "password_verify": password_verify_cache.stats(),
+        "hmac_context": default_hmac_cache.stats(),
+    }
+    if loaded(default_kem_key_cache):
+        caches["kem_key"] = default_kem_key_cache.stats()
+    for stat, kind, help in (
+        ("hits", "counter", "Cache hits"),
+        ("misses", "counter", "Cache misses"),
+        ("evictions", "counter", "Cache evictions"),
+    ):
+        yield (
+            f"cache_{stat}_total",
+            kind,
+            help,
+            [({"cache": name}, s[stat]) for name, s in caches.items()],
+        )
+
+
+metrics.REGISTRY.add_collector(collect_service_metrics)
+
+
+@app.on_event("startup")
+async def start_services():
+    if not EAGER_SERVICES:
+        return
+    # python -m python.serve sudah warmup sebelum fork; uvicorn biasa belum
+    if not warmup.is_ready():
+        asyncio.get_running_loop().run_in_executor(None, warmup.warm_up)
+    prepare_services()
+    kem_pool.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    if loaded(kem_pool):
+        await kem_pool.stop()
+    crypto_executor.shutdown(wait=False)
+    default_hmac_cache.clear()
+    if loaded(user_repository):
+        await user_repository.close()
+    if loaded(revocation_list):
+        await revocation_list.close()
+    if loaded(session_store):
+        session_store.save()
 
 
 async def get_api_key(api_key_header: str = Security(api_key_header)):
-    if api_key_header != API_KEY:
+    if not api_key_header or not hmac.compare_digest(
+        api_key_header.encode(), API_KEY.encode()
+    ):
         raise HTTPException(status_code=403, detail="Could not validate API key")
     return api_key_header
 
@@ -94,6 +410,7 @@ class RefreshTokenRequest(BaseModel):
 
 class RefreshTokenResponse(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
 
 
 class EncryptRequest(BaseModel):
@@ -109,8 +426,8 @@ class EncryptResponse(BaseModel):
 
 class DecryptRequest(BaseModel):
     encrypted: str
-    iv: str
-    tag: str
+    iv: Optional[str] = None
+    tag: Optional[str] = None
     key: str
 
 
@@ -173,6 +490,9 @@ class Argon2idHashResponse(BaseModel):
 
 # Security Utils
 def derive_key(key: str, salt: bytes = None) -> tuple[bytes, bytes]:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
     if salt is None:
         salt = os.urandom(16)
     kdf = PBKDF2HMAC(
@@ -191,7 +511,10 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # iat pecahan detik (NumericDate boleh pecahan) dari jam yang sama dengan
+    # cutoff logout-all: login di detik yang sama tidak ikut tercabut
+    to_encode.update({"exp": expire, "iat": time.time()})
+    to_encode.setdefault("jti", secrets.token_urlsafe(16))
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
@@ -215,15 +538,29 @@ async def login(user: User):
 
 @app.post("/auth/hash-password", response_model=HashPasswordResponse)
 async def hash_password(request: HashPasswordRequest):
-    hashed = bcrypt.hashpw(request.password.encode(), bcrypt.gensalt())
+    hashed = await crypto_executor.run(
+        "bcrypt", jobs.bcrypt_hash, request.password.encode()
+    )
     return {"hash": hashed.decode()}
 
 
 @app.post("/auth/verify-password", response_model=VerifyPasswordResponse)
 async def verify_password(request: VerifyPasswordRequest):
     try:
-        valid = bcrypt.checkpw(request.password.encode(), request.hash.encode())
+        valid = await password_verify_cache.verify(
+            "bcrypt",
+            request.password.encode(),
+            request.hash.encode(),
+            lambda: crypto_executor.run(
+                "bcrypt",
+                jobs.bcrypt_check,
+                request.password.encode(),
+                request.hash.encode(),
+            ),
+        )
         return {"valid": valid}
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         return {"valid": False}
 
@@ -231,22 +568,84 @@ async def verify_password(request: VerifyPasswordRequest):
 @app.post("/auth/refresh-token", response_model=RefreshTokenResponse)
 async def refresh_token(request: RefreshTokenRequest):
     try:
-        payload = jwt.decode(
+        payload = refresh_token_cache.decode(
             request.refresh_token, JWT_SECRET, algorithms=[JWT_ALGORITHM]
         )
         if not payload.get("refresh"):
             raise HTTPException(status_code=400, detail="Invalid refresh token")
-
-        access_token = create_access_token(
-            data={"sub": payload["sub"]}, expires_delta=timedelta(minutes=30)
+        # Bloom filter di memori; store hanya disentuh untuk kemungkinan hit
+        if await revocation_list.is_revoked(payload):
+            raise HTTPException(status_code=401, detail="Refresh token revoked")
+        if REFRESH_TOKEN_ROTATION:
+            try:
+                return await auth_service.rotate_refresh_token(payload)
+            except ValueError as e:
+                raise HTTPException(status_code=401, detail=str(e))
+
+        access_token = refresh_token_cache.mint_once(
+            request.refresh_token,
+            lambda: create_access_token(
+                data={"sub": payload["sub"]}, expires_delta=timedelta(minutes=30)
+            ),
         )
         return {"access_token": access_token}
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Refresh token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
 
+@app.post("/auth/revoke", response_model=RevokeTokenResponse)
+async def revoke_token(request: TokenRequest):
+    # Pemegang token boleh mencabutnya sendiri (logout)
+    try:
+        claims = jwt.decode(request.token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        return RevokeTokenResponse(revoked=False)
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not claims.get("jti"):
+        raise HTTPException(status_code=400, detail="Token has no jti")
+    revoked = await revocation_list.revoke(
+        claims["jti"], claims["exp"], claims.get("sub")
+    )
+    session_store.remove(claims["jti"])
+    return RevokeTokenResponse(
+        revoked=revoked, jti=claims["jti"], expires_at=claims["exp"]
+    )
+
+
+@app.post("/auth/logout-all", response_model=LogoutAllResponse)
+async def logout_all(request: TokenRequest):
+    # Token apa pun (access atau refresh) milik pengguna yang masih berlaku
+    try:
+        claims = jwt.decode(request.token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if await revocation_list.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return await auth_service.logout_all(claims["sub"])
+
+
+@app.post("/auth/introspect", response_model=IntrospectResponse)
+async def introspect_token(
+    request: TokenRequest, api_key: str = Depends(get_api_key)
+):
+    try:
+        claims = jwt.decode(request.token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return IntrospectResponse(active=False)
+    if await revocation_list.is_revoked(claims):
+        return IntrospectResponse(active=False)
+    return IntrospectResponse(
+        active=True,
+        sub=claims.get("sub"),
+        jti=claims.get("jti"),
+        exp=claims.get("exp"),
+        refresh=bool(claims.get("refresh")),
+    )
+
+
 # Crypto Routes
 @app.post("/crypto/key/kem", response_model=KeyPairResponse)
 async def generate_kem_key_pair():
@@ -264,42 +663,288 @@ async def generate_sign_key_pair():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/data/encrypt", response_model=EncryptResponse)
-async def encrypt_data(request: EncryptRequest, api_key: str = Depends(get_api_key)):
+@app.post(
+    "/data/encrypt",
+    response_model=EncryptResponse,
+    openapi_extra=negotiation.openapi_body(
+        EncryptRequest, "Plaintext; key in X-Encryption-Key; returns the envelope"
+    ),
+)
+async def encrypt_data(http_request: Request, api_key: str = Depends(get_api_key)):
+    media, payload = await negotiation.read_request(http_request, EncryptRequest)
+    reply = negotiation.response_media_type(http_request, media)
     try:
-        return await crypto_service.encrypt_data(request)
+        if media == negotiation.JSON and reply == negotiation.JSON:
+            return await crypto_service.encrypt_data(payload)
+
+        # Jalur biner: tanpa base64, payload mentah langsung ke AES-GCM
+        if media == negotiation.JSON:
+            data, key = payload.data.encode(), payload.key
+        elif media == negotiation.OCTET_STREAM:
+            data, key = payload, negotiation.header(http_request, "X-Encryption-Key")
+        else:
+            data = negotiation.field(payload, "data", bytes)
+            key = negotiation.field(payload, "key", str)
+        # Envelope sudah memuat salt, nonce dan tag
+        sealed = await crypto_service.encrypt_bytes(data, key)
+        if reply == negotiation.JSON:
+            parsed = envelope.parse(sealed)
+            return EncryptResponse(
+                encrypted=base64.b64encode(sealed).decode(),
+                iv=base64.b64encode(parsed.nonce).decode(),
+                tag=base64.b64encode(parsed.tag).decode(),
+            )
+        return negotiation.binary_response(reply, {"encrypted": sealed}, raw=sealed)
+    except (ExecutorSaturatedError, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/data/decrypt", response_model=DecryptResponse)
-async def decrypt_data(request: DecryptRequest, api_key: str = Depends(get_api_key)):
+@app.post(
+    "/data/decrypt",
+    response_model=DecryptResponse,
+    openapi_extra=negotiation.openapi_body(
+        DecryptRequest,
+        "Envelope; key in X-Encryption-Key (legacy ciphertexts also need X-IV, X-Tag)",
+    ),
+)
+async def decrypt_data(http_request: Request, api_key: str = Depends(get_api_key)):
+    media, payload = await negotiation.read_request(http_request, DecryptRequest)
+    reply = negotiation.response_media_type(http_request, media)
     try:
-        return await crypto_service.decrypt_data(request)
+        if media == negotiation.JSON and reply == negotiation.JSON:
+            return await crypto_service.decrypt_data(payload)
+
+        if media == negotiation.JSON:
+            ciphertext = base64.b64decode(payload.encrypted)
+            iv = base64.b64decode(payload.iv) if payload.iv else None
+            tag = base64.b64decode(payload.tag) if payload.tag else None
+            key = payload.key
+        elif media == negotiation.OCTET_STREAM:
+            ciphertext = payload
+            iv = negotiation.header(http_request, "X-IV", binary=True, required=False)
+            tag = negotiation.header(http_request, "X-Tag", binary=True, required=False)
+            key = negotiation.header(http_request, "X-Encryption-Key")
+        else:
+            ciphertext = negotiation.field(payload, "encrypted", bytes)
+            iv = negotiation.field(payload, "iv", bytes, required=False)
+            tag = negotiation.field(payload, "tag", bytes, required=False)
+            key = negotiation.field(payload, "key", str)
+        try:
+            decrypted = await crypto_service.decrypt_bytes(ciphertext, key, iv, tag)
+        except crypto_exceptions.InvalidTag:
+            raise HTTPException(status_code=400, detail="Authentication failed")
+        except ValueError as e:
+            # Envelope rusak atau iv/tag tidak ada untuk ciphertext lama
+            raise HTTPException(status_code=400, detail=str(e))
+        if reply == negotiation.JSON:
+            return DecryptResponse(decrypted=decrypted.decode("utf-8"))
+        return negotiation.binary_response(
+            reply, {"decrypted": decrypted}, raw=decrypted
+        )
+    except (ExecutorSaturatedError, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/data/hybrid/encrypt", response_model=EncryptResponse)
-async def hybrid_encrypt(request: EncryptRequest):
+@app.post("/data/encrypt/batch", response_model=BatchEncryptResponse)
+async def encrypt_batch(
+    request: BatchEncryptRequest, api_key: str = Depends(get_api_key)
+):
+    try:
+        return await crypto_service.encrypt_batch(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/decrypt/batch", response_model=BatchDecryptResponse)
+async def decrypt_batch(
+    request: BatchDecryptRequest, api_key: str = Depends(get_api_key)
+):
+    try:
+        return await crypto_service.decrypt_batch(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/encrypt/stream")
+async def encrypt_stream(
+    request: Request,
+    x_encryption_key: str = Header(...),
+    chunk_size: Optional[int] = Query(None),
+    api_key: str = Depends(get_api_key),
+):
+    # Body mentah masuk, ciphertext tersegmentasi keluar; memori tetap konstan
+    try:
+        stream = await crypto_service.encrypt_stream(
+            request.stream(), x_encryption_key, chunk_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DuplexStreamingResponse(stream, media_type="application/octet-stream")
+
+
+@app.post("/data/decrypt/stream")
+async def decrypt_stream(
+    request: Request,
+    x_encryption_key: str = Header(...),
+    api_key: str = Depends(get_api_key),
+):
     try:
-        return await crypto_service.hybrid_encrypt(request)
+        stream = await crypto_service.decrypt_stream(
+            request.stream(), x_encryption_key
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DuplexStreamingResponse(stream, media_type="application/octet-stream")
+
+
+HYBRID_MEDIA = (negotiation.JSON, negotiation.MSGPACK, negotiation.CBOR)
+
+
+@app.post(
+    "/data/hybrid/encrypt",
+    response_model=HybridEncryptResponse,
+    openapi_extra=negotiation.openapi_body(HybridEncryptRequest),
+)
+async def hybrid_encrypt(http_request: Request):
+    media, payload = await negotiation.read_request(http_request, HybridEncryptRequest)
+    # Hybrid punya beberapa field biner: tidak ada bentuk octet-stream
+    if media == negotiation.OCTET_STREAM:
+        raise HTTPException(
+            status_code=415, detail="Use JSON, MessagePack or CBOR for hybrid requests"
+        )
+    reply = negotiation.response_media_type(http_request, media, HYBRID_MEDIA)
+    try:
+        if media == negotiation.JSON:
+            data = payload.data.encode("utf-8")
+            public_key = crypto_service._decode_kem_key(payload.publicKey)
+        else:
+            data = negotiation.field(payload, "data", bytes)
+            public_key = negotiation.field(payload, "publicKey", bytes)
+        ciphertext, iv, tag, encapsulated_key = (
+            await crypto_service.hybrid_encrypt_bytes(data, public_key)
+        )
+        if reply == negotiation.JSON:
+            return HybridEncryptResponse(
+                encrypted=base64.b64encode(ciphertext).decode(),
+                iv=base64.b64encode(iv).decode(),
+                tag=base64.b64encode(tag).decode(),
+                encapsulatedKey=base64.b64encode(encapsulated_key).decode(),
+            )
+        return negotiation.binary_response(
+            reply,
+            {
+                "encrypted": ciphertext,
+                "iv": iv,
+                "tag": bytes(tag),
+                "encapsulatedKey": encapsulated_key,
+            },
+        )
+    except (ExecutorSaturatedError, HTTPException):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post(
+    "/data/hybrid/decrypt",
+    response_model=DecryptResponse,
+    openapi_extra=negotiation.openapi_body(HybridDecryptRequest),
+)
+async def hybrid_decrypt(http_request: Request):
+    media, payload = await negotiation.read_request(http_request, HybridDecryptRequest)
+    # Hybrid punya beberapa field biner: tidak ada bentuk octet-stream
+    if media == negotiation.OCTET_STREAM:
+        raise HTTPException(
+            status_code=415, detail="Use JSON, MessagePack or CBOR for hybrid requests"
+        )
+    reply = negotiation.response_media_type(http_request, media, HYBRID_MEDIA)
+    try:
+        if media == negotiation.JSON:
+            fields = (
+                base64.b64decode(payload.encrypted),
+                base64.b64decode(payload.iv),
+                base64.b64decode(payload.tag),
+                base64.b64decode(payload.encapsulatedKey),
+                crypto_service._decode_kem_key(payload.privateKey),
+            )
+        else:
+            fields = tuple(
+                negotiation.field(payload, name, bytes)
+                for name in ("encrypted", "iv", "tag", "encapsulatedKey", "privateKey")
+            )
+        decrypted = await crypto_service.hybrid_decrypt_bytes(*fields)
+        if reply == negotiation.JSON:
+            return DecryptResponse(decrypted=decrypted.decode("utf-8"))
+        return negotiation.binary_response(reply, {"decrypted": decrypted})
+    except (ExecutorSaturatedError, HTTPException):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/data/hybrid/session/encrypt", response_model=HybridSessionEncryptResponse)
+async def hybrid_session_encrypt(request: HybridEncryptRequest):
+    try:
+        return await crypto_service.hybrid_session_encrypt(
+            request.data, request.publicKey
+        )
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/data/hybrid/decrypt", response_model=DecryptResponse)
-async def hybrid_decrypt(request: DecryptRequest):
+@app.post("/data/hybrid/session/decrypt", response_model=DecryptResponse)
+async def hybrid_session_decrypt(request: HybridSessionDecryptRequest):
     try:
-        return await crypto_service.hybrid_decrypt(request)
+        result = await crypto_service.hybrid_session_decrypt(
+            request.encrypted,
+            request.iv,
+            request.tag,
+            request.session,
+            request.privateKey,
+            request.encapsulatedKey,
+        )
+        return DecryptResponse(decrypted=result["decrypted_data"])
+    except ExecutorSaturatedError:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/data/sign", response_model=SignResponse)
-async def sign_data(request: SignRequest):
+@app.post(
+    "/data/sign",
+    response_model=SignResponse,
+    openapi_extra=negotiation.openapi_body(SignRequest, "Data; key in X-Signing-Key"),
+)
+async def sign_data(http_request: Request):
+    media, payload = await negotiation.read_request(http_request, SignRequest)
+    reply = negotiation.response_media_type(http_request, media)
     try:
-        return await integrity_service.create_signature(request)
+        if media == negotiation.JSON and reply == negotiation.JSON:
+            return await integrity_service.create_signature(payload)
+
+        if media == negotiation.JSON:
+            data, key = payload.data.encode(), payload.key
+        elif media == negotiation.OCTET_STREAM:
+            data, key = payload, negotiation.header(http_request, "X-Signing-Key")
+        else:
+            data = negotiation.field(payload, "data", bytes)
+            key = negotiation.field(payload, "key", str)
+        signature = integrity_service.sign_bytes(data, key.encode())
+        if reply == negotiation.JSON:
+            return SignResponse(signature=base64.b64encode(signature).decode())
+        return negotiation.binary_response(
+            reply, {"signature": signature}, raw=signature
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -310,17 +955,11 @@ async def create_argon2id_hash(request: Argon2idHashRequest):
         # 🧂 Salt untuk KDF eksternal (misalnya untuk AES)
         salt_for_kdf = os.urandom(16)
 
-        # 🔐 Argon2id Hasher - param tuning (bisa disesuaikan)
-        ph = PasswordHasher(
-            time_cost=3,  # jumlah iterasi
-            memory_cost=64 * 1024,  # dalam KB (64MB)
-            parallelism=2,
-            hash_len=32,
-            salt_len=16,  # internal salt (beda dari salt_for_kdf)
-        )
-
         # 🔐 Buat hash password (salt internal akan dimasukkan otomatis)
-        hashed_password = ph.hash(request.password)
+        # PasswordHasher dibuat sekali per set parameter dan dipakai ulang
+        hashed_password = await crypto_executor.run(
+            "argon2id", jobs.argon2id_hash, request.password, ARGON2_PARAMS
+        )
 
         return Argon2idHashResponse(
             hashed_password=hashed_password, salt_argon_hex=salt_for_kdf.hex()
@@ -328,6 +967,8 @@ async def create_argon2id_hash(request: Argon2idHashRequest):
 
     except argon2_exceptions.HashingError as e:
         raise HTTPException(status_code=500, detail=f"Hashing error: {str(e)}")
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
@@ -335,11 +976,17 @@ async def create_argon2id_hash(request: Argon2idHashRequest):
 @app.post("/auth/argon2id-verify", response_model=VerifyPasswordResponse)
 async def verify_argon2id_password(request: VerifyPasswordRequest):
     try:
-        ph = PasswordHasher()
-        valid = ph.verify(request.hash, request.password)
+        valid = await password_verify_cache.verify(
+            "argon2id",
+            request.password.encode(),
+            request.hash.encode(),
+            lambda: crypto_executor.run(
+                "argon2id", jobs.argon2id_verify, request.hash, request.password
+            ),
+        )
         return VerifyPasswordResponse(valid=valid)
-    except argon2_exceptions.VerifyMismatchError:
-        return VerifyPasswordResponse(valid=False)
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
@@ -352,6 +999,94 @@ async def verify_sign(request: VerifyRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/data/sign/stream", response_model=StreamSignResponse)
+async def sign_stream(
+    request: Request,
+    x_signing_key: str = Header(...),
+    algorithm: str = Query("sha256"),
+    api_key: str = Depends(get_api_key),
+):
+    # Body mentah di-HMAC per blok; ukuran dokumen tidak memengaruhi memori
+    try:
+        return await integrity_service.sign_stream(
+            request.stream(), x_signing_key.encode(), algorithm
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/verify-sign/stream", response_model=StreamVerifyResponse)
+async def verify_sign_stream(
+    request: Request,
+    x_signing_key: str = Header(...),
+    x_signature: str = Header(...),
+    algorithm: str = Query("sha256"),
+    api_key: str = Depends(get_api_key),
+):
+    signature = negotiation.decode_header(x_signature, "X-Signature")
+    try:
+        return await integrity_service.verify_stream(
+            request.stream(), x_signing_key.encode(), signature, algorithm
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/sign/batch", response_model=SignBatchResponse)
+async def sign_batch(
+    request: SignBatchRequest, api_key: str = Depends(get_api_key)
+):
+    # Ribuan pesan kecil per request; konteks HMAC per kunci disiapkan sekali
+    try:
+        return await integrity_service.sign_batch(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/verify-sign/batch", response_model=VerifyBatchResponse)
+async def verify_sign_batch(
+    request: VerifyBatchRequest, api_key: str = Depends(get_api_key)
+):
+    try:
+        return await integrity_service.verify_batch(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/integrity/manifest", response_model=IntegrityManifestResponse)
+async def integrity_manifest(
+    request: Request,
+    x_signing_key: str = Header(...),
+    chunk_size: Optional[int] = Query(None),
+    algorithm: str = Query("sha256"),
+    proof_start: Optional[int] = Query(None),
+    proof_end: Optional[int] = Query(None),
+    api_key: str = Depends(get_api_key),
+):
+    # Manifest Merkle bertanda tangan; bukti inklusi untuk [proof_start, proof_end)
+    proof_range = None
+    if proof_start is not None or proof_end is not None:
+        if proof_start is None or proof_end is None or proof_end <= proof_start:
+            raise HTTPException(
+                status_code=400, detail="proof_start < proof_end are both required"
+            )
+        proof_range = range(proof_start, proof_end)
+    try:
+        return await integrity_service.build_manifest(
+            request.stream(), x_signing_key.encode(), chunk_size, algorithm, proof_range
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/data/integrity/verify-chunks", response_model=VerifyChunksResponse)
+async def verify_integrity_chunks(request: VerifyChunksRequest):
+    try:
+        return await integrity_service.verify_chunks(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/data/integrity/check", response_model=VerifyResponse)
 async def check_integrity(request: VerifyRequest):
     try:
@@ -366,6 +1101,8 @@ async def aes_encrypt_password_endpoint(request: AesEncryptPasswordRequest):
         # Pilih GCM (lebih direkomendasikan) atau CBC
         return await crypto_service.aes_encrypt_password_gcm(request)
         # return await crypto_service.aes_encrypt_password_cbc(request) # Jika Anda memilih CBC
+    except ExecutorSaturatedError:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -382,6 +1119,171 @@ async def generate_hmac_endpoint(request: GenerateHmacRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Admin Routes
+@app.get("/admin/executor/stats")
+async def executor_stats(api_key: str = Depends(get_api_key)):
+    return crypto_executor.stats()
+
+
+@app.post("/admin/tokens/revoke", response_model=RevokeTokenResponse)
+async def admin_revoke_token(
+    request: RevokeJtiRequest, api_key: str = Depends(get_api_key)
+):
+    revoked = await revocation_list.revoke(request.jti, request.exp)
+    return RevokeTokenResponse(revoked=revoked, jti=request.jti, expires_at=request.exp)
+
+
+@app.get("/admin/sessions/stats")
+async def session_stats(api_key: str = Depends(get_api_key)):
+    return session_store.stats()
+
+
+@app.post("/admin/sessions/snapshot")
+async def save_session_snapshot(api_key: str = Depends(get_api_key)):
+    if not session_store.snapshot_path:
+        raise HTTPException(status_code=400, detail="SESSION_SNAPSHOT_PATH is not set")
+    # Di thread event loop: dump tidak boleh bersilangan dengan request lain
+    sessions = session_store.save()
+    return {"path": session_store.snapshot_path, "sessions": sessions}
+
+
+@app.get("/admin/sessions/{username}", response_model=list[SessionInfo])
+async def list_sessions(username: str, api_key: str = Depends(get_api_key)):
+    return [session.to_dict() for session in session_store.for_user(username)]
+
+
+@app.post("/admin/sessions/{username}/logout-all", response_model=LogoutAllResponse)
+async def admin_logout_all(username: str, api_key: str = Depends(get_api_key)):
+    return await auth_service.logout_all(username)
+
+
+@app.get("/admin/revocation/stats")
+async def revocation_stats(api_key: str = Depends(get_api_key)):
+    return revocation_list.stats()
+
+
+@app.get("/admin/load-shedding/stats")
+async def load_shedding_stats(api_key: str = Depends(get_api_key)):
+    return load_shedder.stats()
+
+
+@app.get("/admin/admission/stats")
+async def admission_stats(api_key: str = Depends(get_api_key)):
+    return admission.stats()
+
+
+@app.get("/admin/key-cache/stats")
+async def key_cache_stats(api_key: str = Depends(get_api_key)):
+    return key_cache.stats()
+
+
+@app.get("/admin/hmac-cache/stats")
+async def hmac_cache_stats(api_key: str = Depends(get_api_key)):
+    return default_hmac_cache.stats()
+
+
+@app.get("/admin/kem-pool/stats")
+async def kem_pool_stats(api_key: str = Depends(get_api_key)):
+    return kem_pool.stats()
+
+
+@app.get("/admin/kem-key-cache/stats")
+async def kem_key_cache_stats(api_key: str = Depends(get_api_key)):
+    return default_kem_key_cache.stats()
+
+
+@app.get("/admin/hybrid-sessions/stats")
+async def hybrid_session_stats(api_key: str = Depends(get_api_key)):
+    return {
+        "sender": crypto_service.hybrid_sender.stats(),
+        "receiver": crypto_service.hybrid_receiver.stats(),
+    }
+
+
+@app.get("/admin/nonces/stats")
+async def nonce_stats(api_key: str = Depends(get_api_key)):
+    stats = default_nonce_manager.stats()
+    stats["rekeys"] = crypto_service.rekeys if loaded(crypto_service) else 0
+    return stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: Optional[float] = Query(None, ge=1),
+    idle: bool = False,
+    api_key: str = Depends(get_api_key),
+):
+    """Sample this worker for ``seconds`` and return collapsed stacks."""
+    try:
+        profile = await profiler.profile_for(
+            seconds, interval_ms / 1000 if interval_ms else None, idle
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    summary = profile.summary()
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={
+            "X-Profile-Samples": str(summary["samples"]),
+            "X-Profile-Overhead": str(summary["overhead_ratio"]),
+        },
+    )
+
+
+@app.get("/admin/profile/requests")
+async def profiled_requests(api_key: str = Depends(get_api_key)):
+    return profiler.stats()
+
+
+@app.get("/admin/profile/requests/{profile_id}", response_class=PlainTextResponse)
+async def profiled_request(profile_id: str, api_key: str = Depends(get_api_key)):
+    profile = profiler.get_request(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=404, detail="Profile not found (request was not slow or expired)"
+        )
+    return PlainTextResponse(profile.collapsed())
+
+
+@app.get("/admin/token-cache/stats")
+async def token_cache_stats(api_key: str = Depends(get_api_key)):
+    return {
+        "refresh_token": refresh_token_cache.stats(),
+        "auth_service": auth_service.token_cache.stats(),
+    }
+
+
+@app.get("/admin/password-verify-cache/stats")
+async def password_verify_cache_stats(api_key: str = Depends(get_api_key)):
+    return password_verify_cache.stats()
+
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe. With EAGER_SERVICES (python -m python.serve) it answers
+    503 until the crypto dependencies are warmed up; lazily started apps are
+    ready immediately and warm up on first use.
+    """
+    body = {
+        "ready": warmup.is_ready() or not EAGER_SERVICES,
+        "mode": "eager" if EAGER_SERVICES else "lazy",
+        "pid": os.getpid(),
+        "warmup": warmup.report(),
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+
 # Documentation Routes
 @app.get("/")
 async def root():
@@ -0,0 +1,194 @@
+"""
+Production entry point for the Python backend.
+
+    python -m python.serve [--host 0.0.0.0] [--port 8000] [--workers N] [--check]
+
+- Secrets are loaded once (environment, then .env). Startup fails unless
+  API_KEY and JWT_SECRET_KEY are set, so every worker shares the same
+  secrets and tokens issued by one worker verify on all the others.
+- The heavy crypto modules are imported and exercised once in the parent
+  (see ``app.utils.warmup``), and then the workers are forked, so they start
+  warm and share those pages copy-on-write. The app itself (thread pools,
+  SQLite connections) is still built inside each worker after the fork and
+  is never inherited.
+- The worker count defaults to the CPU count (WEB_CONCURRENCY or --workers
+  override it). Unless CRYPTO_EXECUTOR_WORKERS is set, the CPUs are divided
+  among the workers' crypto thread pools instead of each worker claiming
+  all of them.
+- uvloop and httptools are used when installed.
+- EAGER_SERVICES defaults to 1, so each worker builds its services at
+  startup and not on first use (the serverless default).
+
+The parent owns the listening socket and restarts workers that die. SIGTERM
+or SIGINT stops them all. A worker that dies right after it starts stops the
+whole server instead of restarting in a loop. Without ``os.fork`` (Windows)
+it serves from one process. ``--check`` validates the configuration, runs
+the warmup, prints its timings and exits.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+from importlib.util import find_spec
+
+from dotenv import load_dotenv
+
+APP = "python.main:app"
+REQUIRED_SECRETS = ("API_KEY", "JWT_SECRET_KEY")
+MIN_SECRET_LENGTH = 32
+# A worker that exits sooner than this after being forked is a startup failure
+CRASH_LOOP_SECONDS = 5.0
+
+
+def load_secrets() -> None:
+    load_dotenv()
+    missing = [name for name in REQUIRED_SECRETS if not os.getenv(name)]
+    if missing:
+        sys.exit(
+            f"serve: missing {', '.join(missing)}. Set them in the environment or "
+            ".env; random per-process fallbacks break tokens across workers."
+        )
+    for name in REQUIRED_SECRETS:
+        if len(os.environ[name]) < MIN_SECRET_LENGTH:
+            print(
+                f"serve: warning: {name} is shorter than {MIN_SECRET_LENGTH} characters",
+                file=sys.stderr,
+            )
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+def size_crypto_threads(workers: int) -> int:
+    if not os.getenv("CRYPTO_EXECUTOR_WORKERS"):
+        os.environ["CRYPTO_EXECUTOR_WORKERS"] = str(
+            max(1, (os.cpu_count() or 1) // workers)
+        )
+    return int(os.environ["CRYPTO_EXECUTOR_WORKERS"])
+
+
+def server_config(host: str, port: int):
+    import uvicorn
+
+    return uvicorn.Config(
+        APP,
+        host=host,
+        port=port,
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        proxy_headers=True,
+    )
+
+
+class Supervisor:
+    def __init__(self, config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.sock = None
+        self.children: dict[int, float] = {}  # pid -> fork time
+        self.stopping = False
+        self.exit_code = 0
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Worker: uvicorn installs its own signal handlers
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                import uvicorn
+
+                uvicorn.Server(self.config).run(sockets=[self.sock])
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            os._exit(code)
+        self.children[pid] = time.monotonic()
+
+    def _stop(self, signum=None, frame=None) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        self.sock = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < CRASH_LOOP_SECONDS:
+                print(
+                    f"serve: worker {pid} exited during startup ({code}); stopping",
+                    file=sys.stderr,
+                )
+                self.exit_code = 1
+                self._stop()
+                continue
+            print(f"serve: worker {pid} exited ({code}); restarting", file=sys.stderr)
+            self._spawn()
+        self.sock.close()
+        return self.exit_code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Python backend")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--check", action="store_true", help="validate config, warm up and exit"
+    )
+    args = parser.parse_args()
+
+    load_secrets()
+    workers = max(1, args.workers or default_workers())
+    if not hasattr(os, "fork"):
+        workers = 1
+    threads = size_crypto_threads(workers)
+    # Long-running workers build every service at startup instead of on first use
+    if not os.getenv("EAGER_SERVICES"):
+        os.environ["EAGER_SERVICES"] = "1"
+
+    from .app.utils import warmup
+
+    report = warmup.warm_up()
+    config = server_config(args.host, args.port)
+    print(
+        f"serve: {workers} worker(s), {threads} crypto thread(s) each, "
+        f"loop={config.loop}, http={config.http}, "
+        f"warmup {report['total_seconds'] * 1000:.0f} ms",
+        file=sys.stderr,
+    )
+    if args.check:
+        print(json.dumps(report, indent=2))
+        return
+
+    if workers == 1:
+        import uvicorn
+
+        uvicorn.Server(config).run()
+        return
+    sys.exit(Supervisor(config, workers).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Cold-start gate: a fresh interpreter imports python.main and serves GET /.
+
+COLD_START_BUDGET_RATIO (default 2) bounds the median against the framework
+floor (fastapi + pydantic + dotenv alone), so the check holds on slow and
+fast machines alike. COLD_START_BUDGET_MS adds an absolute bound.
+IMPORT_BUDGET_RATIO (default 2) bounds the cumulative ``-X importtime`` of
+``python.main`` against the framework modules in the same way.
+"""
+
+import os
+
+from python.benchmarks.bench_cold_start import (
+    HEAVY_MODULES,
+    budget_failures,
+    cold_start,
+    import_budget_failures,
+    import_times,
+    run,
+)
+
+
+def test_root_loads_no_crypto_backend():
+    result = cold_start("/")
+    assert result["status"] == 200
+    assert result["loaded"] == []
+    assert {"bcrypt", "argon2", "jwt", "kyber_py", "cryptography"} <= set(
+        HEAVY_MODULES
+    )
+
+
+def test_cold_start_within_budget():
+    result = run("/", runs=3)
+    failures = budget_failures(
+        result,
+        float(os.getenv("COLD_START_BUDGET_RATIO", "2")),
+        float(os.getenv("COLD_START_BUDGET_MS", "0")),
+    )
+    assert not failures, failures
+
+
+def test_import_time_within_budget():
+    times = import_times(runs=3)
+    # Both sides include fastapi, so a broken parse would show up as zero
+    assert times["framework_import_ms"] > 0
+    assert times["main_import_ms"] > times["framework_import_ms"] / 2
+    failures = import_budget_failures(
+        times, float(os.getenv("IMPORT_BUDGET_RATIO", "2"))
+    )
+    assert not failures, failures
+
+
+def test_budget_failures_reports_leaks_and_overruns():
+    result = {
+        "heavy_modules_loaded": ["cryptography"],
+        "total_ms": 500.0,
+        "framework_floor_ms": 200.0,
+    }
+    failures = budget_failures(result, 2.0, 400)
+    assert len(failures) == 3
+    assert "cryptography" in failures[0]
+    assert not budget_failures({**result, "heavy_modules_loaded": []}, 3.0)
+    assert import_budget_failures(
+        {"main_import_ms": 500.0, "framework_import_ms": 200.0}, 2.0
+    )
+    assert not import_budget_failures(
+        {"main_import_ms": 300.0, "framework_import_ms": 200.0}, 2.0
+    )
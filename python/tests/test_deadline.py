@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from python.app.utils import deadline
+from python.app.utils.executor import DeadlineExceededError
+from python.app.utils.hybrid_session import HybridSessionSender
+from python.app.utils.key_cache import DerivedKeyCache
+
+
+async def within(seconds: float, call):
+    token = deadline.activate(
+        deadline.RequestBudget("/test", time.monotonic() + seconds)
+    )
+    try:
+        return await call()
+    finally:
+        deadline.reset(token)
+
+
+def test_shared_derivation_ignores_the_starters_budget():
+    cache = DerivedKeyCache()
+    release = asyncio.Event()
+    budgets = []
+
+    async def derive():
+        budgets.append(deadline.current())
+        await release.wait()
+        return b"k" * 32
+
+    def get():
+        return cache.get_or_derive(b"material", b"salt", 1, derive)
+
+    async def run():
+        short = asyncio.ensure_future(within(0.05, get))
+        patient = asyncio.ensure_future(within(30, get))
+        await asyncio.sleep(0.2)
+        # Only the caller whose budget ran out gives up
+        with pytest.raises(DeadlineExceededError):
+            await asyncio.wait_for(short, 5)
+        assert not patient.done()
+        release.set()
+        assert bytes((await patient).key) == b"k" * 32
+        assert budgets == [None]
+        assert cache.stats()["size"] == 1
+
+    asyncio.run(run())
+
+
+def test_shared_encapsulation_ignores_the_starters_budget():
+    release = asyncio.Event()
+    budgets = []
+
+    async def encapsulate(public_key):
+        budgets.append(deadline.current())
+        await release.wait()
+        return b"s" * 32, b"encapsulated"
+
+    sender = HybridSessionSender(encapsulate)
+
+    def send():
+        return sender.next_message(b"public", 10)
+
+    async def run():
+        short = asyncio.ensure_future(within(0.05, send))
+        patient = asyncio.ensure_future(within(30, send))
+        await asyncio.sleep(0.2)
+        with pytest.raises(DeadlineExceededError):
+            await asyncio.wait_for(short, 5)
+        release.set()
+        _, _, encapsulated = await patient
+        assert encapsulated == b"encapsulated"
+        assert budgets == [None]
+        assert sender.encapsulations == 1
+
+    asyncio.run(run())
+
+
+def test_wait_shared_without_budget_waits_for_the_task():
+    async def run():
+        task = deadline.detach(asyncio.sleep(0.01, result="done"))
+        assert await deadline.wait_shared(task, "job") == "done"
+
+    asyncio.run(run())
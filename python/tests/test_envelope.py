@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from python.app.models.schemas import BatchDecryptItem, BatchDecryptRequest
+from python.app.services.crypto_service import CryptoService
+from python.app.utils import envelope
+from python.app.utils.key_cache import DerivedKeyCache
+
+
+@pytest.fixture
+def service():
+    return CryptoService(key_cache=DerivedKeyCache())
+
+
+def forged(iterations: int = 100_000) -> bytes:
+    header = envelope.pack_header(
+        envelope.KDF_PBKDF2_SHA256, iterations, os.urandom(16), os.urandom(12)
+    )
+    return header + os.urandom(20 + envelope.TAG_SIZE)
+
+
+def test_pack_parse_round_trip():
+    salt, nonce = os.urandom(16), os.urandom(12)
+    header = envelope.pack_header(envelope.KDF_PBKDF2_SHA256, 100_000, salt, nonce)
+    parsed = envelope.parse(header + b"c" * 5 + b"t" * envelope.TAG_SIZE)
+    assert bytes(parsed.header) == header
+    assert (parsed.kdf, parsed.iterations) == (envelope.KDF_PBKDF2_SHA256, 100_000)
+    assert (bytes(parsed.salt), bytes(parsed.nonce)) == (salt, nonce)
+    assert bytes(parsed.ciphertext) == b"c" * 5
+    assert bytes(parsed.tag) == b"t" * envelope.TAG_SIZE
+
+
+@pytest.mark.parametrize(
+    "blob, message",
+    [
+        (b"DSH", "Truncated"),
+        (b"XXXX" + forged()[4:], "Not a ciphertext envelope"),
+        (forged()[: -20 - envelope.TAG_SIZE], "Truncated"),
+        (forged(iterations=1000), "iterations out of range"),
+    ],
+)
+def test_parse_rejects_malformed(blob, message):
+    with pytest.raises(envelope.EnvelopeError, match=message):
+        envelope.parse(blob)
+
+
+def test_round_trip(service):
+    async def run():
+        sealed = await service.encrypt_bytes(b"secret", "pw")
+        assert envelope.looks_like_envelope(sealed)
+        assert bytes(envelope.parse(sealed).salt) == service.salt
+        assert await service.decrypt_bytes(sealed, "pw") == b"secret"
+
+    asyncio.run(run())
+
+
+def test_round_trip_across_workers(service):
+    # Another worker has its own salt; the envelope tells which one to use
+    other = CryptoService(key_cache=DerivedKeyCache())
+
+    async def run():
+        sealed = await other.encrypt_bytes(b"secret", "pw")
+        assert await service.decrypt_bytes(sealed, "pw") == b"secret"
+
+    asyncio.run(run())
+
+
+def test_legacy_three_field_path(service):
+    key, _ = service.derive_key("pw")
+    iv = os.urandom(12)
+    sealed = AESGCM(key).encrypt(iv, b"legacy", None)
+    ciphertext, tag = sealed[:-16], sealed[-16:]
+
+    async def run():
+        assert await service.decrypt_bytes(ciphertext, "pw", iv, tag) == b"legacy"
+        with pytest.raises(ValueError, match="iv and tag are required"):
+            await service.decrypt_bytes(ciphertext, "pw")
+        with pytest.raises(InvalidTag):
+            await service.decrypt_bytes(ciphertext, "pw", iv, bytes(16))
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("region", ["salt", "nonce", "ciphertext", "tag"])
+def test_rejects_tampering(service, region):
+    async def run():
+        sealed = bytearray(await service.encrypt_bytes(b"secret", "pw"))
+        parsed = envelope.parse(bytes(sealed))
+        header_size = len(parsed.header)
+        offset = {
+            "salt": envelope.PREFIX.size,
+            "nonce": header_size - envelope.NONCE_SIZE,
+            "ciphertext": header_size,
+            "tag": len(sealed) - 1,
+        }[region]
+        sealed[offset] ^= 1
+        with pytest.raises(InvalidTag):
+            await service.decrypt_bytes(bytes(sealed), "pw")
+
+    asyncio.run(run())
+
+
+def test_rejects_wrong_key(service):
+    async def run():
+        sealed = await service.encrypt_bytes(b"secret", "pw")
+        with pytest.raises(InvalidTag):
+            await service.decrypt_bytes(sealed, "other")
+
+    asyncio.run(run())
+
+
+def test_rejects_unaccepted_iterations_without_deriving(service):
+    async def run():
+        with pytest.raises(envelope.EnvelopeError, match="not accepted"):
+            await service.decrypt_bytes(forged(iterations=2_000_000), "pw")
+        assert service.key_cache.misses == 0
+
+    asyncio.run(run())
+
+
+def test_forged_envelope_key_is_not_cached(service):
+    async def run():
+        sealed = await service.encrypt_bytes(b"secret", "pw")
+        assert service.key_cache.stats()["size"] == 1
+        with pytest.raises(InvalidTag):
+            await service.decrypt_bytes(forged(), "pw")
+        assert service.key_cache.stats()["size"] == 1
+        # A key that opened its envelope is kept
+        other = await CryptoService(key_cache=DerivedKeyCache()).encrypt_bytes(
+            b"x", "pw"
+        )
+        assert await service.decrypt_bytes(other, "pw") == b"x"
+        assert service.key_cache.stats()["size"] == 2
+        assert await service.decrypt_bytes(sealed, "pw") == b"secret"
+
+    asyncio.run(run())
+
+
+def test_batch_caps_distinct_salts(service):
+    service.batch_max_salts = 2
+    items = [
+        BatchDecryptItem(encrypted=base64.b64encode(forged()).decode())
+        for _ in range(4)
+    ]
+
+    async def run():
+        response = await service.decrypt_batch(
+            BatchDecryptRequest(key="pw", items=items)
+        )
+        errors = [result.error for result in response.results]
+        assert errors[:2] == ["Authentication failed"] * 2
+        assert errors[2:] == ["Batch uses more than 2 salts"] * 2
+        # No upfront derivation for this worker's own salt either
+        assert service.key_cache.misses == 2
+        assert service.key_cache.stats()["size"] == 0
+
+    asyncio.run(run())
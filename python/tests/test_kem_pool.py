@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from python.app.utils import deadline
+from python.app.utils.executor import CryptoExecutor
+from python.app.utils.kem_pool import KemKeyPool
+
+
+def keygen():
+    return b"public", b"private"
+
+
+def test_pool_primed_inside_expired_budget_still_fills():
+    executor = CryptoExecutor("thread", max_workers=1)
+    pool = KemKeyPool(executor, keygen, low_watermark=2, high_watermark=4)
+    pool.retry_delay = 0.01
+
+    async def run():
+        budget = deadline.RequestBudget("/crypto/key/kem", time.monotonic() - 1)
+        token = deadline.activate(budget)
+        try:
+            pool.start()
+        finally:
+            deadline.reset(token)
+        for _ in range(200):
+            if pool.stats()["size"] == 4:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.stats()["size"] == 4
+        assert executor.stats()["jobs"]["kem_keygen"]["shed"] == 0
+        # A request that is already out of time can still take a pooled pair
+        token = deadline.activate(budget)
+        try:
+            assert await pool.acquire() == (b"public", b"private")
+        finally:
+            deadline.reset(token)
+        assert pool.stats()["served"] == 1
+        await pool.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown(wait=True)
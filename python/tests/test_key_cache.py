@@ -0,0 +1,80 @@
+import asyncio
+import gc
+
+from python.app.models.schemas import BatchEncryptRequest
+from python.app.services.crypto_service import CryptoService
+from python.app.utils.key_cache import DerivedKeyCache
+
+
+def derive(value: bytes):
+    async def run():
+        await asyncio.sleep(0)
+        return value * 32
+
+    return run
+
+
+def test_evicted_entry_stays_usable_while_held():
+    cache = DerivedKeyCache(max_entries=1)
+
+    async def run():
+        entry = await cache.get_or_derive(b"a", b"salt", 1, derive(b"a"))
+        key = entry.key
+        await cache.get_or_derive(b"b", b"salt", 1, derive(b"b"))
+        assert cache.evictions == 1
+        # Still sealing with its own key after eviction
+        assert bytes(key) == b"a" * 32
+        assert entry.aesgcm.encrypt(bytes(12), b"x", None)
+        # Zeroized once the last holder lets go
+        del entry
+        gc.collect()
+        assert bytes(key) == bytes(32)
+
+    asyncio.run(run())
+
+
+def test_coalesced_waiters_survive_eviction():
+    cache = DerivedKeyCache(max_entries=1)
+
+    async def run():
+        waiters = [
+            cache.get_or_derive(b"a", b"salt", 1, derive(b"a")) for _ in range(4)
+        ]
+        # Evicts "a" before its waiters resume
+        other = cache.get_or_derive(b"b", b"salt", 1, derive(b"b"))
+        entries = await asyncio.gather(*waiters, other)
+        assert cache.coalesced == 3
+        for entry in entries[:4]:
+            assert bytes(entry.key) == b"a" * 32 and entry.aesgcm is not None
+
+    asyncio.run(run())
+
+
+def test_encrypt_under_eviction_pressure():
+    service = CryptoService(key_cache=DerivedKeyCache(max_entries=1))
+    cache = service.key_cache
+    done = asyncio.Event()
+
+    async def batch():
+        request = BatchEncryptRequest(key="batch", items=["x"] * 2048)
+        response = await service.encrypt_batch(request)
+        assert [r.error for r in response.results] == [None] * 2048
+
+    async def evict():
+        # Another key takes the only slot at every yield of the batches
+        for i in range(10_000):
+            material = f"key-{i}".encode()
+            await cache.get_or_derive(material, b"salt", 1, derive(b"k"))
+            if done.is_set():
+                break
+
+    async def run():
+        evicting = asyncio.ensure_future(evict())
+        await asyncio.gather(*(batch() for _ in range(4)))
+        sealed = await service.encrypt_bytes(b"data", "batch")
+        done.set()
+        await evicting
+        assert cache.evictions > 4
+        assert await service.decrypt_bytes(sealed, "batch") == b"data"
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from python.app.utils import negotiation
+from python.app.utils.negotiation import CBOR, JSON, MSGPACK, OCTET_STREAM
+
+HYBRID = (JSON, MSGPACK, CBOR)
+
+
+def reply(accept, request_media=JSON, offered=negotiation.SUPPORTED):
+    headers = [(b"accept", accept.encode())] if accept is not None else []
+    request = Request({"type": "http", "headers": headers})
+    return negotiation.response_media_type(request, request_media, offered)
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, MSGPACK),
+        ("", MSGPACK),
+        ("application/json", JSON),
+        ("text/html, application/cbor", CBOR),
+        ("application/json;q=0, application/msgpack", MSGPACK),
+        ("application/json;q=0.5, application/cbor", CBOR),
+        ("application/cbor;q=0.9, application/json;q=0.9", CBOR),
+        ("application/x-msgpack", MSGPACK),
+        ("*/*", MSGPACK),
+        ("application/msgpack;q=0, */*", JSON),
+        ("text/html, */*;q=0.1", MSGPACK),
+    ],
+)
+def test_accept_picks_by_quality_then_order(accept, expected):
+    assert reply(accept, request_media=MSGPACK) == expected
+
+
+@pytest.mark.parametrize(
+    "accept",
+    ["text/html", "application/json;q=0", "application/octet-stream"],
+)
+def test_nothing_acceptable_is_406(accept):
+    with pytest.raises(HTTPException) as raised:
+        reply(accept, offered=HYBRID)
+    assert raised.value.status_code == 406
+
+
+def test_route_offers_limit_the_choice():
+    assert reply("application/octet-stream, application/cbor", offered=HYBRID) == CBOR
+    assert reply("application/octet-stream", offered=negotiation.SUPPORTED) == (
+        OCTET_STREAM
+    )
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from python.app.repositories.revocation_repository import (
+    InMemoryRevocationStore,
+    RevocationStore,
+    SQLiteRevocationStore,
+)
+from python.app.utils.revocation import RevocationList
+
+
+class CountingStore(InMemoryRevocationStore):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    async def contains(self, jti: str) -> bool:
+        self.lookups += 1
+        return await super().contains(jti)
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        RevocationStore()
+
+
+def test_unrevoked_token_skips_the_store():
+    store = CountingStore()
+    revocations = RevocationList(store, sync_seconds=3600)
+    exp = time.time() + 600
+
+    async def run():
+        assert await revocations.revoke("revoked", exp)
+        for i in range(200):
+            assert not await revocations.is_revoked({"jti": f"live-{i}", "exp": exp})
+        # Only Bloom positives reach the store; at 1% that is a handful at most
+        assert store.lookups == revocations.possible_hits < 10
+        assert await revocations.is_revoked({"jti": "revoked", "exp": exp})
+        assert store.lookups == revocations.possible_hits
+
+    asyncio.run(run())
+
+
+def test_token_in_another_window_skips_the_store():
+    store = CountingStore()
+    revocations = RevocationList(store, window_seconds=60, sync_seconds=3600)
+    exp = time.time() + 600
+
+    async def run():
+        await revocations.revoke("jti", exp)
+        # Same jti, but its window has no filter
+        assert not await revocations.is_revoked({"jti": "jti", "exp": exp + 600})
+        assert store.lookups == 0
+
+    asyncio.run(run())
+
+
+def test_expired_windows_are_dropped():
+    store = InMemoryRevocationStore()
+    revocations = RevocationList(store, window_seconds=60, sync_seconds=3600)
+    now = time.time()
+
+    async def run():
+        await revocations.revoke("old", now - 120)
+        await revocations.revoke("live", now + 600)
+        assert revocations.stats()["windows"] == 2
+        await revocations._sync()
+        stats = revocations.stats()
+        assert (stats["windows"], stats["windows_dropped"]) == (1, 1)
+        # The store drops the expired row too
+        assert [row[1] for row in await store.since(0, 0)] == ["live"]
+        assert await revocations.is_revoked({"jti": "live", "exp": now + 600})
+
+    asyncio.run(run())
+
+
+def test_workers_pick_up_each_others_revocations(tmp_path):
+    store = SQLiteRevocationStore(str(tmp_path / "revocations.db"))
+    first = RevocationList(store, sync_seconds=3600)
+    second = RevocationList(store, sync_seconds=3600)
+    exp = time.time() + 600
+    claims = {"jti": "jti", "sub": "alice", "iat": time.time() - 1, "exp": exp}
+
+    async def run():
+        await first.ready()
+        await second.ready()
+        await first.revoke("jti", exp)
+        assert await first.is_revoked(claims)
+        assert not second.might_be_revoked("jti", exp)
+        await second._sync()
+        assert await second.is_revoked(claims)
+
+        await second.revoke_subject("bob")
+        other = {"sub": "bob", "iat": time.time() - 1, "exp": exp}
+        assert not await first.is_revoked(other)
+        await first._sync()
+        assert await first.is_revoked(other)
+        assert first.stats()["last_id"] == second.stats()["last_id"] == 1
+        await first.close()
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from python.app.utils.sessions import SessionStore, SnapshotError
+
+
+def store_with(*sessions) -> SessionStore:
+    store = SessionStore()
+    for sid, sub, exp in sessions:
+        store.add(sid, sub, exp)
+    return store
+
+
+def rows(store: SessionStore) -> set:
+    _, parsed = store.parse(store.dump())
+    return set(parsed)
+
+
+def test_dump_parse_round_trip():
+    exp = time.time() + 600
+    store = store_with(
+        ("a1", "alice", exp), ("a2", "alice", exp + 1), ("z1", "zoë", exp)
+    )
+    written_at, parsed = SessionStore.parse(store.dump(written_at=123.5))
+    assert written_at == 123.5
+    assert {(sid, sub, e) for sid, sub, e, _ in parsed} == {
+        ("a1", "alice", exp),
+        ("a2", "alice", exp + 1),
+        ("z1", "zoë", exp),
+    }
+
+    restored = SessionStore()
+    assert restored.load(store.dump()) == 3
+    assert rows(restored) == rows(store)
+    assert [s.sid for s in restored.for_user("alice")] == ["a1", "a2"]
+    assert restored.get("z1").sub == "zoë"
+
+
+def test_load_skips_expired_and_known_sessions():
+    now = time.time()
+    # The wheel has not dropped "old" yet, so the snapshot still has it
+    store = store_with(("old", "u", now - 5), ("live", "u", now + 600))
+    store.add("known", "u", now + 600)
+    data = store.dump()
+    assert len(SessionStore.parse(data)[1]) == 3
+
+    other = store_with(("known", "u", now + 600))
+    assert other.load(data) == 1
+    assert {s.sid for s in other.for_user("u")} == {"known", "live"}
+
+
+@pytest.mark.parametrize(
+    "corrupt, message",
+    [
+        (lambda data: data[:10], "truncated"),
+        (lambda data: data[:-1] + bytes([data[-1] ^ 1]), "checksum"),
+        (lambda data: b"XXXX" + data[4:], "checksum"),
+    ],
+)
+def test_parse_rejects_damaged_snapshots(corrupt, message):
+    data = store_with(("sid", "u", time.time() + 600)).dump()
+    with pytest.raises(SnapshotError, match=message):
+        SessionStore.parse(corrupt(data))
+
+
+def test_save_merges_other_workers_sessions(tmp_path):
+    path = str(tmp_path / "sessions.snap")
+    exp = time.time() + 600
+    first = store_with(("f1", "alice", exp))
+    second = store_with(("s1", "bob", exp))
+
+    assert first.save(path) == 1
+    # second never read the file, so it keeps first's sessions
+    assert second.save(path) == 2
+    first.add("f2", "alice", exp)
+    assert first.save(path) == 3
+
+    restored = SessionStore()
+    assert restored.restore(path) == 3
+    assert {sid for sid, *_ in rows(restored)} == {"f1", "f2", "s1"}
+
+    # Unchanged since our own write: ended sessions are not brought back
+    restored.remove("s1")
+    assert restored.save(path) == 2
+    assert SessionStore().restore(path) == 2
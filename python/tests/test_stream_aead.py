@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from python.app.utils import stream_aead
+
+CHUNK = stream_aead.MIN_CHUNK_SIZE
+SEGMENT = CHUNK + stream_aead.TAG_SIZE
+KEY = bytes(range(32))
+SALT = b"s" * 16
+
+
+def encrypt(data: bytes, pieces: int = 7) -> bytes:
+    encryptor = stream_aead.StreamEncryptor(KEY, SALT, CHUNK)
+    out = [encryptor.header]
+    step = max(1, len(data) // pieces)
+    for i in range(0, len(data), step):
+        out.append(encryptor.update(data[i : i + step]))
+    out.append(encryptor.finalize())
+    return b"".join(out)
+
+
+def decrypt(blob: bytes, pieces: int = 5) -> bytes:
+    header = blob[: stream_aead.HEADER_SIZE]
+    decryptor = stream_aead.StreamDecryptor(KEY, header)
+    body = blob[stream_aead.HEADER_SIZE :]
+    step = max(1, len(body) // pieces)
+    out = [decryptor.update(body[i : i + step]) for i in range(0, len(body), step)]
+    out.append(decryptor.finalize())
+    return b"".join(out)
+
+
+def split(blob: bytes) -> tuple[bytes, list[bytes]]:
+    header, body = blob[: stream_aead.HEADER_SIZE], blob[stream_aead.HEADER_SIZE :]
+    return header, [body[i : i + SEGMENT] for i in range(0, len(body), SEGMENT)]
+
+
+@pytest.mark.parametrize(
+    "size", [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 3 * CHUNK, 3 * CHUNK + 17]
+)
+def test_round_trip(size):
+    data = os.urandom(size)
+    blob = encrypt(data)
+    # Every segment is full except the last; an empty stream still has one
+    segments = max(1, -(-size // CHUNK))
+    assert len(blob) == stream_aead.HEADER_SIZE + size + segments * stream_aead.TAG_SIZE
+    assert decrypt(blob) == data
+
+
+def test_header_round_trip():
+    blob = encrypt(b"x")
+    chunk_size, salt, prefix = stream_aead.parse_header(blob)
+    assert (chunk_size, salt, len(prefix)) == (CHUNK, SALT, 7)
+
+
+def test_rejects_truncated_stream():
+    blob = encrypt(os.urandom(2 * CHUNK + 100))
+    with pytest.raises(ValueError):
+        decrypt(blob[:-1])
+    with pytest.raises(ValueError):
+        decrypt(blob[: stream_aead.HEADER_SIZE + 5])
+
+
+def test_rejects_dropped_final_segment():
+    header, segments = split(encrypt(os.urandom(3 * CHUNK + 100)))
+    assert len(segments) == 4
+    # The last remaining segment was sealed as non-final
+    with pytest.raises(ValueError, match="segment 2"):
+        decrypt(header + b"".join(segments[:-1]))
+
+
+def test_rejects_reordered_segments():
+    header, segments = split(encrypt(os.urandom(3 * CHUNK + 100)))
+    segments[0], segments[1] = segments[1], segments[0]
+    with pytest.raises(ValueError, match="segment 0"):
+        decrypt(header + b"".join(segments))
+
+
+def test_rejects_modified_header():
+    blob = bytearray(encrypt(os.urandom(CHUNK + 100)))
+    # A salt byte: the header still parses, but it is the AAD of every segment
+    blob[10] ^= 1
+    with pytest.raises(ValueError, match="segment 0"):
+        decrypt(bytes(blob))
+
+
+def test_rejects_foreign_header():
+    blob = encrypt(b"data")
+    with pytest.raises(ValueError, match="Not an encrypted stream"):
+        stream_aead.parse_header(b"XXXX" + blob[4:])
+    with pytest.raises(ValueError, match="Truncated"):
+        stream_aead.parse_header(blob[:10])
@@ -0,0 +1,83 @@
+import math
+import random
+
+import pytest
+
+from python.app.utils.timer_wheel import TimerWheel
+
+
+def small_wheel() -> TimerWheel:
+    # Level 0: ticks 1-3, level 1: up to 15, then overflow
+    return TimerWheel(tick=1.0, slots=4, levels=2, now=0.0)
+
+
+def fire_times(wheel: TimerWheel, until: int) -> dict:
+    fired = {}
+    for now in range(1, until + 1):
+        for key in wheel.advance(now):
+            assert key not in fired
+            fired[key] = now
+    return fired
+
+
+def test_timers_cascade_to_their_exact_tick():
+    wheel = small_wheel()
+    for deadline in range(1, 16):
+        wheel.schedule(deadline, deadline)
+    assert wheel.stats()["overflow"] == 0
+    fired = fire_times(wheel, 20)
+    assert fired == {deadline: deadline for deadline in range(1, 16)}
+    assert wheel.stats()["cascaded"] > 0
+    assert len(wheel) == 0
+
+
+def test_overflow_is_redistributed():
+    wheel = small_wheel()
+    wheel.schedule("far", 40.5)
+    wheel.schedule("near", 2)
+    assert wheel.stats()["overflow"] == 1
+    assert fire_times(wheel, 60) == {"near": 2, "far": 41}
+    assert wheel.stats()["overflow"] == 0
+
+
+def test_never_fires_early_under_uneven_advances():
+    rng = random.Random(7)
+    wheel = small_wheel()
+    deadlines = {key: rng.uniform(0.1, 80) for key in range(300)}
+    wheel.schedule_many(deadlines.items())
+    for key in range(0, 300, 10):
+        wheel.cancel(key)
+        del deadlines[key]
+    now, fired = 0.0, {}
+    while now < 90:
+        now += rng.uniform(0.2, 7)
+        for key in wheel.advance(now):
+            fired[key] = now
+    assert fired.keys() == deadlines.keys()
+    for key, at in fired.items():
+        # Due on the first advance at or after the deadline's whole tick
+        assert math.ceil(deadlines[key]) <= math.floor(at)
+        assert at - math.ceil(deadlines[key]) < 7
+
+
+def test_reschedule_and_cancel():
+    wheel = small_wheel()
+    wheel.schedule("key", 10)
+    wheel.schedule("key", 3)
+    assert len(wheel) == 1
+    assert wheel.advance(3) == ["key"]
+    wheel.schedule("gone", 30)
+    assert wheel.cancel("gone") and not wheel.cancel("gone")
+    assert wheel.advance(100) == []
+
+
+def test_past_deadline_fires_on_next_tick():
+    wheel = TimerWheel(tick=1.0, slots=4, levels=2, now=10.0)
+    wheel.schedule("late", 5)
+    assert wheel.advance(10.9) == []
+    assert wheel.advance(11) == ["late"]
+
+
+def test_rejects_bad_geometry():
+    with pytest.raises(ValueError):
+        TimerWheel(slots=1)